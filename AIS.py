@@ -3,201 +3,52 @@ from ttkbootstrap.constants import *
 import sqlite3
 import os
 from ttkbootstrap.dialogs import Messagebox
+from tkinter import filedialog
 import datetime
 import random
 import string
+from ais_cache import ReferenceCache
+from ais_changes import ChangeWatcher
+from ais_db import DB_NAME, Database, init_db, rebuild_account_balances, verify_account_balances
+from ais_grid import GroupedRows, KeyedTreeview, KeysetQuery, PagedTreeview
+from ais_service import OrderService, ServiceClient
+from ais_search import IncrementalSearch, SearchController, search_filter, search_rows
+from ais_worker import QueryWorker
+from ais_writer import WriteQueue
+from ais_export import EXPORTS, export_file
+from ais_import import import_file
+from ais_journal import post_entry
+from ais_orders import OrderError, placeholders
+from ais_reports import (PERIOD_TYPES, balance_sheet_lines, cash_flow_lines, close_period, has_stale_closes,
+                         income_statement_lines, parse_report_date, period_end, refresh_period_closes,
+                         sales_by_payment_method, sales_records, trial_balance_lines)
 
-DB_NAME = 'ais.db'
-
-# Database setup
-
-def init_db():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    # Chart of Accounts
-    c.execute('''CREATE TABLE IF NOT EXISTS accounts (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        type TEXT NOT NULL
-    )''')
-    
-    # Initialize default accounts if they don't exist
-    default_accounts = [
-        ('Cash', 'Asset'),
-        ('Bank', 'Asset'),
-        ('Accounts Receivable', 'Asset'),
-        ('Inventory', 'Asset'),
-        ('Equipment', 'Asset'),
-        ('Accounts Payable', 'Liability'),
-        ('Sales Revenue', 'Income'),
-        ('Cost of Goods Sold', 'Expense'),
-        ('Operating Expenses', 'Expense'),
-        ('Payroll Expense', 'Expense'),
-        ('Capital', 'Equity'),
-        ('Retained Earnings', 'Equity'),
-        ('Inventory Adjustment', 'Equity')
-    ]
-    
-    for name, acc_type in default_accounts:
-        c.execute('SELECT id FROM accounts WHERE name = ?', (name,))
-        if not c.fetchone():
-            c.execute('INSERT INTO accounts (name, type) VALUES (?, ?)', (name, acc_type))
-    
-    # Journal Entries
-    c.execute('''CREATE TABLE IF NOT EXISTS journal_entries (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        date TEXT NOT NULL,
-        description TEXT
-    )''')
-    c.execute('''CREATE TABLE IF NOT EXISTS journal_lines (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        entry_id INTEGER,
-        account_id INTEGER,
-        debit REAL,
-        credit REAL,
-        FOREIGN KEY(entry_id) REFERENCES journal_entries(id),
-        FOREIGN KEY(account_id) REFERENCES accounts(id)
-    )''')
-    # Restaurant Menu Items
-    c.execute('''CREATE TABLE IF NOT EXISTS menu_items (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        description TEXT,
-        price REAL NOT NULL,
-        category TEXT,
-        preparation_time INTEGER,
-        is_available INTEGER DEFAULT 1
-    )''')
-    # Restaurant Orders
-    c.execute('''CREATE TABLE IF NOT EXISTS orders (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        order_number TEXT NOT NULL,
-        table_number INTEGER,
-        order_date TEXT NOT NULL,
-        status TEXT DEFAULT 'pending',
-        total_amount REAL,
-        cost_amount REAL,
-        payment_status TEXT DEFAULT 'unpaid',
-        payment_method TEXT,
-        cashier_id INTEGER,
-        FOREIGN KEY(cashier_id) REFERENCES users(id)
-    )''')
-    # Order Items
-    c.execute('''CREATE TABLE IF NOT EXISTS order_items (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        order_id INTEGER,
-        menu_item_id INTEGER,
-        quantity INTEGER,
-        price REAL,
-        status TEXT DEFAULT 'pending',
-        notes TEXT,
-        FOREIGN KEY(order_id) REFERENCES orders(id),
-        FOREIGN KEY(menu_item_id) REFERENCES menu_items(id)
-    )''')
-    # Restaurant Tables
-    c.execute('''CREATE TABLE IF NOT EXISTS tables (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        table_number INTEGER UNIQUE,
-        capacity INTEGER,
-        status TEXT DEFAULT 'available'
-    )''')
-    # Restaurant Users (Staff)
-    c.execute('''CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT UNIQUE,
-        password TEXT,
-        role TEXT,
-        name TEXT,
-        is_active INTEGER DEFAULT 1
-    )''')
-    # Kitchen Inventory
-    c.execute('''CREATE TABLE IF NOT EXISTS kitchen_inventory (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        quantity REAL,
-        unit TEXT,
-        reorder_level REAL,
-        cost_per_unit REAL
-    )''')
-    # Menu Item Ingredients
-    c.execute('''CREATE TABLE IF NOT EXISTS menu_item_ingredients (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        menu_item_id INTEGER,
-        inventory_id INTEGER,
-        quantity REAL,
-        FOREIGN KEY(menu_item_id) REFERENCES menu_items(id),
-        FOREIGN KEY(inventory_id) REFERENCES kitchen_inventory(id)
-    )''')
-    # AR/AP (Receivables/Payables)
-    c.execute('''CREATE TABLE IF NOT EXISTS receivables (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        customer TEXT,
-        amount REAL,
-        due_date TEXT,
-        paid INTEGER DEFAULT 0
-    )''')
-    c.execute('''CREATE TABLE IF NOT EXISTS payables (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        vendor TEXT,
-        amount REAL,
-        due_date TEXT,
-        paid INTEGER DEFAULT 0
-    )''')
-    # Customers
-    c.execute('''CREATE TABLE IF NOT EXISTS customers (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        contact TEXT
-    )''')
-    # Suppliers
-    c.execute('''CREATE TABLE IF NOT EXISTS suppliers (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        contact TEXT
-    )''')
-    # Inventory
-    c.execute('''CREATE TABLE IF NOT EXISTS inventory (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        sku TEXT,
-        quantity INTEGER DEFAULT 0,
-        cost REAL,
-        price REAL
-    )''')
-    # Purchases
-    c.execute('''CREATE TABLE IF NOT EXISTS purchases (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        date TEXT NOT NULL,
-        supplier_id INTEGER,
-        total REAL,
-        FOREIGN KEY(supplier_id) REFERENCES suppliers(id)
-    )''')
-    c.execute('''CREATE TABLE IF NOT EXISTS purchase_items (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        purchase_id INTEGER,
-        inventory_id INTEGER,
-        quantity INTEGER,
-        cost REAL,
-        FOREIGN KEY(purchase_id) REFERENCES purchases(id),
-        FOREIGN KEY(inventory_id) REFERENCES inventory(id)
-    )''')
-    # Expenses
-    c.execute('''CREATE TABLE IF NOT EXISTS expenses (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        date TEXT NOT NULL,
-        type TEXT,
-        amount REAL,
-        description TEXT
-    )''')
-    conn.commit()
-    conn.close()
 
 class AISApp(tb.Window):
-    def __init__(self):
+    def __init__(self, db=None):
         super().__init__(themename='flatly')
+        self.db = db if db is not None else Database(DB_NAME)
+        self.worker = QueryWorker(self, self.db)
+        self.refs = ReferenceCache(self.db)
+        # Keys of the targeted loads in flight (see load_keys_async)
+        self.pending_keys = {}
+        # Serializes the order, kitchen and payment writes (see WriteQueue);
+        # other handlers still commit on their own connections
+        self.writes = WriteQueue(self.db, self.refs)
+        # Orders, Kitchen and Cashier go through the order service when one
+        # is running (python ais_service.py), else straight to the database
+        service_url = os.environ.get('AIS_SERVICE_URL')
+        self.service = ServiceClient(service_url) if service_url else OrderService(self.db, self.refs, self.writes)
         self.title('Restaurant Accounting Information System')
         self.geometry('1050x750')
         self.create_widgets()
+        # Kitchen, Tables and Cashier follow changes made anywhere, Refresh
+        # buttons or not
+        self.changes = ChangeWatcher(self, self.db)
+        self.changes.subscribe('order', self.load_kitchen_orders)
+        self.changes.subscribe('order', self.load_unpaid_orders)
+        self.changes.subscribe('order', lambda order_ids: self.update_sales_summary())
+        self.changes.subscribe('table', self.load_tables)
 
     def create_widgets(self):
         # App Title with a colored header
@@ -296,10 +147,42 @@ class AISApp(tb.Window):
         tree.tag_configure('oddrow', background='#f2f6fa')
         tree.tag_configure('evenrow', background='#e9eef6')
 
-    def insert_treeview_rows(self, tree, rows):
-        for i, row in enumerate(rows):
-            tag = 'evenrow' if i % 2 == 0 else 'oddrow'
-            tree.insert('', 'end', values=row, tags=(tag,))
+    def when_done(self, future, on_done, on_error):
+        # Hands a concurrent.futures.Future's outcome to on_done(result) or
+        # on_error(exc) on the Tk thread, checking back with after()
+        if not future.done():
+            self.after(25, self.when_done, future, on_done, on_error)
+            return
+        error = future.exception()
+        if error is not None:
+            on_error(error)
+        else:
+            on_done(future.result())
+
+    def load_async(self, key, fetch, fill):
+        # fetch() runs on the query worker and must not touch widgets;
+        # fill(result) runs back on the Tk thread. A newer load under the
+        # same key supersedes one still in flight.
+        self.worker.submit(key, fetch, fill, self.show_db_error)
+
+    def load_keys_async(self, key, fetch, fill, keys=None):
+        # load_async for loaders that may re-read only some keys (see
+        # ChangeWatcher): fetch(keys) on the worker, fill(result, keys) here.
+        # A load still in flight is superseded, so its keys are taken over.
+        if keys is not None:
+            keys = set(keys)
+            if self.worker.busy(key):
+                pending = self.pending_keys.get(key, set())
+                keys = None if pending is None else keys | pending
+        self.pending_keys[key] = keys
+        self.worker.submit(key, lambda: fetch(keys), lambda result: fill(result, keys), self.show_db_error)
+
+    def show_db_error(self, error):
+        self.set_status(f'Database error: {error}', error=True)
+
+    def keyed_rows(self, rows):
+        # KeyedTreeview rows keyed by their first column (the record id)
+        return [(row[0], row, ('evenrow' if i % 2 == 0 else 'oddrow',)) for i, row in enumerate(rows)]
 
     def init_accounts_tab(self):
         frame = self.tabs['Chart of Accounts']
@@ -321,7 +204,12 @@ class AISApp(tb.Window):
         search_frame.pack(pady=(0, 5), padx=10, anchor='w')
         tb.Label(search_frame, text='Search:').pack(side='left')
         self.account_search_var = tb.StringVar()
-        self.account_search_var.trace('w', lambda *args: self.load_accounts())
+        self.account_search = IncrementalSearch(
+            self.worker, 'account_search',
+            lambda search: search_rows(self.db, 'accounts', ('id', 'name', 'type'),
+                                       search, ('name', 'type')),
+            (1, 2), on_error=self.show_db_error)
+        SearchController(self, self.account_search_var, lambda: self.load_accounts(incremental=True))
         tb.Entry(search_frame, textvariable=self.account_search_var, width=20).pack(side='left', padx=5)
         self.accounts_tree = tb.Treeview(frame, columns=('ID', 'Name', 'Type'), show='headings', height=12, selectmode='browse')
         self.accounts_tree.heading('ID', text='ID')
@@ -331,6 +219,7 @@ class AISApp(tb.Window):
         self.accounts_tree.column('Name', width=200)
         self.accounts_tree.column('Type', width=120)
         self.accounts_tree.pack(pady=10, padx=10, fill='x')
+        self.accounts_view = KeyedTreeview(self.accounts_tree)
         self.style_treeview(self.accounts_tree)
         self.accounts_tree.bind('<<TreeviewSelect>>', self.on_account_select)
         btn_frame = tb.Frame(frame)
@@ -367,33 +256,25 @@ class AISApp(tb.Window):
         if not name or not acc_type:
             Messagebox.show_warning('Input Error', 'Please enter both name and type.')
             return
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        if self.account_edit_id:
-            c.execute('UPDATE accounts SET name=?, type=? WHERE id=?', (name, acc_type, self.account_edit_id))
-            self.set_status('Account updated.')
-        else:
-            c.execute('INSERT INTO accounts (name, type) VALUES (?, ?)', (name, acc_type))
-            self.set_status('Account added.')
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as c:
+            if self.account_edit_id:
+                c.execute('UPDATE accounts SET name=?, type=? WHERE id=?', (name, acc_type, self.account_edit_id))
+                self.set_status('Account updated.')
+            else:
+                c.execute('INSERT INTO accounts (name, type) VALUES (?, ?)', (name, acc_type))
+                self.set_status('Account added.')
         self.account_name_var.set('')
         self.account_type_var.set('')
         self.account_edit_id = None # Reset edit mode
         self.load_accounts()
         self.load_accounts_for_lines() # Refresh account dropdown in Journal Entries
 
-    def load_accounts(self):
-        for row in self.accounts_tree.get_children():
-            self.accounts_tree.delete(row)
-        search = self.account_search_var.get().lower() if hasattr(self, 'account_search_var') else ''
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('SELECT id, name, type FROM accounts ORDER BY id')
-        rows = c.fetchall()
-        filtered = [row for row in rows if search in str(row[1]).lower() or search in str(row[2]).lower()]
-        self.insert_treeview_rows(self.accounts_tree, filtered)
-        conn.close()
+    def load_accounts(self, incremental=False):
+        search = self.account_search_var.get() if hasattr(self, 'account_search_var') else ''
+        self.account_search.run(search, self.fill_accounts, incremental)
+
+    def fill_accounts(self, rows):
+        self.accounts_view.update(self.keyed_rows(rows))
 
     def delete_account(self):
         selected = self.accounts_tree.selection()
@@ -402,17 +283,17 @@ class AISApp(tb.Window):
             return
         # Check if account is used in journal entries before deleting
         acc_id = self.accounts_tree.item(selected[0])['values'][0]
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('SELECT COUNT(*) FROM journal_lines WHERE account_id=?', (acc_id,))
-        count = c.fetchone()[0]
-        if count > 0:
-            Messagebox.show_warning('Cannot Delete', 'This account is used in journal entries and cannot be deleted.')
-            conn.close()
-            return
-        c.execute('DELETE FROM accounts WHERE id=?', (acc_id,))
-        conn.commit()
-        conn.close()
+        # Refusals are raised so the transaction is closed before the dialog
+        try:
+            with self.db.transaction() as c:
+                c.execute('SELECT COUNT(*) FROM journal_lines WHERE account_id=?', (acc_id,))
+                count = c.fetchone()[0]
+                if count > 0:
+                    raise ValueError('This account is used in journal entries and cannot be deleted.')
+                c.execute('DELETE FROM accounts WHERE id=?', (acc_id,))
+        except ValueError as e:
+            Messagebox.show_warning('Cannot Delete', str(e))
+            return
         self.load_accounts()
         self.load_accounts_for_lines() # Refresh account dropdown in Journal Entries
         self.set_status('Account deleted.')
@@ -432,6 +313,7 @@ class AISApp(tb.Window):
         tb.Entry(entry_frame, textvariable=self.journal_desc_var, width=30).grid(row=0, column=3, padx=5, pady=5)
         tb.Button(entry_frame, text='Add Entry', style='Accent.TButton', command=self.add_journal_entry).grid(row=0, column=4, padx=10, pady=5)
         tb.Button(entry_frame, text='Refresh', style='Accent.TButton', command=self.load_journal_entries).grid(row=0, column=5, padx=10, pady=5)
+        tb.Button(entry_frame, text='Import...', style='Accent.TButton', command=self.import_journal_file).grid(row=0, column=6, padx=10, pady=5)
         # Journal entries list
         self.journal_tree = tb.Treeview(frame, columns=('ID', 'Date', 'Description'), show='headings', height=8)
         self.journal_tree.heading('ID', text='ID')
@@ -443,6 +325,7 @@ class AISApp(tb.Window):
         self.journal_tree.pack(pady=10, padx=10, fill='x')
         self.style_treeview(self.journal_tree)
         self.journal_tree.bind('<<TreeviewSelect>>', self.on_journal_select)
+        self.journal_grid = PagedTreeview(self.journal_tree, self.worker, 'journal_entries', on_error=self.show_db_error)
         tb.Button(frame, text='Delete Selected Entry', style='Accent.TButton', command=self.delete_journal_entry).pack(pady=5)
         # Journal lines section
         lines_frame = tb.LabelFrame(frame, text='Journal Lines', style='Section.TLabel')
@@ -457,6 +340,7 @@ class AISApp(tb.Window):
         self.journal_lines_tree.column('Debit', width=100, anchor='e')
         self.journal_lines_tree.column('Credit', width=100, anchor='e')
         self.journal_lines_tree.pack(side='left', padx=5, pady=5)
+        self.journal_lines_view = KeyedTreeview(self.journal_lines_tree)
         # Add line controls
         add_line_frame = tb.Frame(lines_frame)
         add_line_frame.pack(side='left', padx=10)
@@ -477,12 +361,7 @@ class AISApp(tb.Window):
         self.load_accounts_for_lines()
 
     def load_accounts_for_lines(self):
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('SELECT name FROM accounts ORDER BY name')
-        accounts = [row[0] for row in c.fetchall()]
-        self.line_account_cb['values'] = accounts
-        conn.close()
+        self.line_account_cb['values'] = self.refs.names('accounts')
 
     def on_journal_select(self, event):
         selected = self.journal_tree.selection()
@@ -516,19 +395,13 @@ class AISApp(tb.Window):
         except ValueError:
             Messagebox.show_warning('Input Error', 'Debit and Credit must be numbers.')
             return
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('SELECT id FROM accounts WHERE name=?', (account_name,))
-        row = c.fetchone()
-        if not row:
+        account_id = self.refs.account_id(account_name)
+        if account_id is None:
             Messagebox.show_warning('Account Error', 'Account not found.')
-            conn.close()
             return
-        account_id = row[0]
-        c.execute('INSERT INTO journal_lines (entry_id, account_id, debit, credit) VALUES (?, ?, ?, ?)',
-                  (self.selected_entry_id, account_id, debit_val, credit_val))
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as c:
+            c.execute('INSERT INTO journal_lines (entry_id, account_id, debit, credit) VALUES (?, ?, ?, ?)',
+                      (self.selected_entry_id, account_id, debit_val, credit_val))
         self.line_account_var.set('')
         self.line_debit_var.set('')
         self.line_credit_var.set('')
@@ -537,18 +410,15 @@ class AISApp(tb.Window):
         self.set_status('Journal line added.')
 
     def load_journal_lines(self, entry_id):
-        for row in self.journal_lines_tree.get_children():
-            self.journal_lines_tree.delete(row)
         if not entry_id:
+            self.journal_lines_view.update([])
             return
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
+        c = self.db.cursor()
         c.execute('''SELECT jl.id, a.name, jl.debit, jl.credit FROM journal_lines jl
                      JOIN accounts a ON jl.account_id = a.id WHERE jl.entry_id=?''', (entry_id,))
         rows = c.fetchall()
-        for row in rows:
-            self.journal_lines_tree.insert('', 'end', values=(row[0], row[1], f'{row[2]:.2f}', f'{row[3]:.2f}'))
-        conn.close()
+        self.journal_lines_view.update([(row[0], (row[0], row[1], f'{row[2]:.2f}', f'{row[3]:.2f}'), ())
+                                        for row in rows])
 
     def delete_journal_line(self):
         selected = self.journal_lines_tree.selection()
@@ -556,11 +426,8 @@ class AISApp(tb.Window):
             Messagebox.show_warning('Select Line', 'Select a journal line to delete.')
             return
         line_id = self.journal_lines_tree.item(selected[0])['values'][0]
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('DELETE FROM journal_lines WHERE id=?', (line_id,))
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as c:
+            c.execute('DELETE FROM journal_lines WHERE id=?', (line_id,))
         self.load_journal_lines(self.selected_entry_id)
         self.load_ledger()
         self.set_status('Journal line deleted.')
@@ -571,27 +438,52 @@ class AISApp(tb.Window):
         if not date:
             Messagebox.show_warning('Input Error', 'Please enter a date.')
             return
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('INSERT INTO journal_entries (date, description) VALUES (?, ?)', (date, desc))
-        entry_id = c.lastrowid # Get the ID of the newly inserted entry
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as c:
+            c.execute('INSERT INTO journal_entries (date, description) VALUES (?, ?)', (date, desc))
+            entry_id = c.lastrowid # Get the ID of the newly inserted entry
         self.journal_date_var.set('')
         self.journal_desc_var.set('')
         self.load_journal_entries() # This will auto-select the new entry due to the binding
         self.set_status('Journal entry added.')
 
+    def import_journal_file(self):
+        if self.worker.busy('journal_import'):
+            Messagebox.show_warning('Import Running', 'Wait for the current import to finish.')
+            return
+        path = filedialog.askopenfilename(title='Import Journal Entries',
+                                          filetypes=[('CSV', '*.csv'), ('JSON lines', '*.jsonl *.json'), ('All files', '*.*')])
+        if not path:
+            return
+        # Written by the import on the worker, read by the status poll here
+        progress = {'entries': 0, 'lines': 0}
+        self.worker.submit('journal_import',
+                           lambda: import_file(self.db, self.refs, path,
+                                               progress=lambda entries, lines: progress.update(entries=entries, lines=lines)),
+                           self.journal_import_done, self.show_db_error)
+        self.set_status('Importing journal entries...')
+        self.after(500, self.show_import_progress, progress)
+
+    def show_import_progress(self, progress):
+        if not self.worker.busy('journal_import'):
+            return
+        self.set_status(f"Importing journal entries... {progress['lines']} lines")
+        self.after(500, self.show_import_progress, progress)
+
+    def journal_import_done(self, result):
+        entries, lines, errors = result
+        self.load_journal_entries()
+        self.load_ledger()
+        self.set_status(f'Imported {entries} journal entries ({lines} lines).', error=bool(errors))
+        if errors:
+            shown = '\n'.join(f'Line {number} ({ref}): {message}' for number, ref, message in errors[:10])
+            more = f'\n...and {len(errors) - 10} more.' if len(errors) > 10 else ''
+            Messagebox.show_warning('Import Warnings', f'{len(errors)} entries were skipped:\n{shown}{more}')
+
     def load_journal_entries(self):
-        for row in self.journal_tree.get_children():
-            self.journal_tree.delete(row)
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('SELECT id, date, description FROM journal_entries ORDER BY id')
-        rows = c.fetchall()
-        for row in rows:
-            self.journal_tree.insert('', 'end', values=row)
-        conn.close()
+        self.journal_grid.load(KeysetQuery('journal_entries', ('id', 'date', 'description')),
+                               self.on_journal_entries_loaded)
+
+    def on_journal_entries_loaded(self):
         # Auto-select the first entry if exists
         entries = self.journal_tree.get_children()
         if entries:
@@ -610,13 +502,10 @@ class AISApp(tb.Window):
         # Optional: Confirm deletion
         # if not Messagebox.yesno('Confirm Delete', 'Are you sure you want to delete this journal entry and all its lines?'):
         #     return
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        # Delete related journal lines first
-        c.execute('DELETE FROM journal_lines WHERE entry_id=?', (entry_id,))
-        c.execute('DELETE FROM journal_entries WHERE id=?', (entry_id,))
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as c:
+            # Delete related journal lines first
+            c.execute('DELETE FROM journal_lines WHERE entry_id=?', (entry_id,))
+            c.execute('DELETE FROM journal_entries WHERE id=?', (entry_id,))
         self.load_journal_entries()
         self.load_ledger() # Refresh ledger after deleting entries/lines
         self.set_status('Journal entry deleted.')
@@ -636,24 +525,39 @@ class AISApp(tb.Window):
         self.ledger_tree.column('Credit', width=100, anchor='e')
         self.ledger_tree.column('Balance', width=100, anchor='e')
         self.ledger_tree.pack(pady=10, padx=10, fill='x')
-        tb.Button(frame, text='Refresh Ledger', style='Accent.TButton', command=self.load_ledger).pack(pady=5)
+        self.ledger_view = KeyedTreeview(self.ledger_tree)
+        btn_frame = tb.Frame(frame)
+        btn_frame.pack(pady=5)
+        tb.Button(btn_frame, text='Refresh Ledger', style='Accent.TButton', command=self.load_ledger).grid(row=0, column=0, padx=5)
+        tb.Button(btn_frame, text='Rebuild Balances', style='Accent.TButton', command=self.rebuild_ledger_balances).grid(row=0, column=1, padx=5)
         self.load_ledger()
 
+    def rebuild_ledger_balances(self):
+        drifted = verify_account_balances(self.db)
+        rebuild_account_balances(self.db)
+        self.load_ledger()
+        if drifted:
+            self.set_status(f'Account balances rebuilt; {len(drifted)} account(s) had drifted.', error=True)
+        else:
+            self.set_status('Account balances verified and rebuilt.')
+
     def load_ledger(self):
-        for row in self.ledger_tree.get_children():
-            self.ledger_tree.delete(row)
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('SELECT id, name FROM accounts')
-        accounts = c.fetchall()
-        for acc_id, acc_name in accounts:
-            c.execute('''SELECT SUM(debit), SUM(credit) FROM journal_lines WHERE account_id=?''', (acc_id,))
-            debit, credit = c.fetchone()
-            debit = debit if debit else 0.0
-            credit = credit if credit else 0.0
-            balance = debit - credit
-            self.ledger_tree.insert('', 'end', values=(acc_name, f'{debit:.2f}', f'{credit:.2f}', f'{balance:.2f}'))
-        conn.close()
+        self.load_async('ledger', self.fetch_ledger, self.fill_ledger)
+
+    def fetch_ledger(self):
+        # Balances come from the materialized account_balances table, so the
+        # ledger costs one row per account regardless of journal size
+        rows = self.db.query('''
+            SELECT a.id, a.name, COALESCE(b.debit, 0.0), COALESCE(b.credit, 0.0)
+            FROM accounts a
+            LEFT JOIN account_balances b ON b.account_id = a.id
+            ORDER BY a.id
+        ''')
+        return [(acc_id, (acc_name, f'{debit:.2f}', f'{credit:.2f}', f'{debit - credit:.2f}'), ())
+                for acc_id, acc_name, debit, credit in rows]
+
+    def fill_ledger(self, rows):
+        self.ledger_view.update(rows)
 
     def init_receivables_tab(self):
         frame = self.tabs['Receivables']
@@ -679,7 +583,12 @@ class AISApp(tb.Window):
         search_frame.pack(pady=(0, 5), padx=10, anchor='w')
         tb.Label(search_frame, text='Search:').pack(side='left')
         self.recv_search_var = tb.StringVar()
-        self.recv_search_var.trace('w', lambda *args: self.load_receivables())
+        self.recv_search = IncrementalSearch(
+            self.worker, 'recv_search',
+            lambda search: search_rows(self.db, 'receivables', ('id', 'customer', 'amount', 'due_date', 'paid'),
+                                       search, ('customer', 'due_date')),
+            (1, 3), on_error=self.show_db_error)
+        SearchController(self, self.recv_search_var, lambda: self.load_receivables(incremental=True))
         tb.Entry(search_frame, textvariable=self.recv_search_var, width=20).pack(side='left', padx=5)
         self.recv_tree = tb.Treeview(frame, columns=('ID', 'Customer', 'Amount', 'Due Date', 'Paid'), show='headings', height=12, selectmode='browse')
         self.recv_tree.heading('ID', text='ID')
@@ -693,6 +602,7 @@ class AISApp(tb.Window):
         self.recv_tree.column('Due Date', width=100)
         self.recv_tree.column('Paid', width=60, anchor='center')
         self.recv_tree.pack(pady=10, padx=10, fill='x')
+        self.recv_view = KeyedTreeview(self.recv_tree)
         self.style_treeview(self.recv_tree)
         btn_frame = tb.Frame(frame)
         btn_frame.pack(pady=5)
@@ -702,12 +612,7 @@ class AISApp(tb.Window):
         self.load_receivables()
 
     def load_receivable_customers(self):
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('SELECT name FROM customers ORDER BY name')
-        customers = [row[0] for row in c.fetchall()]
-        self.recv_customer_cb['values'] = customers
-        conn.close()
+        self.recv_customer_cb['values'] = self.refs.names('customers')
 
     def add_receivable(self):
         customer = self.recv_customer_var.get().strip()
@@ -721,45 +626,31 @@ class AISApp(tb.Window):
         except ValueError:
             self.set_status('Amount must be a number.', error=True)
             return
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('SELECT id FROM customers WHERE name=?', (customer,))
-        row = c.fetchone()
-        customer_id = row[0] if row else None
-        c.execute('INSERT INTO receivables (customer, amount, due_date, paid) VALUES (?, ?, ?, 0)', (customer, amount_val, due))
-        # Journal entry: Debit AR, Credit Sales Revenue
-        today = datetime.datetime.now().strftime('%Y-%m-%d')
-        c.execute('INSERT INTO journal_entries (date, description) VALUES (?, ?)', (today, f"Receivable from {customer}"))
-        entry_id = c.lastrowid
-        # Get account IDs
-        c.execute('SELECT id FROM accounts WHERE name = "Accounts Receivable"')
-        ar_id = c.fetchone()[0]
-        c.execute('SELECT id FROM accounts WHERE name = "Sales Revenue"')
-        sales_id = c.fetchone()[0]
-        c.execute('INSERT INTO journal_lines (entry_id, account_id, debit, credit) VALUES (?, ?, ?, ?)', (entry_id, ar_id, amount_val, 0))
-        c.execute('INSERT INTO journal_lines (entry_id, account_id, debit, credit) VALUES (?, ?, ?, ?)', (entry_id, sales_id, 0, amount_val))
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as c:
+            c.execute('INSERT INTO receivables (customer, amount, due_date, paid) VALUES (?, ?, ?, 0)', (customer, amount_val, due))
+            # Journal entry: Debit AR, Credit Sales Revenue
+            today = datetime.datetime.now().strftime('%Y-%m-%d')
+            post_entry(self.db, self.refs, f"Receivable from {customer}", [
+                ('Accounts Receivable', amount_val, 0),
+                ('Sales Revenue', 0, amount_val),
+            ], date=today)
         self.recv_customer_var.set('')
         self.recv_amount_var.set('')
         self.recv_due_var.set('')
         self.load_receivables()
         self.set_status('Receivable added.')
 
-    def load_receivables(self):
-        for row in self.recv_tree.get_children():
-            self.recv_tree.delete(row)
-        search = self.recv_search_var.get().lower() if hasattr(self, 'recv_search_var') else ''
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('SELECT id, customer, amount, due_date, paid FROM receivables ORDER BY id')
-        rows = c.fetchall()
-        filtered = [row for row in rows if search in str(row[1]).lower() or search in str(row[3]).lower()]
+    def load_receivables(self, incremental=False):
+        search = self.recv_search_var.get() if hasattr(self, 'recv_search_var') else ''
+        self.recv_search.run(search, self.fill_receivables, incremental)
+
+    def fill_receivables(self, filtered):
+        rows = []
         for i, row in enumerate(filtered):
             paid_str = 'Yes' if row[4] else 'No'
             tag = 'evenrow' if i % 2 == 0 else 'oddrow'
-            self.recv_tree.insert('', 'end', values=(row[0], row[1], f'{row[2]:.2f}', row[3], paid_str), tags=(tag,))
-        conn.close()
+            rows.append((row[0], (row[0], row[1], f'{row[2]:.2f}', row[3], paid_str), (tag,)))
+        self.recv_view.update(rows)
 
     def set_status(self, message, error=False):
         if not hasattr(self, 'status_var'):
@@ -776,11 +667,8 @@ class AISApp(tb.Window):
             Messagebox.show_warning('Select Receivable', 'Select a receivable to mark as paid.')
             return
         recv_id = self.recv_tree.item(selected[0])['values'][0]
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('UPDATE receivables SET paid=1 WHERE id=?', (recv_id,))
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as c:
+            c.execute('UPDATE receivables SET paid=1 WHERE id=?', (recv_id,))
         self.load_receivables()
 
     def mark_receivable_unpaid(self):
@@ -789,11 +677,8 @@ class AISApp(tb.Window):
             messagebox.showwarning('Select Receivable', 'Select a receivable to mark as unpaid.')
             return
         recv_id = self.recv_tree.item(selected[0])['values'][0]
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('UPDATE receivables SET paid=0 WHERE id=?', (recv_id,))
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as c:
+            c.execute('UPDATE receivables SET paid=0 WHERE id=?', (recv_id,))
         self.load_receivables()
 
     def delete_receivable(self):
@@ -802,11 +687,8 @@ class AISApp(tb.Window):
             messagebox.showwarning('Select Receivable', 'Select a receivable to delete.')
             return
         recv_id = self.recv_tree.item(selected[0])['values'][0]
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('DELETE FROM receivables WHERE id=?', (recv_id,))
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as c:
+            c.execute('DELETE FROM receivables WHERE id=?', (recv_id,))
         self.load_receivables()
 
     def init_payables_tab(self):
@@ -833,7 +715,12 @@ class AISApp(tb.Window):
         search_frame.pack(pady=(0, 5), padx=10, anchor='w')
         tb.Label(search_frame, text='Search:').pack(side='left')
         self.pay_search_var = tb.StringVar()
-        self.pay_search_var.trace('w', lambda *args: self.load_payables())
+        self.pay_search = IncrementalSearch(
+            self.worker, 'pay_search',
+            lambda search: search_rows(self.db, 'payables', ('id', 'vendor', 'amount', 'due_date', 'paid'),
+                                       search, ('vendor', 'due_date')),
+            (1, 3), on_error=self.show_db_error)
+        SearchController(self, self.pay_search_var, lambda: self.load_payables(incremental=True))
         tb.Entry(search_frame, textvariable=self.pay_search_var, width=20).pack(side='left', padx=5)
         self.pay_tree = tb.Treeview(frame, columns=('ID', 'Supplier', 'Amount', 'Due Date', 'Paid'), show='headings', height=12, selectmode='browse')
         self.pay_tree.heading('ID', text='ID')
@@ -847,6 +734,7 @@ class AISApp(tb.Window):
         self.pay_tree.column('Due Date', width=100)
         self.pay_tree.column('Paid', width=60, anchor='center')
         self.pay_tree.pack(pady=10, padx=10, fill='x')
+        self.pay_view = KeyedTreeview(self.pay_tree)
         self.style_treeview(self.pay_tree)
         btn_frame = tb.Frame(frame)
         btn_frame.pack(pady=5)
@@ -856,12 +744,7 @@ class AISApp(tb.Window):
         self.load_payables()
 
     def load_payable_suppliers(self):
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('SELECT name FROM suppliers ORDER BY name')
-        suppliers = [row[0] for row in c.fetchall()]
-        self.pay_supplier_cb['values'] = suppliers
-        conn.close()
+        self.pay_supplier_cb['values'] = self.refs.names('suppliers')
 
     def add_payable(self):
         supplier = self.pay_supplier_var.get().strip()
@@ -875,45 +758,27 @@ class AISApp(tb.Window):
         except ValueError:
             self.set_status('Amount must be a number.', error=True)
             return
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('SELECT id FROM suppliers WHERE name=?', (supplier,))
-        row = c.fetchone()
-        supplier_id = row[0] if row else None
-        c.execute('INSERT INTO payables (vendor, amount, due_date, paid) VALUES (?, ?, ?, 0)', (supplier, amount_val, due))
-        # Journal entry: Debit Expense, Credit Accounts Payable
-        today = datetime.datetime.now().strftime('%Y-%m-%d')
-        c.execute('INSERT INTO journal_entries (date, description) VALUES (?, ?)', (today, f"Payable to {supplier}"))
-        entry_id = c.lastrowid
-        # Get account IDs
-        c.execute('SELECT id FROM accounts WHERE name = "Operating Expenses"')
-        exp_id = c.fetchone()[0]
-        c.execute('SELECT id FROM accounts WHERE name = "Accounts Payable"')
-        ap_id = c.fetchone()[0]
-        c.execute('INSERT INTO journal_lines (entry_id, account_id, debit, credit) VALUES (?, ?, ?, ?)', (entry_id, exp_id, amount_val, 0))
-        c.execute('INSERT INTO journal_lines (entry_id, account_id, debit, credit) VALUES (?, ?, ?, ?)', (entry_id, ap_id, 0, amount_val))
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as c:
+            c.execute('INSERT INTO payables (vendor, amount, due_date, paid) VALUES (?, ?, ?, 0)', (supplier, amount_val, due))
+            # Journal entry: Debit Expense, Credit Accounts Payable
+            today = datetime.datetime.now().strftime('%Y-%m-%d')
+            post_entry(self.db, self.refs, f"Payable to {supplier}", [
+                ('Operating Expenses', amount_val, 0),
+                ('Accounts Payable', 0, amount_val),
+            ], date=today)
         self.pay_supplier_var.set('')
         self.pay_amount_var.set('')
         self.pay_due_var.set('')
         self.load_payables()
         self.set_status('Payable added.')
 
-    def load_payables(self):
-        for row in self.pay_tree.get_children():
-            self.pay_tree.delete(row)
-        search = self.pay_search_var.get().lower() if hasattr(self, 'pay_search_var') else ''
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('SELECT id, vendor, amount, due_date, paid FROM payables ORDER BY id')
-        rows = c.fetchall()
-        filtered = [row for row in rows if search in str(row[1]).lower() or search in str(row[3]).lower()]
-        for i, row in enumerate(filtered):
-            paid_str = 'Yes' if row[4] else 'No'
-            tag = 'evenrow' if i % 2 == 0 else 'oddrow'
-            self.pay_tree.insert('', 'end', values=(row[0], row[1], f'{row[2]:.2f}', row[3], paid_str), tags=(tag,))
-        conn.close()
+    def load_payables(self, incremental=False):
+        search = self.pay_search_var.get() if hasattr(self, 'pay_search_var') else ''
+        self.pay_search.run(search, self.fill_payables, incremental)
+
+    def fill_payables(self, filtered):
+        self.pay_view.update(self.keyed_rows([(row[0], row[1], f'{row[2]:.2f}', row[3], 'Yes' if row[4] else 'No')
+                                              for row in filtered]))
 
     def mark_payable_paid(self):
         selected = self.pay_tree.selection()
@@ -921,11 +786,8 @@ class AISApp(tb.Window):
             messagebox.showwarning('Select Payable', 'Select a payable to mark as paid.')
             return
         pay_id = self.pay_tree.item(selected[0])['values'][0]
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('UPDATE payables SET paid=1 WHERE id=?', (pay_id,))
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as c:
+            c.execute('UPDATE payables SET paid=1 WHERE id=?', (pay_id,))
         self.load_payables()
 
     def mark_payable_unpaid(self):
@@ -934,11 +796,8 @@ class AISApp(tb.Window):
             messagebox.showwarning('Select Payable', 'Select a payable to mark as unpaid.')
             return
         pay_id = self.pay_tree.item(selected[0])['values'][0]
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('UPDATE payables SET paid=0 WHERE id=?', (pay_id,))
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as c:
+            c.execute('UPDATE payables SET paid=0 WHERE id=?', (pay_id,))
         self.load_payables()
 
     def delete_payable(self):
@@ -947,11 +806,8 @@ class AISApp(tb.Window):
             messagebox.showwarning('Select Payable', 'Select a payable to delete.')
             return
         pay_id = self.pay_tree.item(selected[0])['values'][0]
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('DELETE FROM payables WHERE id=?', (pay_id,))
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as c:
+            c.execute('DELETE FROM payables WHERE id=?', (pay_id,))
         self.load_payables()
 
     def init_customers_tab(self):
@@ -974,7 +830,12 @@ class AISApp(tb.Window):
         search_frame.pack(pady=(0, 5), padx=10, anchor='w')
         tb.Label(search_frame, text='Search:').pack(side='left')
         self.customer_search_var = tb.StringVar()
-        self.customer_search_var.trace('w', lambda *args: self.load_customers())
+        self.customer_search = IncrementalSearch(
+            self.worker, 'customer_search',
+            lambda search: search_rows(self.db, 'customers', ('id', 'name', 'contact'),
+                                       search, ('name', 'contact')),
+            (1, 2), on_error=self.show_db_error)
+        SearchController(self, self.customer_search_var, lambda: self.load_customers(incremental=True))
         tb.Entry(search_frame, textvariable=self.customer_search_var, width=20).pack(side='left', padx=5)
         self.customers_tree = tb.Treeview(frame, columns=('ID', 'Name', 'Contact'), show='headings', height=12, selectmode='browse')
         self.customers_tree.heading('ID', text='ID')
@@ -984,6 +845,7 @@ class AISApp(tb.Window):
         self.customers_tree.column('Name', width=200)
         self.customers_tree.column('Contact', width=200)
         self.customers_tree.pack(pady=10, padx=10, fill='x')
+        self.customers_view = KeyedTreeview(self.customers_tree)
         self.style_treeview(self.customers_tree)
         self.customers_tree.bind('<<TreeviewSelect>>', self.on_customer_select)
         btn_frame = tb.Frame(frame)
@@ -997,16 +859,13 @@ class AISApp(tb.Window):
         if not name:
             self.set_status('Please enter a name.', error=True)
             return
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        if self.customer_edit_id:
-            c.execute('UPDATE customers SET name=?, contact=? WHERE id=?', (name, contact, self.customer_edit_id))
-            self.set_status('Customer updated.')
-        else:
-            c.execute('INSERT INTO customers (name, contact) VALUES (?, ?)', (name, contact))
-            self.set_status('Customer added.')
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as c:
+            if self.customer_edit_id:
+                c.execute('UPDATE customers SET name=?, contact=? WHERE id=?', (name, contact, self.customer_edit_id))
+                self.set_status('Customer updated.')
+            else:
+                c.execute('INSERT INTO customers (name, contact) VALUES (?, ?)', (name, contact))
+                self.set_status('Customer added.')
         self.customer_name_var.set('')
         self.customer_contact_var.set('')
         self.customer_edit_id = None
@@ -1025,17 +884,12 @@ class AISApp(tb.Window):
         self.customer_name_var.set(item[1])
         self.customer_contact_var.set(item[2])
 
-    def load_customers(self):
-        for row in self.customers_tree.get_children():
-            self.customers_tree.delete(row)
-        search = self.customer_search_var.get().lower() if hasattr(self, 'customer_search_var') else ''
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('SELECT id, name, contact FROM customers ORDER BY id')
-        rows = c.fetchall()
-        filtered = [row for row in rows if search in str(row[1]).lower() or search in str(row[2]).lower()]
-        self.insert_treeview_rows(self.customers_tree, filtered)
-        conn.close()
+    def load_customers(self, incremental=False):
+        search = self.customer_search_var.get() if hasattr(self, 'customer_search_var') else ''
+        self.customer_search.run(search, self.fill_customers, incremental)
+
+    def fill_customers(self, rows):
+        self.customers_view.update(self.keyed_rows(rows))
 
     def delete_customer(self):
         selected = self.customers_tree.selection()
@@ -1043,11 +897,8 @@ class AISApp(tb.Window):
             messagebox.showwarning('Select Customer', 'Select a customer to delete.')
             return
         cust_id = self.customers_tree.item(selected[0])['values'][0]
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('DELETE FROM customers WHERE id=?', (cust_id,))
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as c:
+            c.execute('DELETE FROM customers WHERE id=?', (cust_id,))
         self.load_customers()
 
     def init_suppliers_tab(self):
@@ -1070,7 +921,12 @@ class AISApp(tb.Window):
         search_frame.pack(pady=(0, 5), padx=10, anchor='w')
         tb.Label(search_frame, text='Search:').pack(side='left')
         self.supplier_search_var = tb.StringVar()
-        self.supplier_search_var.trace('w', lambda *args: self.load_suppliers())
+        self.supplier_search = IncrementalSearch(
+            self.worker, 'supplier_search',
+            lambda search: search_rows(self.db, 'suppliers', ('id', 'name', 'contact'),
+                                       search, ('name', 'contact')),
+            (1, 2), on_error=self.show_db_error)
+        SearchController(self, self.supplier_search_var, lambda: self.load_suppliers(incremental=True))
         tb.Entry(search_frame, textvariable=self.supplier_search_var, width=20).pack(side='left', padx=5)
         self.suppliers_tree = tb.Treeview(frame, columns=('ID', 'Name', 'Contact'), show='headings', height=12, selectmode='browse')
         self.suppliers_tree.heading('ID', text='ID')
@@ -1080,6 +936,7 @@ class AISApp(tb.Window):
         self.suppliers_tree.column('Name', width=200)
         self.suppliers_tree.column('Contact', width=200)
         self.suppliers_tree.pack(pady=10, padx=10, fill='x')
+        self.suppliers_view = KeyedTreeview(self.suppliers_tree)
         self.style_treeview(self.suppliers_tree)
         self.suppliers_tree.bind('<<TreeviewSelect>>', self.on_supplier_select)
         btn_frame = tb.Frame(frame)
@@ -1093,16 +950,13 @@ class AISApp(tb.Window):
         if not name:
             self.set_status('Please enter a name.', error=True)
             return
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        if self.supplier_edit_id:
-            c.execute('UPDATE suppliers SET name=?, contact=? WHERE id=?', (name, contact, self.supplier_edit_id))
-            self.set_status('Supplier updated.')
-        else:
-            c.execute('INSERT INTO suppliers (name, contact) VALUES (?, ?)', (name, contact))
-            self.set_status('Supplier added.')
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as c:
+            if self.supplier_edit_id:
+                c.execute('UPDATE suppliers SET name=?, contact=? WHERE id=?', (name, contact, self.supplier_edit_id))
+                self.set_status('Supplier updated.')
+            else:
+                c.execute('INSERT INTO suppliers (name, contact) VALUES (?, ?)', (name, contact))
+                self.set_status('Supplier added.')
         self.supplier_name_var.set('')
         self.supplier_contact_var.set('')
         self.supplier_edit_id = None
@@ -1128,11 +982,8 @@ class AISApp(tb.Window):
             messagebox.showwarning('Select Supplier', 'Select a supplier to delete.')
             return
         supp_id = self.suppliers_tree.item(selected[0])['values'][0]
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('DELETE FROM suppliers WHERE id=?', (supp_id,))
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as c:
+            c.execute('DELETE FROM suppliers WHERE id=?', (supp_id,))
         self.load_suppliers()
 
     def init_inventory_tab(self):
@@ -1169,7 +1020,7 @@ class AISApp(tb.Window):
         search_frame.pack(fill='x', padx=10, pady=5)
         tb.Label(search_frame, text='Search:').pack(side='left')
         self.inv_search_var = tb.StringVar()
-        self.inv_search_var.trace('w', lambda *args: self.load_inventory())
+        SearchController(self, self.inv_search_var, self.load_inventory)
         tb.Entry(search_frame, textvariable=self.inv_search_var, width=20).pack(side='left', padx=5)
         # Inventory list
         list_frame = tb.LabelFrame(frame, text='Inventory Items', style='Section.TLabel')
@@ -1194,6 +1045,8 @@ class AISApp(tb.Window):
         self.inventory_tree.pack(fill='both', expand=True, padx=5, pady=5)
         self.style_treeview(self.inventory_tree)
         self.inventory_tree.bind('<<TreeviewSelect>>', self.on_inventory_select)
+        self.inventory_grid = PagedTreeview(self.inventory_tree, self.worker, 'inventory',
+                                            format_row=self.format_inventory_row, on_error=self.show_db_error)
         # Buttons frame
         btn_frame = tb.Frame(frame)
         btn_frame.pack(pady=5)
@@ -1201,25 +1054,15 @@ class AISApp(tb.Window):
         self.load_inventory()
 
     def load_inventory(self):
-        for row in self.inventory_tree.get_children():
-            self.inventory_tree.delete(row)
-        search = self.inv_search_var.get().lower() if hasattr(self, 'inv_search_var') else ''
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('SELECT id, name, sku, quantity, cost, price FROM inventory ORDER BY name')
-        rows = c.fetchall()
-        filtered = [row for row in rows if search in str(row[1]).lower() or search in str(row[2]).lower()]
-        
+        search = self.inv_search_var.get() if hasattr(self, 'inv_search_var') else ''
+        where, params = search_filter(self.db, 'inventory', search, ('name', 'sku'))
+        self.inventory_grid.load(KeysetQuery('inventory', ('id', 'name', 'sku', 'quantity', 'cost', 'price'),
+                                             keys=('name', 'id'), where=where, params=params))
+
+    def format_inventory_row(self, row):
         # Calculate total value for each item
-        formatted_rows = []
-        for row in filtered:
-            total_value = row[3] * row[4]  # quantity * cost
-            formatted_row = list(row)
-            formatted_row.append(f'{total_value:.2f}')
-            formatted_rows.append(formatted_row)
-        
-        self.insert_treeview_rows(self.inventory_tree, formatted_rows)
-        conn.close()
+        total_value = row[3] * row[4]  # quantity * cost
+        return list(row) + [f'{total_value:.2f}']
 
     def init_purchases_tab(self):
         frame = self.tabs['Purchases']
@@ -1247,6 +1090,7 @@ class AISApp(tb.Window):
         self.purchases_tree.column('Supplier', width=150)
         self.purchases_tree.column('Total', width=100, anchor='e')
         self.purchases_tree.pack(pady=10, padx=10, fill='x')
+        self.purchases_view = KeyedTreeview(self.purchases_tree)
         self.style_treeview(self.purchases_tree)
         self.purchases_tree.bind('<<TreeviewSelect>>', self.on_purchase_select)
         tb.Button(frame, text='Delete Selected', style='Accent.TButton', command=self.delete_purchase).pack(pady=5)
@@ -1263,6 +1107,7 @@ class AISApp(tb.Window):
         self.purchase_items_tree.column('Quantity', width=80, anchor='e')
         self.purchase_items_tree.column('Cost', width=100, anchor='e')
         self.purchase_items_tree.pack(side='left', padx=5, pady=5)
+        self.purchase_items_view = KeyedTreeview(self.purchase_items_tree)
         self.style_treeview(self.purchase_items_tree)
         add_item_frame = tb.Frame(items_frame)
         add_item_frame.pack(side='left', padx=10)
@@ -1283,12 +1128,7 @@ class AISApp(tb.Window):
         self.load_purchases()
 
     def load_purchase_suppliers(self):
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('SELECT name FROM suppliers ORDER BY name')
-        suppliers = [row[0] for row in c.fetchall()]
-        self.purchase_supplier_cb['values'] = suppliers
-        conn.close()
+        self.purchase_supplier_cb['values'] = self.refs.names('suppliers')
 
     def add_purchase(self):
         date = self.purchase_date_var.get().strip()
@@ -1296,30 +1136,19 @@ class AISApp(tb.Window):
         if not date or not supplier_name:
             self.set_status('Please enter date and supplier.', error=True)
             return
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('SELECT id FROM suppliers WHERE name=?', (supplier_name,))
-        row = c.fetchone()
-        if not row:
+        supplier_id = self.refs.supplier_id(supplier_name)
+        if supplier_id is None:
             self.set_status('Supplier not found.', error=True)
-            conn.close()
             return
-        supplier_id = row[0]
-        c.execute('INSERT INTO purchases (date, supplier_id, total) VALUES (?, ?, 0)', (date, supplier_id))
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as c:
+            c.execute('INSERT INTO purchases (date, supplier_id, total) VALUES (?, ?, 0)', (date, supplier_id))
         self.purchase_date_var.set('')
         self.purchase_supplier_var.set('')
         self.load_purchases()
         self.set_status('Purchase added.')
 
     def load_purchase_items_inventory(self):
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('SELECT name FROM inventory ORDER BY name')
-        items = [row[0] for row in c.fetchall()]
-        self.purchase_item_cb['values'] = items
-        conn.close()
+        self.purchase_item_cb['values'] = self.refs.names('inventory')
 
     def on_purchase_select(self, event):
         selected = self.purchases_tree.selection()
@@ -1347,26 +1176,20 @@ class AISApp(tb.Window):
         except ValueError:
             Messagebox.show_warning('Input Error', 'Quantity and Cost must be numbers.')
             return
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('SELECT id FROM inventory WHERE name=?', (item_name,))
-        row = c.fetchone()
-        if not row:
+        item_id = self.refs.inventory_id(item_name)
+        if item_id is None:
             Messagebox.show_warning('Item Error', 'Inventory item not found.')
-            conn.close()
-            return
-        item_id = row[0]
-        # Add purchase item
-        c.execute('INSERT INTO purchase_items (purchase_id, inventory_id, quantity, cost) VALUES (?, ?, ?, ?)',
-                  (self.selected_purchase_id, item_id, qty_val, cost_val))
-        # Update inventory quantity
-        c.execute('UPDATE inventory SET quantity = quantity + ? WHERE id=?', (qty_val, item_id))
-        # Update purchase total
-        c.execute('SELECT SUM(quantity * cost) FROM purchase_items WHERE purchase_id=?', (self.selected_purchase_id,))
-        total = c.fetchone()[0] or 0.0
-        c.execute('UPDATE purchases SET total=? WHERE id=?', (total, self.selected_purchase_id))
-        conn.commit()
-        conn.close()
+            return
+        with self.db.transaction() as c:
+            # Add purchase item
+            c.execute('INSERT INTO purchase_items (purchase_id, inventory_id, quantity, cost) VALUES (?, ?, ?, ?)',
+                      (self.selected_purchase_id, item_id, qty_val, cost_val))
+            # Update inventory quantity
+            c.execute('UPDATE inventory SET quantity = quantity + ? WHERE id=?', (qty_val, item_id))
+            # Update purchase total
+            c.execute('SELECT SUM(quantity * cost) FROM purchase_items WHERE purchase_id=?', (self.selected_purchase_id,))
+            total = c.fetchone()[0] or 0.0
+            c.execute('UPDATE purchases SET total=? WHERE id=?', (total, self.selected_purchase_id))
         self.purchase_item_var.set('')
         self.purchase_qty_var.set('')
         self.purchase_cost_var.set('')
@@ -1375,17 +1198,14 @@ class AISApp(tb.Window):
         self.load_purchases()
 
     def load_purchase_items(self, purchase_id):
-        for row in self.purchase_items_tree.get_children():
-            self.purchase_items_tree.delete(row)
         if not purchase_id:
+            self.purchase_items_view.update([])
             return
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
+        c = self.db.cursor()
         c.execute('''SELECT pi.id, i.name, pi.quantity, pi.cost FROM purchase_items pi
                      JOIN inventory i ON pi.inventory_id = i.id WHERE pi.purchase_id=?''', (purchase_id,))
         rows = c.fetchall()
-        self.insert_treeview_rows(self.purchase_items_tree, rows)
-        conn.close()
+        self.purchase_items_view.update(self.keyed_rows(rows))
 
     def delete_purchase_item(self):
         selected = self.purchase_items_tree.selection()
@@ -1394,37 +1214,29 @@ class AISApp(tb.Window):
             return
         item_id = self.purchase_items_tree.item(selected[0])['values'][0]
         # Get quantity and inventory_id to update inventory
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('SELECT inventory_id, quantity FROM purchase_items WHERE id=?', (item_id,))
-        row = c.fetchone()
-        if not row:
-            conn.close()
-            return
-        inventory_id, qty = row
-        # Delete purchase item
-        c.execute('DELETE FROM purchase_items WHERE id=?', (item_id,))
-        # Update inventory quantity
-        c.execute('UPDATE inventory SET quantity = quantity - ? WHERE id=?', (qty, inventory_id))
-        # Update purchase total
-        c.execute('SELECT SUM(quantity * cost) FROM purchase_items WHERE purchase_id=?', (self.selected_purchase_id,))
-        total = c.fetchone()[0] or 0.0
-        c.execute('UPDATE purchases SET total=? WHERE id=?', (total, self.selected_purchase_id))
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as c:
+            c.execute('SELECT inventory_id, quantity FROM purchase_items WHERE id=?', (item_id,))
+            row = c.fetchone()
+            if not row:
+                return
+            inventory_id, qty = row
+            # Delete purchase item
+            c.execute('DELETE FROM purchase_items WHERE id=?', (item_id,))
+            # Update inventory quantity
+            c.execute('UPDATE inventory SET quantity = quantity - ? WHERE id=?', (qty, inventory_id))
+            # Update purchase total
+            c.execute('SELECT SUM(quantity * cost) FROM purchase_items WHERE purchase_id=?', (self.selected_purchase_id,))
+            total = c.fetchone()[0] or 0.0
+            c.execute('UPDATE purchases SET total=? WHERE id=?', (total, self.selected_purchase_id))
         self.load_purchase_items(self.selected_purchase_id)
         self.load_inventory()
         self.load_purchases()
 
     def load_purchases(self):
-        for row in self.purchases_tree.get_children():
-            self.purchases_tree.delete(row)
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
+        c = self.db.cursor()
         c.execute('''SELECT p.id, p.date, s.name, p.total FROM purchases p LEFT JOIN suppliers s ON p.supplier_id = s.id ORDER BY p.id''')
         rows = c.fetchall()
-        self.insert_treeview_rows(self.purchases_tree, rows)
-        conn.close()
+        self.purchases_view.update(self.keyed_rows(rows))
 
     def delete_purchase(self):
         selected = self.purchases_tree.selection()
@@ -1432,11 +1244,8 @@ class AISApp(tb.Window):
             messagebox.showwarning('Select Purchase', 'Select a purchase to delete.')
             return
         purchase_id = self.purchases_tree.item(selected[0])['values'][0]
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('DELETE FROM purchases WHERE id=?', (purchase_id,))
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as c:
+            c.execute('DELETE FROM purchases WHERE id=?', (purchase_id,))
         self.load_purchases()
 
     def init_expenses_tab(self):
@@ -1465,7 +1274,7 @@ class AISApp(tb.Window):
         search_frame.pack(pady=(0, 5), padx=10, anchor='w')
         tb.Label(search_frame, text='Search:').pack(side='left')
         self.expense_search_var = tb.StringVar()
-        self.expense_search_var.trace('w', lambda *args: self.load_expenses())
+        SearchController(self, self.expense_search_var, self.load_expenses)
         tb.Entry(search_frame, textvariable=self.expense_search_var, width=20).pack(side='left', padx=5)
         self.expenses_tree = tb.Treeview(frame, columns=('ID', 'Date', 'Type', 'Amount', 'Description'), show='headings', height=12, selectmode='browse')
         self.expenses_tree.heading('ID', text='ID')
@@ -1481,6 +1290,7 @@ class AISApp(tb.Window):
         self.expenses_tree.pack(pady=10, padx=10, fill='x')
         self.style_treeview(self.expenses_tree)
         self.expenses_tree.bind('<<TreeviewSelect>>', self.on_expense_select)
+        self.expenses_grid = PagedTreeview(self.expenses_tree, self.worker, 'expenses', on_error=self.show_db_error)
         btn_frame = tb.Frame(frame)
         btn_frame.pack(pady=5)
         tb.Button(btn_frame, text='Delete Selected', style='Accent.TButton', command=self.delete_expense).grid(row=0, column=0, padx=5)
@@ -1499,16 +1309,13 @@ class AISApp(tb.Window):
         except ValueError:
             self.set_status('Amount must be a number.', error=True)
             return
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        if self.expense_edit_id:
-            c.execute('UPDATE expenses SET date=?, type=?, amount=?, description=? WHERE id=?', (date, typ, amount_val, desc, self.expense_edit_id))
-            self.set_status('Expense updated.')
-        else:
-            c.execute('INSERT INTO expenses (date, type, amount, description) VALUES (?, ?, ?, ?)', (date, typ, amount_val, desc))
-            self.set_status('Expense added.')
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as c:
+            if self.expense_edit_id:
+                c.execute('UPDATE expenses SET date=?, type=?, amount=?, description=? WHERE id=?', (date, typ, amount_val, desc, self.expense_edit_id))
+                self.set_status('Expense updated.')
+            else:
+                c.execute('INSERT INTO expenses (date, type, amount, description) VALUES (?, ?, ?, ?)', (date, typ, amount_val, desc))
+                self.set_status('Expense added.')
         self.expense_date_var.set('')
         self.expense_type_var.set('')
         self.expense_amount_var.set('')
@@ -1533,16 +1340,10 @@ class AISApp(tb.Window):
         self.expense_desc_var.set(item[4])
 
     def load_expenses(self):
-        for row in self.expenses_tree.get_children():
-            self.expenses_tree.delete(row)
-        search = self.expense_search_var.get().lower() if hasattr(self, 'expense_search_var') else ''
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('SELECT id, date, type, amount, description FROM expenses ORDER BY id')
-        rows = c.fetchall()
-        filtered = [row for row in rows if search in str(row[1]).lower() or search in str(row[2]).lower() or search in str(row[4]).lower()]
-        self.insert_treeview_rows(self.expenses_tree, filtered)
-        conn.close()
+        search = self.expense_search_var.get() if hasattr(self, 'expense_search_var') else ''
+        where, params = search_filter(self.db, 'expenses', search, ('date', 'type', 'description'))
+        self.expenses_grid.load(KeysetQuery('expenses', ('id', 'date', 'type', 'amount', 'description'),
+                                            where=where, params=params))
 
     def delete_expense(self):
         selected = self.expenses_tree.selection()
@@ -1550,11 +1351,8 @@ class AISApp(tb.Window):
             self.set_status('Select an expense to delete.', error=True)
             return
         expense_id = self.expenses_tree.item(selected[0])['values'][0]
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('DELETE FROM expenses WHERE id=?', (expense_id,))
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as c:
+            c.execute('DELETE FROM expenses WHERE id=?', (expense_id,))
         self.load_expenses()
         self.set_status('Expense deleted.')
 
@@ -1580,6 +1378,22 @@ class AISApp(tb.Window):
         tb.Label(date_frame, text='To:').pack(side='left', padx=5)
         self.report_to_var = tb.StringVar()
         tb.Entry(date_frame, textvariable=self.report_to_var, width=12).pack(side='left', padx=5)
+        # Period close
+        close_frame = tb.Frame(frame)
+        close_frame.pack(pady=5, padx=10, fill='x')
+        tb.Label(close_frame, text='Close Period:').pack(side='left', padx=5)
+        self.close_type_var = tb.StringVar(value='month')
+        tb.Combobox(close_frame, textvariable=self.close_type_var, values=PERIOD_TYPES, state='readonly', width=8).pack(side='left', padx=5)
+        tb.Button(close_frame, text='Close Period Ending at To', command=self.close_report_period).pack(side='left', padx=5)
+        self.close_status_var = tb.StringVar()
+        tb.Label(close_frame, textvariable=self.close_status_var).pack(side='left', padx=10)
+        # Export to file
+        export_frame = tb.Frame(frame)
+        export_frame.pack(pady=5, padx=10, fill='x')
+        tb.Label(export_frame, text='Export:').pack(side='left', padx=5)
+        self.export_type_var = tb.StringVar(value='journal')
+        tb.Combobox(export_frame, textvariable=self.export_type_var, values=list(EXPORTS), state='readonly', width=16).pack(side='left', padx=5)
+        tb.Button(export_frame, text='Export From/To...', command=self.export_report_file).pack(side='left', padx=5)
         # Generate button
         tb.Button(frame, text='Generate Report', style='Accent.TButton', command=self.show_report).pack(pady=5)
         # Report display area (set monospace font)
@@ -1589,6 +1403,7 @@ class AISApp(tb.Window):
         today = datetime.datetime.now()
         self.report_from_var.set((today - datetime.timedelta(days=30)).strftime('%Y-%m-%d'))
         self.report_to_var.set(today.strftime('%Y-%m-%d'))
+        self.update_close_status()
 
     def show_report(self):
         report_type = self.report_type_var.get()
@@ -1605,427 +1420,95 @@ class AISApp(tb.Window):
         elif report_type == 'Trial Balance':
             self.show_trial_balance()
 
-    def show_income_statement(self):
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        from_date = self.report_from_var.get()
-        to_date = self.report_to_var.get()
-        # Get total revenues (Income accounts)
-        c.execute('SELECT SUM(credit) - SUM(debit) FROM journal_lines WHERE account_id IN (SELECT id FROM accounts WHERE type="Income")')
-        total_revenue = c.fetchone()[0] or 0.0
-        # Get total operating expenses (Expense accounts, excluding Income Tax)
-        c.execute('''
-            SELECT SUM(debit) - SUM(credit) FROM journal_lines jl
-            JOIN accounts a ON jl.account_id = a.id
-            WHERE a.type = "Expense" AND a.name NOT LIKE '%Income Tax%'
-        ''')
-        total_expenses = c.fetchone()[0] or 0.0
-        # Get income tax (if any)
-        c.execute('''
-            SELECT SUM(debit) - SUM(credit) FROM journal_lines jl
-            JOIN accounts a ON jl.account_id = a.id
-            WHERE a.type = "Expense" AND a.name LIKE '%Income Tax%'
-        ''')
-        income_tax = c.fetchone()[0] or 0.0
-        # Net income before tax
-        income_before_tax = total_revenue - total_expenses
-        # Net income after tax
-        net_income = income_before_tax - income_tax
-        lines = []
-        lines.append('=' * 80)
-        lines.append('INCOME STATEMENT'.center(80))
-        lines.append('=' * 80)
-        lines.append(f'For the period: {from_date} to {to_date}'.center(80))
-        lines.append('=' * 80 + '\n')
-        lines.append('REVENUE')
-        lines.append('-' * 80)
-        lines.append(f'{"Description":<40}{"Amount":>30}')
-        lines.append(f'{"Total Revenue":<40}{total_revenue:>30.2f}\n')
-        lines.append('EXPENSES')
-        lines.append('-' * 80)
-        lines.append(f'{"Description":<40}{"Amount":>30}')
-        lines.append(f'{"Total Expenses":<40}{total_expenses:>30.2f}\n')
-        lines.append('NET INCOME')
-        lines.append('-' * 80)
-        lines.append(f'{"Net Income":<40}{net_income:>30.2f}\n')
-        lines.append('=' * 80)
-        lines.append('End of Income Statement'.center(80))
-        lines.append('=' * 80)
-        self.report_text.delete('1.0', tb.END)
-        self.report_text.insert(tb.END, '\n'.join(lines))
+    def run_report(self, build):
+        # Reads the period on the Tk thread, then builds the report lines on
+        # the query worker; a newer report request supersedes this one.
+        period = self.get_report_period()
+        if period is None:
+            return
 
-    def show_balance_sheet(self):
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        
-        # Get date range
-        from_date = self.report_from_var.get()
-        to_date = self.report_to_var.get()
-        
-        # Get current assets (cash, accounts receivable, inventory)
-        c.execute('''
-            SELECT a.name, SUM(jl.debit), SUM(jl.credit)
-            FROM journal_lines jl
-            JOIN accounts a ON jl.account_id = a.id
-            WHERE a.type = 'Asset' 
-            AND a.name IN ('Cash', 'Bank', 'Accounts Receivable', 'Inventory')
-            GROUP BY a.name
-            ORDER BY CASE a.name
-                WHEN 'Cash' THEN 1
-                WHEN 'Bank' THEN 2
-                WHEN 'Accounts Receivable' THEN 3
-                WHEN 'Inventory' THEN 4
-            END
-        ''')
-        current_assets = c.fetchall()
-        
-        # Get fixed assets (equipment, etc.)
-        c.execute('''
-            SELECT a.name, SUM(jl.debit), SUM(jl.credit)
-            FROM journal_lines jl
-            JOIN accounts a ON jl.account_id = a.id
-            WHERE a.type = 'Asset' 
-            AND a.name NOT IN ('Cash', 'Bank', 'Accounts Receivable', 'Inventory')
-            GROUP BY a.name
-            ORDER BY a.name
-        ''')
-        fixed_assets = c.fetchall()
-        
-        # Get current liabilities
-        c.execute('''
-            SELECT a.name, SUM(jl.debit), SUM(jl.credit)
-            FROM journal_lines jl
-            JOIN accounts a ON jl.account_id = a.id
-            WHERE a.type = 'Liability' 
-            AND a.name = 'Accounts Payable'
-            GROUP BY a.name
-            ORDER BY a.name
-        ''')
-        current_liabilities = c.fetchall()
-        
-        # Get long-term liabilities
-        c.execute('''
-            SELECT a.name, SUM(jl.debit), SUM(jl.credit)
-            FROM journal_lines jl
-            JOIN accounts a ON jl.account_id = a.id
-            WHERE a.type = 'Liability' 
-            AND a.name != 'Accounts Payable'
-            GROUP BY a.name
-            ORDER BY a.name
-        ''')
-        long_term_liabilities = c.fetchall()
-        
-        # Get equity accounts
-        c.execute('''
-            SELECT a.name, SUM(jl.debit), SUM(jl.credit)
-            FROM journal_lines jl
-            JOIN accounts a ON jl.account_id = a.id
-            WHERE a.type = 'Equity'
-            GROUP BY a.name
-            ORDER BY a.name
-        ''')
-        equity = c.fetchall()
-        
-        # Calculate totals
-        total_current_assets = sum((debit or 0) - (credit or 0) for _, debit, credit in current_assets)
-        total_fixed_assets = sum((debit or 0) - (credit or 0) for _, debit, credit in fixed_assets)
-        total_assets = total_current_assets + total_fixed_assets
-        
-        total_current_liabilities = sum((credit or 0) - (debit or 0) for _, debit, credit in current_liabilities)
-        total_long_term_liabilities = sum((credit or 0) - (debit or 0) for _, debit, credit in long_term_liabilities)
-        total_liabilities = total_current_liabilities + total_long_term_liabilities
-        
-        total_equity = sum((credit or 0) - (debit or 0) for _, debit, credit in equity)
-        
-        lines = []
-        # Header
-        lines.append('=' * 80)
-        lines.append('BALANCE SHEET'.center(80))
-        lines.append('=' * 80)
-        lines.append(f'As of: {to_date}'.center(80))
-        lines.append('=' * 80 + '\n')
-        
-        # Assets Section
-        lines.append('ASSETS')
-        lines.append('-' * 80)
-        
-        # Current Assets
-        lines.append('Current Assets:')
-        for name, debit, credit in current_assets:
-            balance = (debit or 0) - (credit or 0)
-            lines.append(f'  {name:<28} {balance:>12.2f}')
-        lines.append('-' * 80)
-        lines.append(f'Total Current Assets: {total_current_assets:>12.2f}\n')
-        
-        # Fixed Assets
-        lines.append('Fixed Assets:')
-        for name, debit, credit in fixed_assets:
-            balance = (debit or 0) - (credit or 0)
-            lines.append(f'  {name:<28} {balance:>12.2f}')
-        lines.append('-' * 80)
-        lines.append(f'Total Fixed Assets: {total_fixed_assets:>12.2f}')
-        lines.append('-' * 80)
-        lines.append(f'Total Assets: {total_assets:>12.2f}\n')
-        
-        # Liabilities Section
-        lines.append('LIABILITIES')
-        lines.append('-' * 80)
-        
-        # Current Liabilities
-        lines.append('Current Liabilities:')
-        for name, debit, credit in current_liabilities:
-            balance = (credit or 0) - (debit or 0)
-            lines.append(f'  {name:<28} {balance:>12.2f}')
-        lines.append('-' * 80)
-        lines.append(f'Total Current Liabilities: {total_current_liabilities:>12.2f}\n')
-        
-        # Long-term Liabilities
-        lines.append('Long-term Liabilities:')
-        for name, debit, credit in long_term_liabilities:
-            balance = (credit or 0) - (debit or 0)
-            lines.append(f'  {name:<28} {balance:>12.2f}')
-        lines.append('-' * 80)
-        lines.append(f'Total Long-term Liabilities: {total_long_term_liabilities:>12.2f}')
-        lines.append('-' * 80)
-        lines.append(f'Total Liabilities: {total_liabilities:>12.2f}\n')
-        
-        # Equity Section
-        lines.append('EQUITY')
-        lines.append('-' * 80)
-        for name, debit, credit in equity:
-            balance = (credit or 0) - (debit or 0)
-            lines.append(f'{name:<30} {balance:>12.2f}')
-        lines.append('-' * 80)
-        lines.append(f'Total Equity: {total_equity:>12.2f}\n')
-        
-        # Total Liabilities and Equity
-        lines.append('TOTAL LIABILITIES AND EQUITY')
-        lines.append('-' * 80)
-        lines.append(f'Total: {total_liabilities + total_equity:>12.2f}')
-        
-        # Footer
-        lines.append('\n' + '=' * 80)
-        lines.append('End of Balance Sheet'.center(80))
-        lines.append('=' * 80)
-        
+        def job():
+            # Recompute any snapshot invalidated by a back-dated entry first.
+            # That is a write, so the writer thread does it: superseding the
+            # report interrupts this job's connection, not the recompute.
+            refreshed = []
+            if has_stale_closes(self.db):
+                refreshed = self.writes.call(refresh_period_closes, self.db)
+            return refreshed, build(self.db, *period)
+
+        self.set_status('Generating report...')
+        self.worker.submit('report', job, self.display_report, self.report_failed)
+
+    def display_report(self, result):
+        refreshed, lines = result
         self.report_text.delete('1.0', tb.END)
         self.report_text.insert(tb.END, '\n'.join(lines))
+        if refreshed:
+            self.update_close_status()
+            self.set_status(f'Recomputed {len(refreshed)} period close snapshot(s).')
+        else:
+            self.set_status('Report generated.')
 
-    def show_cash_flow_statement(self):
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        from_date = self.report_from_var.get()
-        to_date = self.report_to_var.get()
-
-        # Net Income
-        c.execute('''
-            SELECT SUM(credit) - SUM(debit) FROM journal_lines
-            WHERE account_id IN (SELECT id FROM accounts WHERE type="Income")
-        ''')
-        total_income = c.fetchone()[0] or 0.0
-        c.execute('''
-            SELECT SUM(debit) - SUM(credit) FROM journal_lines
-            WHERE account_id IN (SELECT id FROM accounts WHERE type="Expense")
-        ''')
-        total_expenses = c.fetchone()[0] or 0.0
-        net_income = total_income - total_expenses
+    def report_failed(self, error):
+        if isinstance(error, sqlite3.Error):
+            self.set_status(f"Database error: {str(error)}", error=True)
+            Messagebox.show_error('Database Error', f'An error occurred while generating the report: {str(error)}')
+        else:
+            self.set_status(f"Error: {str(error)}", error=True)
+            Messagebox.show_error('Error', f'An error occurred while generating the report: {str(error)}')
 
-        # Depreciation & Amortization
-        c.execute('''
-            SELECT SUM(debit) FROM journal_lines jl
-            JOIN accounts a ON jl.account_id = a.id
-            WHERE a.name LIKE '%Depreciation%' OR a.name LIKE '%Amortization%'
-        ''')
-        depreciation = c.fetchone()[0] or 0.0
-
-        # Changes in Working Capital
-        def get_change(account_name):
-            c.execute('''
-                SELECT SUM(debit) - SUM(credit) FROM journal_lines jl
-                JOIN accounts a ON jl.account_id = a.id
-                WHERE a.name = ?
-            ''', (account_name,))
-            return c.fetchone()[0] or 0.0
-
-        change_ar = get_change('Accounts Receivable')
-        change_inv = get_change('Inventory')
-        change_ap = get_change('Accounts Payable')
-        change_wages = get_change('Salaries and Wages Payable')
-        change_gift_card = 0.0  # Decorative, unless you have such an account
-
-        # Correct cash flow logic:
-        net_operating = (
-            net_income
-            + depreciation
-            - change_ar      # AR: increase is negative, decrease is positive
-            - change_inv     # Inventory: increase is negative, decrease is positive
-            + change_ap      # AP: increase is positive, decrease is negative
-            + change_wages   # Wages Payable: increase is positive, decrease is negative
-            + change_gift_card
-        )
-
-        # For reporting, only show nonzero changes, with correct sign and label
-        lines = []
-        lines.append('CASH FLOWS FROM OPERATING ACTIVITIES')
-        lines.append(f'Net Income{"":.<40}{net_income:>10,.0f}')
-        lines.append('Adjustments:')
-        lines.append(f'+ Depreciation & Amortization{"":.<25}{depreciation:>10,.0f}')
-        lines.append('Changes in Working Capital:')
-        # AR
-        if change_ar > 0:
-            lines.append(f'- Increase in Accounts Receivable{"":.<15}{change_ar:>10,.0f}')
-        elif change_ar < 0:
-            lines.append(f'+ Decrease in Accounts Receivable{"":.<15}{-change_ar:>10,.0f}')
-        # Inventory
-        if change_inv > 0:
-            lines.append(f'- Increase in Inventory{"":.<23}{change_inv:>10,.0f}')
-        elif change_inv < 0:
-            lines.append(f'+ Decrease in Inventory{"":.<23}{-change_inv:>10,.0f}')
-        # AP
-        if change_ap > 0:
-            lines.append(f'+ Increase in Accounts Payable{"":.<17}{change_ap:>10,.0f}')
-        elif change_ap < 0:
-            lines.append(f'- Decrease in Accounts Payable{"":.<17}{-change_ap:>10,.0f}')
-        # Wages Payable
-        if change_wages > 0:
-            lines.append(f'+ Increase in Accrued Wages Payable{"":.<7}{change_wages:>10,.0f}')
-        elif change_wages < 0:
-            lines.append(f'- Decrease in Accrued Wages Payable{"":.<7}{-change_wages:>10,.0f}')
-        # Gift Card
-        if change_gift_card != 0:
-            if change_gift_card > 0:
-                lines.append(f'+ Increase in Gift Card Liability{"":.<11}{change_gift_card:>10,.0f}')
-            else:
-                lines.append(f'- Decrease in Gift Card Liability{"":.<11}{-change_gift_card:>10,.0f}')
-        lines.append(f'Net Cash Provided by Operating Activities{"":.<2}{net_operating:>10,.0f}\n')
-
-        # Investing Activities (decorative if not present)
-        purchase_equipment = -abs(get_change('Equipment'))  # Negative for purchase
-        sale_equipment = abs(get_change('Equipment'))  # Positive for sale
-        net_investing = purchase_equipment + sale_equipment
-
-        # Financing Activities (decorative if not present)
-        proceeds_loan = 0.0  # Decorative
-        repayment_loan = 0.0  # Decorative
-        owner_distribution = 0.0  # Decorative
-        net_financing = proceeds_loan + repayment_loan + owner_distribution
-
-        # Cash summary
-        c.execute('SELECT SUM(debit) - SUM(credit) FROM journal_lines jl JOIN accounts a ON jl.account_id = a.id WHERE a.name = "Cash"')
-        cash_end = c.fetchone()[0] or 0.0
-        cash_begin = cash_end - (net_operating + net_investing + net_financing)
-        net_increase = cash_end - cash_begin
-
-        lines.append('CASH FLOWS FROM INVESTING ACTIVITIES')
-        lines.append(f'- Purchase of New Equipment{"":.<22}{purchase_equipment:>10,.0f}')
-        lines.append(f'+ Proceeds from Sale of Equipment{"":.<13}{sale_equipment:>10,.0f}')
-        lines.append(f'Net Cash Provided by Investing Activities{"":.<5}{net_investing:>10,.0f}\n')
-
-        lines.append('CASH FLOWS FROM FINANCING ACTIVITIES')
-        lines.append(f'+ Proceeds from Line of Credit Drawdown{"":.<4}{proceeds_loan:>10,.0f}')
-        lines.append(f'- Repayment of Equipment Loan Principal{"":.<2}{repayment_loan:>10,.0f}')
-        lines.append(f'- Owner Distribution{"":.<28}{owner_distribution:>10,.0f}')
-        lines.append(f'Net Cash Provided by Financing Activities{"":.<5}{net_financing:>10,.0f}\n')
-
-        lines.append(f'NET INCREASE IN CASH{"":.<32}{net_increase:>10,.0f}')
-        lines.append(f'CASH AT BEGINNING OF PERIOD{"":.<23}{cash_begin:>10,.0f}')
-        lines.append(f'CASH AT END OF PERIOD{"":.<28}{cash_end:>10,.0f}')
+    def export_report_file(self):
+        name = self.export_type_var.get()
+        period = self.get_report_period()
+        if not name or period is None:
+            return
+        path = filedialog.asksaveasfilename(title='Export Report', initialfile=f'{name}.csv', defaultextension='.csv',
+                                            filetypes=[('CSV', '*.csv'), ('JSON lines', '*.jsonl'), ('JSON', '*.json'), ('All files', '*.*')])
+        if not path:
+            return
+        self.set_status('Exporting...')
+        self.worker.submit('export', lambda: export_file(self.db, name, path, None, *period),
+                           lambda count: self.set_status(f'Exported {count} rows to {path}.'), self.report_failed)
 
-        self.report_text.delete('1.0', tb.END)
-        self.report_text.insert(tb.END, '\n'.join(lines))
+    def get_report_period(self):
+        try:
+            return (parse_report_date(self.report_from_var.get()),
+                    parse_report_date(self.report_to_var.get()))
+        except ValueError:
+            Messagebox.show_warning('Input Error', 'Report dates must be in YYYY-MM-DD format.')
+            return None
 
-    def show_trial_balance(self):
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        from_date = self.report_from_var.get()
-        to_date = self.report_to_var.get()
-        # List of accounts in the order from the image
-        account_list = [
-            'Cash',
-            'Accounts Receivable',
-            'Supplies',
-            'Prepaid Insurance',
-            'Equipment',
-            'Accumulated Depreciation—Equipment',
-            'Notes Payable',
-            'Accounts Payable',
-            'Unearned Service Revenue',
-            'Salaries and Wages Payable',
-            'Interest Payable',
-            'Common Stock',
-            'Retained Earnings',
-            'Dividends',
-            'Service Revenue',
-            'Salaries and Wages Expense',
-            'Supplies Expense',
-            'Rent Expense',
-            'Insurance Expense',
-            'Interest Expense',
-            'Depreciation Expense',
-        ]
-        # Get all balances from the database
-        c.execute('''
-            SELECT a.name, SUM(jl.debit), SUM(jl.credit)
-            FROM accounts a
-            LEFT JOIN journal_lines jl ON a.id = jl.account_id
-            GROUP BY a.name
-        ''')
-        balances = {row[0]: (row[1] or 0.0, row[2] or 0.0) for row in c.fetchall()}
-        conn.close()
-        # Table column widths
-        col1 = 36  # Account
-        col2 = 18  # Debit
-        col3 = 18  # Credit
-        sep = ' | '
-        # Header
-        lines = []
-        lines.append('=' * (col1 + col2 + col3 + 2 * len(sep)))
-        lines.append('ADJUSTED TRIAL BALANCE'.center(col1 + col2 + col3 + 2 * len(sep)))
-        lines.append('=' * (col1 + col2 + col3 + 2 * len(sep)))
-        lines.append(f'{"Account":<{col1}}{sep}{"Debit":>{col2}}{sep}{"Credit":>{col3}}')
-        lines.append('-' * (col1 + col2 + col3 + 2 * len(sep)))
-        total_debit = 0.0
-        total_credit = 0.0
-        for acc in account_list:
-            debit, credit = balances.get(acc, (0.0, 0.0))
-            # Net balance logic: asset/expense/dividend = debit, liability/equity/revenue = credit
-            # For accumulated depreciation, treat as credit (contra-asset)
-            if acc == 'Accumulated Depreciation—Equipment':
-                net = credit - debit
-            else:
-                net = debit - credit
-            debit_val = net if net > 0 else 0.0
-            credit_val = -net if net < 0 else 0.0
-            total_debit += debit_val
-            total_credit += credit_val
-            lines.append(f'{acc:<{col1}}{sep}{debit_val:>{col2}.2f}{sep}{credit_val:>{col3}.2f}')
-        lines.append('-' * (col1 + col2 + col3 + 2 * len(sep)))
-        lines.append(f'{"TOTALS":<{col1}}{sep}{total_debit:>{col2}.2f}{sep}{total_credit:>{col3}.2f}')
-        
-        # Add verification message
-        if abs(total_debit - total_credit) < 0.01:  # Using small epsilon for floating point comparison
-            lines.append('\nVERIFICATION: Debits equal Credits ✓')
+    def close_report_period(self):
+        try:
+            to_date = parse_report_date(self.report_to_var.get())
+            if to_date is None:
+                raise ValueError('Enter a To date inside the period to close.')
+            end_date = period_end(to_date, self.close_type_var.get())
+            self.writes.call(self.refresh_and_close_period, end_date, self.close_type_var.get())
+        except ValueError as e:
+            Messagebox.show_warning('Period Close', str(e))
+            return
+        self.update_close_status()
+        self.set_status(f'Closed {self.close_type_var.get()} ending {end_date}.')
+
+    def refresh_and_close_period(self, end_date, period_type):
+        refresh_period_closes(self.db)
+        close_period(self.db, end_date, period_type)
+
+    def update_close_status(self):
+        row = self.db.query_one('SELECT MAX(period_end), SUM(stale) FROM period_closes')
+        if row[0] is None:
+            self.close_status_var.set('No closed periods')
         else:
-            lines.append('\nVERIFICATION: Debits do not equal Credits! ✗')
-            lines.append(f'Difference: {abs(total_debit - total_credit):.2f}')
-        
-        lines.append('=' * (col1 + col2 + col3 + 2 * len(sep)))
-        lines.append('End of Adjusted Trial Balance'.center(col1 + col2 + col3 + 2 * len(sep)))
-        lines.append('=' * (col1 + col2 + col3 + 2 * len(sep)))
-        self.report_text.delete('1.0', tb.END)
-        self.report_text.insert(tb.END, '\n'.join(lines))
+            stale = f' ({row[1]} stale)' if row[1] else ''
+            self.close_status_var.set(f'Last close: {row[0]}{stale}')
 
-    def load_suppliers(self):
-        for row in self.suppliers_tree.get_children():
-            self.suppliers_tree.delete(row)
-        search = self.supplier_search_var.get().lower() if hasattr(self, 'supplier_search_var') else ''
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('SELECT id, name, contact FROM suppliers ORDER BY id')
-        rows = c.fetchall()
-        filtered = [row for row in rows if search in str(row[1]).lower() or search in str(row[2]).lower()]
-        self.insert_treeview_rows(self.suppliers_tree, filtered)
-        conn.close()
+    def load_suppliers(self, incremental=False):
+        search = self.supplier_search_var.get() if hasattr(self, 'supplier_search_var') else ''
+        self.supplier_search.run(search, self.fill_suppliers, incremental)
+
+    def fill_suppliers(self, rows):
+        self.suppliers_view.update(self.keyed_rows(rows))
 
     def delete_inventory_item(self):
         selected = self.inventory_tree.selection()
@@ -2033,11 +1516,8 @@ class AISApp(tb.Window):
             self.set_status('Select an inventory item to delete.', error=True)
             return
         item_id = self.inventory_tree.item(selected[0])['values'][0]
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('DELETE FROM inventory WHERE id=?', (item_id,))
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as c:
+            c.execute('DELETE FROM inventory WHERE id=?', (item_id,))
         self.load_inventory()
         self.set_status('Inventory item deleted.')
 
@@ -2092,11 +1572,15 @@ class AISApp(tb.Window):
         search_frame.pack(pady=(0, 5), padx=10, anchor='w')
         tb.Label(search_frame, text='Search:').pack(side='left')
         self.menu_search_var = tb.StringVar()
-        self.menu_search_var.trace('w', lambda *args: self.load_menu_items())
+        self.menu_search = IncrementalSearch(
+            self.worker, 'menu_search',
+            self.fetch_menu_items,
+            (1, 2), on_error=self.show_db_error)
+        SearchController(self, self.menu_search_var, lambda: self.load_menu_items(incremental=True))
         tb.Entry(search_frame, textvariable=self.menu_search_var, width=20).pack(side='left', padx=5)
         
         # Menu Items Treeview
-        self.menu_tree = tb.Treeview(frame, columns=('ID', 'Name', 'Description', 'Price', 'Category', 'Prep Time', 'Available'), 
+        self.menu_tree = tb.Treeview(frame, columns=('ID', 'Name', 'Description', 'Price', 'Category', 'Prep Time', 'Available', 'Cost', 'Food Cost'), 
                                    show='headings', height=12)
         self.menu_tree.heading('ID', text='ID')
         self.menu_tree.heading('Name', text='Name')
@@ -2105,6 +1589,8 @@ class AISApp(tb.Window):
         self.menu_tree.heading('Category', text='Category')
         self.menu_tree.heading('Prep Time', text='Prep Time')
         self.menu_tree.heading('Available', text='Available')
+        self.menu_tree.heading('Cost', text='Cost')
+        self.menu_tree.heading('Food Cost', text='Food Cost %')
         
         self.menu_tree.column('ID', width=40, anchor='center')
         self.menu_tree.column('Name', width=150)
@@ -2113,8 +1599,11 @@ class AISApp(tb.Window):
         self.menu_tree.column('Category', width=100)
         self.menu_tree.column('Prep Time', width=80, anchor='center')
         self.menu_tree.column('Available', width=80, anchor='center')
+        self.menu_tree.column('Cost', width=80, anchor='e')
+        self.menu_tree.column('Food Cost', width=90, anchor='e')
         
         self.menu_tree.pack(pady=10, padx=10, fill='x')
+        self.menu_view = KeyedTreeview(self.menu_tree)
         self.style_treeview(self.menu_tree)
         self.menu_tree.bind('<<TreeviewSelect>>', self.on_menu_item_select)
         
@@ -2139,20 +1628,16 @@ class AISApp(tb.Window):
         except ValueError:
             Messagebox.show_warning('Input Error', 'Price and preparation time must be numbers.')
             return
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('''INSERT INTO menu_items (name, description, price, category, preparation_time, is_available)
-                    VALUES (?, ?, ?, ?, ?, ?)''', 
-                    (name, desc, price_val, category, prep_time_val, 1 if available else 0))
-        # Automatically create inventory item if not exists
-        c.execute('SELECT id FROM inventory WHERE name=?', (name,))
-        if not c.fetchone():
-            sku = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-            quantity = random.randint(1, 100)
-            cost = round(random.uniform(1.0, 100.0), 2)
-            c.execute('INSERT INTO inventory (name, sku, quantity, cost, price) VALUES (?, ?, ?, ?, ?)', (name, sku, quantity, cost, price_val))
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as c:
+            c.execute('''INSERT INTO menu_items (name, description, price, category, preparation_time, is_available)
+                        VALUES (?, ?, ?, ?, ?, ?)''', 
+                        (name, desc, price_val, category, prep_time_val, 1 if available else 0))
+            # Automatically create inventory item if not exists
+            if self.refs.inventory_id(name) is None:
+                sku = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
+                quantity = random.randint(1, 100)
+                cost = round(random.uniform(1.0, 100.0), 2)
+                c.execute('INSERT INTO inventory (name, sku, quantity, cost, price) VALUES (?, ?, ?, ?, ?)', (name, sku, quantity, cost, price_val))
         self.clear_menu_form()
         self.load_menu_items()
         self.set_status('Menu item added successfully.')
@@ -2183,14 +1668,11 @@ class AISApp(tb.Window):
             Messagebox.show_warning('Input Error', 'Price and preparation time must be numbers.')
             return
             
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('''UPDATE menu_items 
-                    SET name=?, description=?, price=?, category=?, preparation_time=?, is_available=?
-                    WHERE id=?''', 
-                    (name, desc, price_val, category, prep_time_val, 1 if available else 0, item_id))
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as c:
+            c.execute('''UPDATE menu_items 
+                        SET name=?, description=?, price=?, category=?, preparation_time=?, is_available=?
+                        WHERE id=?''', 
+                        (name, desc, price_val, category, prep_time_val, 1 if available else 0, item_id))
         
         self.clear_menu_form()
         self.load_menu_items()
@@ -2206,11 +1688,8 @@ class AISApp(tb.Window):
             return
             
         item_id = self.menu_tree.item(selected[0])['values'][0]
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('DELETE FROM menu_items WHERE id=?', (item_id,))
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as c:
+            c.execute('DELETE FROM menu_items WHERE id=?', (item_id,))
         
         self.clear_menu_form()
         self.load_menu_items()
@@ -2237,26 +1716,30 @@ class AISApp(tb.Window):
         self.menu_prep_time_var.set('')
         self.menu_available_var.set(True)
 
-    def load_menu_items(self):
-        for row in self.menu_tree.get_children():
-            self.menu_tree.delete(row)
-            
-        search = self.menu_search_var.get().lower() if hasattr(self, 'menu_search_var') else ''
-        
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('SELECT id, name, description, price, category, preparation_time, is_available FROM menu_items ORDER BY category, name')
-        rows = c.fetchall()
-        
-        filtered = [row for row in rows if search in str(row[1]).lower() or search in str(row[2]).lower()]
-        
-        for row in filtered:
+    def load_menu_items(self, incremental=False):
+        search = self.menu_search_var.get() if hasattr(self, 'menu_search_var') else ''
+        self.menu_search.run(search, self.fill_menu_items, incremental)
+
+    def fetch_menu_items(self, search):
+        rows = search_rows(self.db, 'menu_items',
+                           ('id', 'name', 'description', 'price', 'category', 'preparation_time', 'is_available'),
+                           search, ('name', 'description'), order_by='category, name')
+        # Recipe costs are precomputed, so this is one lookup for the whole list
+        costs = dict(self.db.query('SELECT menu_item_id, unit_cost FROM menu_item_costs'))
+        return [tuple(row) + (costs.get(row[0], 0.0),) for row in rows]
+
+    def fill_menu_items(self, rows):
+        items = []
+        for row in rows:
             values = list(row)
             values[3] = f'{values[3]:.2f}'  # Format price
             values[6] = 'Yes' if values[6] else 'No'  # Convert available to Yes/No
-            self.menu_tree.insert('', 'end', values=values)
+            cost, price = row[7], row[3] or 0
+            values[7] = f'{cost:.2f}'
+            values.append(f'{cost / price * 100:.1f}%' if price else '')
+            items.append((row[0], values, ()))
+        self.menu_view.update(items)
             
-        conn.close()
 
     def init_orders_tab(self):
         frame = self.tabs['Orders']
@@ -2322,25 +1805,19 @@ class AISApp(tb.Window):
         self.orders_tree.column('Payment', width=100, anchor='center')
         self.orders_tree.pack(pady=10, padx=10, fill='x')
         self.orders_tree.bind('<<TreeviewSelect>>', self.on_order_select)
+        self.orders_grid = PagedTreeview(self.orders_tree, self.worker, 'orders',
+                                         format_row=self.format_order_row, on_error=self.show_db_error)
         self.load_orders()
 
     def load_tables_for_orders(self):
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('SELECT table_number FROM tables ORDER BY table_number')
-        self.tables_for_orders = [str(row[0]) for row in c.fetchall()]
+        self.tables_for_orders = [str(number) for number in self.refs.rows('tables') if number is not None]
         if hasattr(self, 'order_table_cb'):
             self.order_table_cb['values'] = self.tables_for_orders
-        conn.close()
 
     def load_menu_items_for_orders(self):
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('SELECT name FROM menu_items WHERE is_available=1 ORDER BY name')
-        self.menu_items_for_orders = [row[0] for row in c.fetchall()]
+        self.menu_items_for_orders = [item.name for item in self.refs.rows('menu_items').values() if item.is_available == 1]
         if hasattr(self, 'order_menu_item_cb'):
             self.order_menu_item_cb['values'] = self.menu_items_for_orders
-        conn.close()
 
     def add_item_to_order_cart(self):
         item_name = self.order_menu_item_var.get()
@@ -2356,15 +1833,11 @@ class AISApp(tb.Window):
             Messagebox.show_warning('Input Error', 'Quantity must be a positive integer.')
             return
         # Get price
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('SELECT price FROM menu_items WHERE name=?', (item_name,))
-        row = c.fetchone()
-        conn.close()
-        if not row:
+        menu_item = self.refs.menu_item(item_name)
+        if menu_item is None:
             Messagebox.show_warning('Menu Error', 'Menu item not found.')
             return
-        price = row[0]
+        price = menu_item.price
         total = price * qty_val
         self.order_cart.append({'item': item_name, 'qty': qty_val, 'price': price, 'total': total})
         self.refresh_order_cart_tree()
@@ -2389,83 +1862,32 @@ class AISApp(tb.Window):
             Messagebox.show_warning('Input Error', 'Select a table and add at least one item.')
             return
 
-        # Check inventory availability for all items
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        # Track total cost for COGS
-        total_cost = 0
-        for item in self.order_cart:
-            # Get menu item ingredients and costs
-            c.execute('''
-                SELECT ki.name, ki.quantity, mi.quantity as required_qty, ki.cost_per_unit
-                FROM menu_item_ingredients mi
-                JOIN kitchen_inventory ki ON mi.inventory_id = ki.id
-                WHERE mi.menu_item_id = (
-                    SELECT id FROM menu_items WHERE name = ?
-                )
-            ''', (item['item'],))
-            ingredients = c.fetchall()
-            item_cost = 0
-            for ingredient in ingredients:
-                name, available, required, cost = ingredient
-                if available < (required * item['qty']):
-                    Messagebox.show_warning('Inventory Error', 
-                        f'Not enough {name} in inventory for {item["item"]}.')
-                    conn.close()
-                    return
-                item_cost += required * cost * item['qty']
-            total_cost += item_cost
-        import datetime
-        order_number = f"ORD{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}"
-        order_date = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        total_amount = sum(item['total'] for item in self.order_cart)
-        
-        # Create order
-        c.execute('INSERT INTO orders (order_number, table_number, order_date, status, total_amount, cost_amount) VALUES (?, ?, ?, ?, ?, ?)',
-                  (order_number, table, order_date, 'pending', total_amount, total_cost))
-        order_id = c.lastrowid
-
-        # Add order items and update inventory
-        for item in self.order_cart:
-            c.execute('SELECT id FROM menu_items WHERE name=?', (item['item'],))
-            menu_item_id = c.fetchone()[0]
-            c.execute('INSERT INTO order_items (order_id, menu_item_id, quantity, price) VALUES (?, ?, ?, ?)',
-                      (order_id, menu_item_id, item['qty'], item['price']))
-            
-            # Update inventory quantities
-            c.execute('''
-                UPDATE kitchen_inventory
-                SET quantity = quantity - (
-                    SELECT quantity * ? 
-                    FROM menu_item_ingredients 
-                    WHERE menu_item_id = ?
-                )
-                WHERE id IN (
-                    SELECT inventory_id 
-                    FROM menu_item_ingredients 
-                    WHERE menu_item_id = ?
-                )
-            ''', (item['qty'], menu_item_id, menu_item_id))
-
-        conn.commit()
-        conn.close()
+        if self.worker.busy('place_order'):
+            return
+        cart = list(self.order_cart)
+        self.worker.submit('place_order', lambda: self.service.place_order(table, cart),
+                           self.order_placed, self.place_order_failed)
+
+    def order_placed(self, result):
         self.order_cart = []
         self.refresh_order_cart_tree()
         self.load_orders()
         self.set_status('Order placed successfully.')
 
+    def place_order_failed(self, error):
+        if isinstance(error, OrderError):
+            Messagebox.show_warning('Inventory Error', str(error))
+        else:
+            self.show_db_error(error)
+
     def load_orders(self):
-        for row in self.orders_tree.get_children():
-            self.orders_tree.delete(row)
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('SELECT order_number, table_number, order_date, status, total_amount, payment_status FROM orders ORDER BY id DESC')
-        rows = c.fetchall()
-        for row in rows:
-            values = list(row)
-            values[4] = f'{values[4]:.2f}'
-            self.orders_tree.insert('', 'end', values=values)
-        conn.close()
+        self.orders_grid.load(KeysetQuery('orders', ('order_number', 'table_number', 'order_date', 'status',
+                                                     'total_amount', 'payment_status'), descending=True))
+
+    def format_order_row(self, row):
+        values = list(row)
+        values[4] = f'{values[4]:.2f}'
+        return values
 
     def on_order_select(self, event):
         pass  # For future: show order details, allow status update
@@ -2476,24 +1898,20 @@ class AISApp(tb.Window):
             Messagebox.show_warning('Select Order', 'Select an order to update.')
             return
         order_number = self.orders_tree.item(selected[0])['values'][0]
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('SELECT status FROM orders WHERE order_number=?', (order_number,))
-        row = c.fetchone()
-        if not row:
-            conn.close()
-            return
-        current_status = row[0]
-        # Cycle through statuses: pending -> in kitchen -> served -> paid
-        status_flow = ['pending', 'in kitchen', 'served', 'paid']
-        try:
-            idx = status_flow.index(current_status)
-            new_status = status_flow[(idx + 1) % len(status_flow)]
-        except ValueError:
-            new_status = 'pending'
-        c.execute('UPDATE orders SET status=? WHERE order_number=?', (new_status, order_number))
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as c:
+            c.execute('SELECT status FROM orders WHERE order_number=?', (order_number,))
+            row = c.fetchone()
+            if not row:
+                return
+            current_status = row[0]
+            # Cycle through statuses: pending -> in kitchen -> served -> paid
+            status_flow = ['pending', 'in kitchen', 'served', 'paid']
+            try:
+                idx = status_flow.index(current_status)
+                new_status = status_flow[(idx + 1) % len(status_flow)]
+            except ValueError:
+                new_status = 'pending'
+            c.execute('UPDATE orders SET status=? WHERE order_number=?', (new_status, order_number))
         self.load_orders()
         self.set_status(f'Order status updated to {new_status}.')
 
@@ -2530,6 +1948,9 @@ class AISApp(tb.Window):
         self.kitchen_orders_tree.column('Notes', width=150)
         
         self.kitchen_orders_tree.pack(padx=10, pady=5, fill='both', expand=True)
+        self.kitchen_view = KeyedTreeview(self.kitchen_orders_tree)
+        # Newest orders first
+        self.kitchen_rows = GroupedRows(self.kitchen_view, reverse=True)
         self.style_treeview(self.kitchen_orders_tree)
         
         # Buttons frame
@@ -2544,44 +1965,31 @@ class AISApp(tb.Window):
         # Load initial orders
         self.load_kitchen_orders()
 
-    def load_kitchen_orders(self):
-        # Clear existing items
-        for item in self.kitchen_orders_tree.get_children():
-            self.kitchen_orders_tree.delete(item)
-            
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        
+    def load_kitchen_orders(self, order_ids=None):
+        # order_ids: only re-read these orders (see ChangeWatcher)
         # Get all pending and in-kitchen orders with their items
-        c.execute('''
-            SELECT o.order_number, o.table_number, o.order_date, 
-                   mi.name, oi.quantity, oi.status, oi.notes, oi.id
-            FROM orders o
-            JOIN order_items oi ON o.id = oi.order_id
-            JOIN menu_items mi ON oi.menu_item_id = mi.id
-            WHERE o.status IN ('pending', 'in kitchen')
-            ORDER BY o.order_date DESC, o.order_number
-        ''')
-        
-        orders = c.fetchall()
+        self.load_keys_async('kitchen', self.service.kitchen_orders, self.fill_kitchen_orders, order_ids)
+
+    def fill_kitchen_orders(self, orders, order_ids):
+        groups = {}
         for order in orders:
-            order_num, table, date, item, qty, status, notes, item_id = order
+            order_id, order_num, table, date, item, qty, status, notes, item_id = order
             # Format the date to show only time
             time = date.split(' ')[1] if ' ' in date else date
             
             # Set row color based on status
             tag = 'pending' if status == 'pending' else 'preparing'
             
-            self.kitchen_orders_tree.insert('', 'end', 
-                values=(order_num, table, time, item, qty, status, notes),
-                tags=(tag,),
-                iid=str(item_id))  # Use item_id as tree item id for easy reference
+            # Use item_id as tree item id for easy reference
+            row = (item_id, (order_num, table, time, item, qty, status, notes), (tag,))
+            groups.setdefault(order_id, ((date, order_id), []))[1].append(row)
+        # Only rows whose status or contents changed are touched
+        self.kitchen_rows.update(groups, order_ids)
         
         # Configure tag colors
         self.kitchen_orders_tree.tag_configure('pending', background='#fff3cd')  # Light yellow
         self.kitchen_orders_tree.tag_configure('preparing', background='#d4edda')  # Light green
         
-        conn.close()
 
     def mark_item_prepared(self):
         selected = self.kitchen_orders_tree.selection()
@@ -2590,35 +1998,20 @@ class AISApp(tb.Window):
             return
             
         item_id = selected[0]  # The tree item id is the order_item id
-        
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        
-        # Update the item status
-        c.execute('UPDATE order_items SET status = "prepared" WHERE id = ?', (item_id,))
-        
-        # Check if all items in the order are prepared
-        c.execute('''
-            SELECT o.id, COUNT(oi.id), SUM(CASE WHEN oi.status = 'prepared' THEN 1 ELSE 0 END)
-            FROM orders o
-            JOIN order_items oi ON o.id = oi.order_id
-            WHERE oi.id = ?
-            GROUP BY o.id
-        ''', (item_id,))
-        
-        result = c.fetchone()
-        if result:
-            order_id, total_items, prepared_items = result
-            if total_items == prepared_items:
-                # All items are prepared, update order status
-                c.execute('UPDATE orders SET status = "in kitchen" WHERE id = ?', (order_id,))
-        
-        conn.commit()
-        conn.close()
-        
-        self.load_kitchen_orders()
+        # The service may hold the update for a moment to commit it with
+        # other stations' (see OrderService); nothing waits for it here
+        self.when_done(self.service.submit_item_prepared(item_id), self.item_prepared, self.kitchen_failed)
+
+    def item_prepared(self, order_id):
+        self.load_kitchen_orders([order_id])
         self.set_status('Item marked as prepared.')
 
+    def kitchen_failed(self, error):
+        if isinstance(error, OrderError):
+            Messagebox.show_warning('Kitchen Error', str(error))
+        else:
+            self.show_db_error(error)
+
     def mark_order_complete(self):
         selected = self.kitchen_orders_tree.selection()
         if not selected:
@@ -2626,29 +2019,11 @@ class AISApp(tb.Window):
             return
             
         item_id = selected[0]  # The tree item id is the order_item id
-        
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        
-        # Get the order ID for this item
-        c.execute('SELECT order_id FROM order_items WHERE id = ?', (item_id,))
-        result = c.fetchone()
-        if not result:
-            conn.close()
-            return
-            
-        order_id = result[0]
-        
-        # Update all items in the order to prepared
-        c.execute('UPDATE order_items SET status = "prepared" WHERE order_id = ?', (order_id,))
-        
-        # Update order status to served
-        c.execute('UPDATE orders SET status = "served" WHERE id = ?', (order_id,))
-        
-        conn.commit()
-        conn.close()
-        
-        self.load_kitchen_orders()
+        self.worker.submit(f'kitchen_complete:{item_id}', lambda: self.service.mark_order_complete(item_id),
+                           self.order_completed, self.kitchen_failed)
+
+    def order_completed(self, order_id):
+        self.load_kitchen_orders([order_id])
         self.set_status('Order marked as complete.')
 
     def init_tables_tab(self):
@@ -2693,6 +2068,8 @@ class AISApp(tb.Window):
         self.tables_tree.column('Current Order', width=150)
         
         self.tables_tree.pack(padx=10, pady=5, fill='both', expand=True)
+        self.tables_view = KeyedTreeview(self.tables_tree)
+        self.table_rows = GroupedRows(self.tables_view)
         self.style_treeview(self.tables_tree)
         
         # Table actions frame
@@ -2728,21 +2105,19 @@ class AISApp(tb.Window):
             Messagebox.show_warning('Input Error', 'Table number and capacity must be positive integers.')
             return
             
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        
-        # Check if table number already exists
-        c.execute('SELECT id FROM tables WHERE table_number = ?', (table_num,))
-        if c.fetchone():
-            Messagebox.show_warning('Duplicate Table', 'Table number already exists.')
-            conn.close()
-            return
+        try:
+            with self.db.transaction() as c:
             
-        # Add new table
-        c.execute('INSERT INTO tables (table_number, capacity, status) VALUES (?, ?, ?)',
-                 (table_num, capacity, 'available'))
-        conn.commit()
-        conn.close()
+                # Check if table number already exists
+                if self.refs.table(table_num) is not None:
+                    raise ValueError('Table number already exists.')
+                
+                # Add new table
+                c.execute('INSERT INTO tables (table_number, capacity, status) VALUES (?, ?, ?)',
+                         (table_num, capacity, 'available'))
+        except ValueError as e:
+            Messagebox.show_warning('Duplicate Table', str(e))
+            return
         
         self.new_table_num_var.set('')
         self.new_table_capacity_var.set('')
@@ -2750,25 +2125,33 @@ class AISApp(tb.Window):
         self.load_tables_for_orders()  # Refresh table list in Orders tab
         self.set_status('Table added successfully.')
 
-    def load_tables(self):
-        # Clear existing items
-        for item in self.tables_tree.get_children():
-            self.tables_tree.delete(item)
-            
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
+    def load_tables(self, table_numbers=None):
+        # table_numbers: only re-read these tables (see ChangeWatcher)
+        self.load_keys_async('tables', self.fetch_tables, self.fill_tables, table_numbers)
+
+    def fetch_tables(self, table_numbers):
+        condition, params = '', []
+        if table_numbers is not None:
+            table_numbers = list(table_numbers)
+            condition = f'WHERE t.table_number IN ({placeholders(len(table_numbers))})'
+            params = table_numbers
+        c = self.db.cursor()
         
         # Get all tables with their current orders
-        c.execute('''
+        c.execute(f'''
             SELECT t.table_number, t.capacity, t.status,
                    o.order_number
             FROM tables t
             LEFT JOIN orders o ON t.table_number = o.table_number 
                 AND o.status IN ('pending', 'in kitchen', 'served')
-            ORDER BY t.table_number
-        ''')
-        
-        tables = c.fetchall()
+            {condition}
+            ORDER BY t.table_number, o.id
+        ''', params)
+        return c.fetchall()
+
+    def fill_tables(self, tables, table_numbers):
+        groups = {}
+        seen = set()
         for table in tables:
             table_num, capacity, status, order_num = table
             current_order = order_num if order_num else ''
@@ -2776,16 +2159,18 @@ class AISApp(tb.Window):
             # Set row color based on status
             tag = status
             
-            self.tables_tree.insert('', 'end', 
-                values=(table_num, capacity, status, current_order),
-                tags=(tag,))
+            # A table with several open orders gets one row per order
+            iid = table_num if table_num not in seen else f'{table_num}:{current_order}'
+            seen.add(table_num)
+            row = (iid, (table_num, capacity, status, current_order), (tag,))
+            groups.setdefault(table_num, ((table_num is not None, table_num or 0), []))[1].append(row)
+        self.table_rows.update(groups, table_numbers)
         
         # Configure tag colors
         self.tables_tree.tag_configure('available', background='#d4edda')  # Light green
         self.tables_tree.tag_configure('occupied', background='#f8d7da')  # Light red
         self.tables_tree.tag_configure('reserved', background='#fff3cd')  # Light yellow
         
-        conn.close()
 
     def update_table_status(self, new_status):
         selected = self.tables_tree.selection()
@@ -2795,26 +2180,24 @@ class AISApp(tb.Window):
             
         table_num = self.tables_tree.item(selected[0])['values'][0]
         
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        
-        # Check if table has active orders
-        if new_status == 'available':
-            c.execute('''
-                SELECT COUNT(*) FROM orders 
-                WHERE table_number = ? AND status IN ('pending', 'in kitchen', 'served')
-            ''', (table_num,))
-            if c.fetchone()[0] > 0:
-                Messagebox.show_warning('Active Orders', 
-                    'Cannot mark table as available while it has active orders.')
-                conn.close()
-                return
-        
-        # Update table status
-        c.execute('UPDATE tables SET status = ? WHERE table_number = ?',
-                 (new_status, table_num))
-        conn.commit()
-        conn.close()
+        try:
+            with self.db.transaction() as c:
+            
+                # Check if table has active orders
+                if new_status == 'available':
+                    c.execute('''
+                        SELECT COUNT(*) FROM orders 
+                        WHERE table_number = ? AND status IN ('pending', 'in kitchen', 'served')
+                    ''', (table_num,))
+                    if c.fetchone()[0] > 0:
+                        raise ValueError('Cannot mark table as available while it has active orders.')
+            
+                # Update table status
+                c.execute('UPDATE tables SET status = ? WHERE table_number = ?',
+                         (new_status, table_num))
+        except ValueError as e:
+            Messagebox.show_warning('Active Orders', str(e))
+            return
         
         self.load_tables()
         self.set_status(f'Table {table_num} marked as {new_status}.')
@@ -2831,22 +2214,20 @@ class AISApp(tb.Window):
             f'Are you sure you want to delete table {table_num}?'):
             return
             
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        
-        # Check if table has any orders
-        c.execute('SELECT COUNT(*) FROM orders WHERE table_number = ?', (table_num,))
-        if c.fetchone()[0] > 0:
-            Messagebox.show_warning('Cannot Delete', 
-                'Cannot delete table with existing orders.')
-            conn.close()
+        try:
+            with self.db.transaction() as c:
+            
+                # Check if table has any orders
+                c.execute('SELECT COUNT(*) FROM orders WHERE table_number = ?', (table_num,))
+                if c.fetchone()[0] > 0:
+                    raise ValueError('Cannot delete table with existing orders.')
+            
+                # Delete table
+                c.execute('DELETE FROM tables WHERE table_number = ?', (table_num,))
+        except ValueError as e:
+            Messagebox.show_warning('Cannot Delete', str(e))
             return
         
-        # Delete table
-        c.execute('DELETE FROM tables WHERE table_number = ?', (table_num,))
-        conn.commit()
-        conn.close()
-        
         self.load_tables()
         self.load_tables_for_orders()  # Refresh table list in Orders tab
         self.set_status(f'Table {table_num} deleted successfully.')
@@ -2887,6 +2268,9 @@ class AISApp(tb.Window):
         self.unpaid_orders_tree.column('Total', width=80, anchor='e')
         
         self.unpaid_orders_tree.pack(padx=5, pady=5, fill='both', expand=True)
+        self.unpaid_view = KeyedTreeview(self.unpaid_orders_tree)
+        # Newest orders first
+        self.unpaid_rows = GroupedRows(self.unpaid_view, reverse=True)
         self.style_treeview(self.unpaid_orders_tree)
         self.unpaid_orders_tree.bind('<<TreeviewSelect>>', self.on_unpaid_order_select)
         
@@ -2933,40 +2317,27 @@ class AISApp(tb.Window):
         self.load_unpaid_orders()
         self.update_sales_summary()
 
-    def load_unpaid_orders(self):
-        # Clear existing items
-        for item in self.unpaid_orders_tree.get_children():
-            self.unpaid_orders_tree.delete(item)
-            
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        
+    def load_unpaid_orders(self, order_ids=None):
+        # order_ids: only re-read these orders (see ChangeWatcher)
         # Get all unpaid orders
-        c.execute('''
-            SELECT o.order_number, o.table_number, o.order_date, o.total_amount,
-                   GROUP_CONCAT(mi.name || ' x' || oi.quantity)
-            FROM orders o
-            JOIN order_items oi ON o.id = oi.order_id
-            JOIN menu_items mi ON oi.menu_item_id = mi.id
-            WHERE o.payment_status = 'unpaid'
-            GROUP BY o.id
-            ORDER BY o.order_date DESC
-        ''')
-        
-        orders = c.fetchall()
+        self.load_keys_async('unpaid', self.service.unpaid_orders, self.fill_unpaid_orders, order_ids)
+
+    def fill_unpaid_orders(self, orders, order_ids):
+        groups = {}
         for order in orders:
-            order_num, table, date, total, items = order
+            order_id, order_num, table, date, total, items = order
+            sort_key = (date, order_id)
             # Format the date
             date = date.split(' ')[0] if ' ' in date else date
             
-            self.unpaid_orders_tree.insert('', 'end', 
-                values=(order_num, table, date, items, f'{total:.2f}'))
-        
-        conn.close()
+            groups[order_id] = (sort_key, [(order_num, (order_num, table, date, items, f'{total:.2f}'), ())])
+        selected = self.unpaid_orders_tree.selection()
+        self.unpaid_rows.update(groups, order_ids)
         
-        # Clear order details
-        self.order_details_text.delete('1.0', tb.END)
-        self.amount_received_var.set('')
+        if order_ids is None or (selected and not self.unpaid_orders_tree.selection()):
+            # Clear order details
+            self.order_details_text.delete('1.0', tb.END)
+            self.amount_received_var.set('')
 
     def on_unpaid_order_select(self, event):
         selected = self.unpaid_orders_tree.selection()
@@ -2975,8 +2346,7 @@ class AISApp(tb.Window):
             
         order_num = self.unpaid_orders_tree.item(selected[0])['values'][0]
         
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
+        c = self.db.cursor()
         
         # Get detailed order information
         c.execute('''
@@ -2990,7 +2360,6 @@ class AISApp(tb.Window):
         
         items = c.fetchall()
         if not items:
-            conn.close()
             return
             
         # Format order details
@@ -3016,7 +2385,6 @@ class AISApp(tb.Window):
         # Set amount received to total
         self.amount_received_var.set(f"{items[0][3]:.2f}")
         
-        conn.close()
 
     def process_payment(self):
         selected = self.unpaid_orders_tree.selection()
@@ -3038,73 +2406,26 @@ class AISApp(tb.Window):
             Messagebox.show_warning('Input Error', 'Amount must be a number.')
             return
             
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        
-        # Get order total and cost
-        c.execute('SELECT total_amount, cost_amount FROM orders WHERE order_number = ?', (order_num,))
-        total_amount, cost_amount = c.fetchone()
-        
-        if amount_received < total_amount:
-            Messagebox.show_warning('Payment Error', 'Amount received is less than total amount.')
-            conn.close()
+        if self.worker.busy('payment'):
             return
-            
-        # Update order payment status
-        c.execute('UPDATE orders SET payment_status = "paid", payment_method = ? WHERE order_number = ?',
-                 (payment_method, order_num))
-        
-        # Create journal entry for the sale
-        c.execute('INSERT INTO journal_entries (date, description) VALUES (?, ?)',
-                 (datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                  f'Sale for Order #{order_num}'))
-        entry_id = c.lastrowid
-        
-        # Get account IDs
-        accounts = {}
-        for account_name, account_type in [
-            ('Sales Revenue', 'Income'),
-            ('Cost of Goods Sold', 'Expense'),
-            ('Inventory', 'Asset'),
-            ('Cash' if payment_method == 'cash' else 'Bank', 'Asset')
-        ]:
-            c.execute('SELECT id FROM accounts WHERE name = ?', (account_name,))
-            account = c.fetchone()
-            if not account:
-                c.execute('INSERT INTO accounts (name, type) VALUES (?, ?)', (account_name, account_type))
-                accounts[account_name] = c.lastrowid
-            else:
-                accounts[account_name] = account[0]
-        
-        # Add journal lines
-        # 1. Debit Cash/Bank
-        c.execute('INSERT INTO journal_lines (entry_id, account_id, debit, credit) VALUES (?, ?, ?, ?)',
-                 (entry_id, accounts['Cash' if payment_method == 'cash' else 'Bank'], total_amount, 0))
-        
-        # 2. Credit Sales Revenue
-        c.execute('INSERT INTO journal_lines (entry_id, account_id, debit, credit) VALUES (?, ?, ?, ?)',
-                 (entry_id, accounts['Sales Revenue'], 0, total_amount))
-        
-        # 3. Debit COGS
-        c.execute('INSERT INTO journal_lines (entry_id, account_id, debit, credit) VALUES (?, ?, ?, ?)',
-                 (entry_id, accounts['Cost of Goods Sold'], cost_amount, 0))
-        
-        # 4. Credit Inventory
-        c.execute('INSERT INTO journal_lines (entry_id, account_id, debit, credit) VALUES (?, ?, ?, ?)',
-                 (entry_id, accounts['Inventory'], 0, cost_amount))
-        
-        conn.commit()
-        conn.close()
-        
+        self.worker.submit('payment', lambda: self.service.process_payment(order_num, payment_method, amount_received),
+                           self.payment_processed, self.payment_failed)
+
+    def payment_processed(self, result):
         # Refresh displays
         self.load_unpaid_orders()
         self.update_sales_summary()
         self.load_ledger()
         self.set_status('Payment processed successfully.')
 
+    def payment_failed(self, error):
+        if isinstance(error, OrderError):
+            Messagebox.show_warning('Payment Error', str(error))
+        else:
+            self.show_db_error(error)
+
     def generate_receipt(self, order_num, total_amount, amount_received, payment_method):
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
+        c = self.db.cursor()
         
         # Get order details
         c.execute('''
@@ -3118,7 +2439,6 @@ class AISApp(tb.Window):
         
         items = c.fetchall()
         if not items:
-            conn.close()
             return
             
         # Format receipt
@@ -3162,7 +2482,6 @@ class AISApp(tb.Window):
         tb.Button(receipt_window, text="Print Receipt", style='Accent.TButton',
                  command=lambda: self.print_receipt('\n'.join(receipt))).pack(pady=10)
         
-        conn.close()
 
     def print_receipt(self, receipt_text):
         # In a real application, this would send to a printer
@@ -3171,25 +2490,12 @@ class AISApp(tb.Window):
             'Receipt would be sent to printer.\n\n' + receipt_text)
 
     def update_sales_summary(self):
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        
         # Get today's date
         today = datetime.datetime.now().strftime('%Y-%m-%d')
         
         # Get sales summary for today
-        c.execute('''
-            SELECT 
-                COUNT(*) as total_orders,
-                SUM(total_amount) as total_sales,
-                payment_method,
-                COUNT(*) as method_count
-            FROM orders 
-            WHERE date(order_date) = ? AND payment_status = 'paid'
-            GROUP BY payment_method
-        ''', (today,))
-        
-        results = c.fetchall()
+        results = [(orders, sales, method or '', orders)
+                   for method, orders, sales in sales_by_payment_method(self.db, today, today)]
         
         # Format summary
         summary = []
@@ -3213,7 +2519,6 @@ class AISApp(tb.Window):
         self.sales_summary_text.delete('1.0', tb.END)
         self.sales_summary_text.insert('1.0', '\n'.join(summary))
         
-        conn.close()
 
     def process_purchase(self):
         selected = self.purchases_tree.selection()
@@ -3235,73 +2540,51 @@ class AISApp(tb.Window):
             Messagebox.show_warning('Input Error', 'Amount must be a number.')
             return
             
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
+        try:
+            with self.db.transaction() as c:
         
-        # Get purchase total
-        c.execute('SELECT total_amount FROM purchases WHERE purchase_number = ?', (purchase_num,))
-        total_amount = c.fetchone()[0]
+                # Get purchase total
+                c.execute('SELECT total_amount FROM purchases WHERE purchase_number = ?', (purchase_num,))
+                total_amount = c.fetchone()[0]
         
-        if amount_paid < total_amount:
-            Messagebox.show_warning('Payment Error', 'Amount paid is less than total amount.')
-            conn.close()
-            return
+                if amount_paid < total_amount:
+                    raise ValueError('Amount paid is less than total amount.')
             
-        # Update purchase payment status
-        c.execute('UPDATE purchases SET payment_status = "paid", payment_method = ? WHERE purchase_number = ?',
-                 (payment_method, purchase_num))
-        
-        # Create journal entry for the purchase
-        c.execute('INSERT INTO journal_entries (date, description) VALUES (?, ?)',
-                 (datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                  f'Purchase #{purchase_num}'))
-        entry_id = c.lastrowid
-        
-        # Get inventory account ID
-        c.execute('SELECT id FROM accounts WHERE name = "Inventory"')
-        inventory_account = c.fetchone()
-        if not inventory_account:
-            # Create inventory account if it doesn't exist
-            c.execute('INSERT INTO accounts (name, type) VALUES (?, ?)', ('Inventory', 'Asset'))
-            inventory_account = (c.lastrowid,)
-        
-        # Get cash/bank account ID
-        account_name = 'Cash' if payment_method == 'Cash' else 'Bank'
-        c.execute('SELECT id FROM accounts WHERE name = ?', (account_name,))
-        cash_account = c.fetchone()
-        if not cash_account:
-            # Create cash/bank account if it doesn't exist
-            c.execute('INSERT INTO accounts (name, type) VALUES (?, ?)', (account_name, 'Asset'))
-            cash_account = (c.lastrowid,)
-        
-        # Add journal lines
-        c.execute('INSERT INTO journal_lines (entry_id, account_id, debit, credit) VALUES (?, ?, ?, ?)',
-                 (entry_id, inventory_account[0], total_amount, 0))  # Debit inventory
-        c.execute('INSERT INTO journal_lines (entry_id, account_id, debit, credit) VALUES (?, ?, ?, ?)',
-                 (entry_id, cash_account[0], 0, total_amount))  # Credit cash/bank
-        
-        # Update inventory quantities
-        c.execute('''
-            UPDATE kitchen_inventory
-            SET quantity = quantity + (
-                SELECT quantity 
-                FROM purchase_items 
-                WHERE purchase_id = (
-                    SELECT id FROM purchases WHERE purchase_number = ?
-                )
-                AND inventory_id = kitchen_inventory.id
-            )
-            WHERE id IN (
-                SELECT inventory_id 
-                FROM purchase_items 
-                WHERE purchase_id = (
-                    SELECT id FROM purchases WHERE purchase_number = ?
-                )
-            )
-        ''', (purchase_num, purchase_num))
-        
-        conn.commit()
-        conn.close()
+                # Update purchase payment status
+                c.execute("UPDATE purchases SET payment_status = 'paid', payment_method = ? WHERE purchase_number = ?",
+                         (payment_method, purchase_num))
+        
+                # Create journal entry for the purchase
+                cash_account = 'Cash' if payment_method == 'Cash' else 'Bank'
+                post_entry(self.db, self.refs, f'Purchase #{purchase_num}', [
+                    ('Inventory', total_amount, 0),     # Debit inventory
+                    (cash_account, 0, total_amount),    # Credit cash/bank
+                ], new_accounts={'Inventory': 'Asset', cash_account: 'Asset'})
+        
+                # Update inventory quantities
+                c.execute('''
+                    UPDATE kitchen_inventory
+                    SET quantity = quantity + (
+                        SELECT quantity 
+                        FROM purchase_items 
+                        WHERE purchase_id = (
+                            SELECT id FROM purchases WHERE purchase_number = ?
+                        )
+                        AND inventory_id = kitchen_inventory.id
+                    )
+                    WHERE id IN (
+                        SELECT inventory_id 
+                        FROM purchase_items 
+                        WHERE purchase_id = (
+                            SELECT id FROM purchases WHERE purchase_number = ?
+                        )
+                    )
+                ''', (purchase_num, purchase_num))
+        except ValueError as e:
+            # Also PostingError from post_entry
+            Messagebox.show_warning('Payment Error', str(e))
+            return
+        
         
         # Refresh displays
         self.load_purchases()
@@ -3310,498 +2593,32 @@ class AISApp(tb.Window):
         self.set_status('Purchase processed successfully.')
 
     def show_sales_records(self):
-        try:
-            conn = sqlite3.connect(DB_NAME)
-            c = conn.cursor()
-            from_date = self.report_from_var.get()
-            to_date = self.report_to_var.get()
-            if not from_date or not to_date:
-                Messagebox.show_warning('Date Range Required', 'Please select both start and end dates.')
-                return
-            c.execute('SELECT COUNT(*) FROM orders')
-            total_orders = c.fetchone()[0]
-            if total_orders == 0:
-                self.set_status("No orders found in the database", error=True)
-                self.report_text.delete('1.0', tb.END)
-                self.report_text.insert('1.0', "No orders found in the database. Please add some orders first.")
-                return
-            c.execute('''
-                SELECT COUNT(*) 
-                FROM orders 
-                WHERE order_date BETWEEN ? AND ?
-                AND payment_status = 'paid'
-            ''', (from_date, to_date))
-            paid_orders = c.fetchone()[0]
-            if paid_orders == 0:
-                self.set_status("No paid orders found for the selected period", error=True)
-                self.report_text.delete('1.0', tb.END)
-                self.report_text.insert('1.0', f"No paid orders found for the period {from_date} to {to_date}")
-                return
-            c.execute('''
-                SELECT 
-                    DATE(o.order_date) as sale_date,
-                    COUNT(DISTINCT o.id) as num_orders,
-                    SUM(o.total_amount) as total_sales,
-                    SUM(o.cost_amount) as total_cost,
-                    SUM(o.total_amount - o.cost_amount) as gross_profit,
-                    GROUP_CONCAT(DISTINCT o.payment_method) as payment_methods
-                FROM orders o
-                WHERE o.order_date BETWEEN ? AND ?
-                AND o.payment_status = 'paid'
-                GROUP BY DATE(o.order_date)
-                ORDER BY sale_date DESC
-            ''', (from_date, to_date))
-            daily_sales = c.fetchall()
-            c.execute('''
-                SELECT 
-                    mi.name,
-                    mi.category,
-                    COUNT(oi.id) as quantity_sold,
-                    SUM(oi.quantity * oi.price) as total_revenue,
-                    SUM(oi.quantity * mi.cost) as total_cost,
-                    SUM(oi.quantity * (oi.price - mi.cost)) as gross_profit
-                FROM orders o
-                JOIN order_items oi ON o.id = oi.order_id
-                JOIN menu_items mi ON oi.menu_item_id = mi.id
-                WHERE o.order_date BETWEEN ? AND ?
-                AND o.payment_status = 'paid'
-                GROUP BY mi.id
-                ORDER BY total_revenue DESC
-            ''', (from_date, to_date))
-            item_sales = c.fetchall()
-            c.execute('''
-                SELECT 
-                    payment_method,
-                    COUNT(*) as num_transactions,
-                    SUM(total_amount) as total_amount
-                FROM orders
-                WHERE order_date BETWEEN ? AND ?
-                AND payment_status = 'paid'
-                GROUP BY payment_method
-            ''', (from_date, to_date))
-            payment_stats = c.fetchall()
-            lines = []
-            lines.append('SALES RECORDS REPORT')
-            lines.append(f'Period: {from_date} to {to_date}')
-            lines.append('=' * 100)
-            lines.append('\nDAILY SALES SUMMARY')
-            lines.append('-' * 100)
-            lines.append(f'{"Date":<14}{"Orders":>10}{"Sales":>16}{"Cost":>16}{"Profit":>16}{"Payment Methods":>28}')
-            total_orders = 0
-            total_sales = 0
-            total_cost = 0
-            total_profit = 0
-            for date, orders, sales, cost, profit, methods in daily_sales:
-                lines.append(f'{date:<14}{orders:>10}{sales:>16.2f}{cost:>16.2f}{profit:>16.2f}{methods:>28}')
-                total_orders += orders
-                total_sales += sales
-                total_cost += cost
-                total_profit += profit
-            lines.append('-' * 100)
-            lines.append(f'{"TOTAL":<14}{total_orders:>10}{total_sales:>16.2f}{total_cost:>16.2f}{total_profit:>16.2f}')
-            lines.append('\nITEM-WISE SALES ANALYSIS')
-            lines.append('-' * 100)
-            lines.append(f'{"Item":<32}{"Category":<18}{"Qty":>10}{"Revenue":>16}{"Cost":>16}{"Profit":>16}')
-            for name, category, qty, revenue, cost, profit in item_sales:
-                lines.append(f'{name:<32}{category:<18}{qty:>10}{revenue:>16.2f}{cost:>16.2f}{profit:>16.2f}')
-            lines.append('\nPAYMENT METHOD DISTRIBUTION')
-            lines.append('-' * 100)
-            lines.append(f'{"Method":<20}{"Transactions":>16}{"Amount":>16}')
-            for method, transactions, amount in payment_stats:
-                lines.append(f'{method:<20}{transactions:>16}{amount:>16.2f}')
-            lines.append('\nSUMMARY STATISTICS')
-            lines.append('-' * 100)
-            lines.append(f'Total Orders: {total_orders}')
-            lines.append(f'Total Sales: {total_sales:.2f}')
-            lines.append(f'Total Cost: {total_cost:.2f}')
-            lines.append(f'Gross Profit: {total_profit:.2f}')
-            lines.append(f'Average Order Value: {total_sales/total_orders:.2f}' if total_orders > 0 else 'Average Order Value: 0.00')
-            lines.append(f'Profit Margin: {(total_profit/total_sales*100):.1f}%' if total_sales > 0 else 'Profit Margin: 0.0%')
-            self.report_text.delete('1.0', tb.END)
-            self.report_text.insert('1.0', '\n'.join(lines))
-            self.set_status("Sales report generated successfully")
-        except sqlite3.Error as e:
-            self.set_status(f"Database error: {str(e)}", error=True)
-            Messagebox.show_error('Database Error', f'An error occurred while generating the report: {str(e)}')
-        except Exception as e:
-            self.set_status(f"Error: {str(e)}", error=True)
-            Messagebox.show_error('Error', f'An error occurred while generating the report: {str(e)}')
-        finally:
-            if 'conn' in locals():
-                conn.close()
-
-    def show_income_statement(self):
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
         from_date = self.report_from_var.get()
         to_date = self.report_to_var.get()
-        # Get total revenues (Income accounts)
-        c.execute('SELECT SUM(credit) - SUM(debit) FROM journal_lines WHERE account_id IN (SELECT id FROM accounts WHERE type="Income")')
-        total_revenue = c.fetchone()[0] or 0.0
-        # Get total operating expenses (Expense accounts, excluding Income Tax)
-        c.execute('''
-            SELECT SUM(debit) - SUM(credit) FROM journal_lines jl
-            JOIN accounts a ON jl.account_id = a.id
-            WHERE a.type = "Expense" AND a.name NOT LIKE '%Income Tax%'
-        ''')
-        total_expenses = c.fetchone()[0] or 0.0
-        # Get income tax (if any)
-        c.execute('''
-            SELECT SUM(debit) - SUM(credit) FROM journal_lines jl
-            JOIN accounts a ON jl.account_id = a.id
-            WHERE a.type = "Expense" AND a.name LIKE '%Income Tax%'
-        ''')
-        income_tax = c.fetchone()[0] or 0.0
-        # Net income before tax
-        income_before_tax = total_revenue - total_expenses
-        # Net income after tax
-        net_income = income_before_tax - income_tax
-        lines = []
-        lines.append('=' * 80)
-        lines.append('INCOME STATEMENT'.center(80))
-        lines.append('=' * 80)
-        lines.append(f'For the period: {from_date} to {to_date}'.center(80))
-        lines.append('=' * 80 + '\n')
-        lines.append('REVENUE')
-        lines.append('-' * 80)
-        lines.append(f'{"Description":<40}{"Amount":>30}')
-        lines.append(f'{"Total Revenue":<40}{total_revenue:>30.2f}\n')
-        lines.append('EXPENSES')
-        lines.append('-' * 80)
-        lines.append(f'{"Description":<40}{"Amount":>30}')
-        lines.append(f'{"Total Expenses":<40}{total_expenses:>30.2f}\n')
-        lines.append('NET INCOME')
-        lines.append('-' * 80)
-        lines.append(f'{"Net Income":<40}{net_income:>30.2f}\n')
-        lines.append('=' * 80)
-        lines.append('End of Income Statement'.center(80))
-        lines.append('=' * 80)
-        self.report_text.delete('1.0', tb.END)
-        self.report_text.insert(tb.END, '\n'.join(lines))
+        if not from_date or not to_date:
+            Messagebox.show_warning('Date Range Required', 'Please select both start and end dates.')
+            return
+        self.set_status('Generating report...')
+        self.worker.submit('report', lambda: sales_records(self.db, from_date, to_date),
+                           self.display_sales_records, self.report_failed)
 
-    def show_balance_sheet(self):
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        from_date = self.report_from_var.get()
-        to_date = self.report_to_var.get()
-        c.execute('''
-            SELECT a.name, SUM(jl.debit), SUM(jl.credit)
-            FROM journal_lines jl
-            JOIN accounts a ON jl.account_id = a.id
-            WHERE a.type = 'Asset' 
-            AND a.name IN ('Cash', 'Bank', 'Accounts Receivable', 'Inventory')
-            GROUP BY a.name
-            ORDER BY CASE a.name
-                WHEN 'Cash' THEN 1
-                WHEN 'Bank' THEN 2
-                WHEN 'Accounts Receivable' THEN 3
-                WHEN 'Inventory' THEN 4
-            END
-        ''')
-        current_assets = c.fetchall()
-        c.execute('''
-            SELECT a.name, SUM(jl.debit), SUM(jl.credit)
-            FROM journal_lines jl
-            JOIN accounts a ON jl.account_id = a.id
-            WHERE a.type = 'Asset' 
-            AND a.name NOT IN ('Cash', 'Bank', 'Accounts Receivable', 'Inventory')
-            GROUP BY a.name
-            ORDER BY a.name
-        ''')
-        fixed_assets = c.fetchall()
-        c.execute('''
-            SELECT a.name, SUM(jl.debit), SUM(jl.credit)
-            FROM journal_lines jl
-            JOIN accounts a ON jl.account_id = a.id
-            WHERE a.type = 'Liability' 
-            AND a.name = 'Accounts Payable'
-            GROUP BY a.name
-            ORDER BY a.name
-        ''')
-        current_liabilities = c.fetchall()
-        c.execute('''
-            SELECT a.name, SUM(jl.debit), SUM(jl.credit)
-            FROM journal_lines jl
-            JOIN accounts a ON jl.account_id = a.id
-            WHERE a.type = 'Liability' 
-            AND a.name != 'Accounts Payable'
-            GROUP BY a.name
-            ORDER BY a.name
-        ''')
-        long_term_liabilities = c.fetchall()
-        c.execute('''
-            SELECT a.name, SUM(jl.debit), SUM(jl.credit)
-            FROM journal_lines jl
-            JOIN accounts a ON jl.account_id = a.id
-            WHERE a.type = 'Equity'
-            GROUP BY a.name
-            ORDER BY a.name
-        ''')
-        equity = c.fetchall()
-        total_current_assets = sum((debit or 0) - (credit or 0) for _, debit, credit in current_assets)
-        total_fixed_assets = sum((debit or 0) - (credit or 0) for _, debit, credit in fixed_assets)
-        total_assets = total_current_assets + total_fixed_assets
-        total_current_liabilities = sum((credit or 0) - (debit or 0) for _, debit, credit in current_liabilities)
-        total_long_term_liabilities = sum((credit or 0) - (debit or 0) for _, debit, credit in long_term_liabilities)
-        total_liabilities = total_current_liabilities + total_long_term_liabilities
-        total_equity = sum((credit or 0) - (debit or 0) for _, debit, credit in equity)
-        lines = []
-        lines.append('=' * 90)
-        lines.append('BALANCE SHEET'.center(90))
-        lines.append('=' * 90)
-        lines.append(f'As of: {to_date}'.center(90))
-        lines.append('=' * 90 + '\n')
-        lines.append('ASSETS')
-        lines.append('-' * 90)
-        lines.append('Current Assets:')
-        for name, debit, credit in current_assets:
-            balance = (debit or 0) - (credit or 0)
-            lines.append(f'  {name:<36}{balance:>18.2f}')
-        lines.append('-' * 90)
-        lines.append(f'Total Current Assets: {total_current_assets:>18.2f}\n')
-        lines.append('Fixed Assets:')
-        for name, debit, credit in fixed_assets:
-            balance = (debit or 0) - (credit or 0)
-            lines.append(f'  {name:<36}{balance:>18.2f}')
-        lines.append('-' * 90)
-        lines.append(f'Total Fixed Assets: {total_fixed_assets:>18.2f}')
-        lines.append('-' * 90)
-        lines.append(f'Total Assets: {total_assets:>18.2f}\n')
-        lines.append('LIABILITIES')
-        lines.append('-' * 90)
-        lines.append('Current Liabilities:')
-        for name, debit, credit in current_liabilities:
-            balance = (credit or 0) - (debit or 0)
-            lines.append(f'  {name:<36}{balance:>18.2f}')
-        lines.append('-' * 90)
-        lines.append(f'Total Current Liabilities: {total_current_liabilities:>18.2f}\n')
-        lines.append('Long-term Liabilities:')
-        for name, debit, credit in long_term_liabilities:
-            balance = (credit or 0) - (debit or 0)
-            lines.append(f'  {name:<36}{balance:>18.2f}')
-        lines.append('-' * 90)
-        lines.append(f'Total Long-term Liabilities: {total_long_term_liabilities:>18.2f}')
-        lines.append('-' * 90)
-        lines.append(f'Total Liabilities: {total_liabilities:>18.2f}\n')
-        lines.append('EQUITY')
-        lines.append('-' * 90)
-        for name, debit, credit in equity:
-            balance = (credit or 0) - (debit or 0)
-            lines.append(f'{name:<38}{balance:>18.2f}')
-        lines.append('-' * 90)
-        lines.append(f'Total Equity: {total_equity:>18.2f}\n')
-        lines.append('TOTAL LIABILITIES AND EQUITY')
-        lines.append('-' * 90)
-        lines.append(f'Total: {total_liabilities + total_equity:>18.2f}')
-        lines.append('\n' + '=' * 90)
-        lines.append('End of Balance Sheet'.center(90))
-        lines.append('=' * 90)
+    def display_sales_records(self, result):
+        text, message, error = result
         self.report_text.delete('1.0', tb.END)
-        self.report_text.insert(tb.END, '\n'.join(lines))
-
-    def show_cash_flow_statement(self):
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        from_date = self.report_from_var.get()
-        to_date = self.report_to_var.get()
+        self.report_text.insert('1.0', text)
+        self.set_status(message, error=error)
 
-        # Net Income
-        c.execute('''
-            SELECT SUM(credit) - SUM(debit) FROM journal_lines
-            WHERE account_id IN (SELECT id FROM accounts WHERE type="Income")
-        ''')
-        total_income = c.fetchone()[0] or 0.0
-        c.execute('''
-            SELECT SUM(debit) - SUM(credit) FROM journal_lines
-            WHERE account_id IN (SELECT id FROM accounts WHERE type="Expense")
-        ''')
-        total_expenses = c.fetchone()[0] or 0.0
-        net_income = total_income - total_expenses
+    def show_income_statement(self):
+        self.run_report(income_statement_lines)
 
-        # Depreciation & Amortization
-        c.execute('''
-            SELECT SUM(debit) FROM journal_lines jl
-            JOIN accounts a ON jl.account_id = a.id
-            WHERE a.name LIKE '%Depreciation%' OR a.name LIKE '%Amortization%'
-        ''')
-        depreciation = c.fetchone()[0] or 0.0
-
-        # Changes in Working Capital
-        def get_change(account_name):
-            c.execute('''
-                SELECT SUM(debit) - SUM(credit) FROM journal_lines jl
-                JOIN accounts a ON jl.account_id = a.id
-                WHERE a.name = ?
-            ''', (account_name,))
-            return c.fetchone()[0] or 0.0
-
-        change_ar = get_change('Accounts Receivable')
-        change_inv = get_change('Inventory')
-        change_ap = get_change('Accounts Payable')
-        change_wages = get_change('Salaries and Wages Payable')
-        change_gift_card = 0.0  # Decorative, unless you have such an account
-
-        # Correct cash flow logic:
-        net_operating = (
-            net_income
-            + depreciation
-            - change_ar      # AR: increase is negative, decrease is positive
-            - change_inv     # Inventory: increase is negative, decrease is positive
-            + change_ap      # AP: increase is positive, decrease is negative
-            + change_wages   # Wages Payable: increase is positive, decrease is negative
-            + change_gift_card
-        )
-
-        # For reporting, only show nonzero changes, with correct sign and label
-        lines = []
-        lines.append('CASH FLOWS FROM OPERATING ACTIVITIES')
-        lines.append(f'Net Income{"":.<40}{net_income:>10,.0f}')
-        lines.append('Adjustments:')
-        lines.append(f'+ Depreciation & Amortization{"":.<25}{depreciation:>10,.0f}')
-        lines.append('Changes in Working Capital:')
-        # AR
-        if change_ar > 0:
-            lines.append(f'- Increase in Accounts Receivable{"":.<15}{change_ar:>10,.0f}')
-        elif change_ar < 0:
-            lines.append(f'+ Decrease in Accounts Receivable{"":.<15}{-change_ar:>10,.0f}')
-        # Inventory
-        if change_inv > 0:
-            lines.append(f'- Increase in Inventory{"":.<23}{change_inv:>10,.0f}')
-        elif change_inv < 0:
-            lines.append(f'+ Decrease in Inventory{"":.<23}{-change_inv:>10,.0f}')
-        # AP
-        if change_ap > 0:
-            lines.append(f'+ Increase in Accounts Payable{"":.<17}{change_ap:>10,.0f}')
-        elif change_ap < 0:
-            lines.append(f'- Decrease in Accounts Payable{"":.<17}{-change_ap:>10,.0f}')
-        # Wages Payable
-        if change_wages > 0:
-            lines.append(f'+ Increase in Accrued Wages Payable{"":.<7}{change_wages:>10,.0f}')
-        elif change_wages < 0:
-            lines.append(f'- Decrease in Accrued Wages Payable{"":.<7}{-change_wages:>10,.0f}')
-        # Gift Card
-        if change_gift_card != 0:
-            if change_gift_card > 0:
-                lines.append(f'+ Increase in Gift Card Liability{"":.<11}{change_gift_card:>10,.0f}')
-            else:
-                lines.append(f'- Decrease in Gift Card Liability{"":.<11}{-change_gift_card:>10,.0f}')
-        lines.append(f'Net Cash Provided by Operating Activities{"":.<2}{net_operating:>10,.0f}\n')
-
-        # Investing Activities (decorative if not present)
-        purchase_equipment = -abs(get_change('Equipment'))  # Negative for purchase
-        sale_equipment = abs(get_change('Equipment'))  # Positive for sale
-        net_investing = purchase_equipment + sale_equipment
-
-        # Financing Activities (decorative if not present)
-        proceeds_loan = 0.0  # Decorative
-        repayment_loan = 0.0  # Decorative
-        owner_distribution = 0.0  # Decorative
-        net_financing = proceeds_loan + repayment_loan + owner_distribution
-
-        # Cash summary
-        c.execute('SELECT SUM(debit) - SUM(credit) FROM journal_lines jl JOIN accounts a ON jl.account_id = a.id WHERE a.name = "Cash"')
-        cash_end = c.fetchone()[0] or 0.0
-        cash_begin = cash_end - (net_operating + net_investing + net_financing)
-        net_increase = cash_end - cash_begin
-
-        lines.append('CASH FLOWS FROM INVESTING ACTIVITIES')
-        lines.append(f'- Purchase of New Equipment{"":.<22}{purchase_equipment:>10,.0f}')
-        lines.append(f'+ Proceeds from Sale of Equipment{"":.<13}{sale_equipment:>10,.0f}')
-        lines.append(f'Net Cash Provided by Investing Activities{"":.<5}{net_investing:>10,.0f}\n')
-
-        lines.append('CASH FLOWS FROM FINANCING ACTIVITIES')
-        lines.append(f'+ Proceeds from Line of Credit Drawdown{"":.<4}{proceeds_loan:>10,.0f}')
-        lines.append(f'- Repayment of Equipment Loan Principal{"":.<2}{repayment_loan:>10,.0f}')
-        lines.append(f'- Owner Distribution{"":.<28}{owner_distribution:>10,.0f}')
-        lines.append(f'Net Cash Provided by Financing Activities{"":.<5}{net_financing:>10,.0f}\n')
-
-        lines.append(f'NET INCREASE IN CASH{"":.<32}{net_increase:>10,.0f}')
-        lines.append(f'CASH AT BEGINNING OF PERIOD{"":.<23}{cash_begin:>10,.0f}')
-        lines.append(f'CASH AT END OF PERIOD{"":.<28}{cash_end:>10,.0f}')
+    def show_balance_sheet(self):
+        self.run_report(balance_sheet_lines)
 
-        self.report_text.delete('1.0', tb.END)
-        self.report_text.insert(tb.END, '\n'.join(lines))
+    def show_cash_flow_statement(self):
+        self.run_report(cash_flow_lines)
 
     def show_trial_balance(self):
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        from_date = self.report_from_var.get()
-        to_date = self.report_to_var.get()
-        # List of accounts in the order from the image
-        account_list = [
-            'Cash',
-            'Accounts Receivable',
-            'Supplies',
-            'Prepaid Insurance',
-            'Equipment',
-            'Accumulated Depreciation—Equipment',
-            'Notes Payable',
-            'Accounts Payable',
-            'Unearned Service Revenue',
-            'Salaries and Wages Payable',
-            'Interest Payable',
-            'Common Stock',
-            'Retained Earnings',
-            'Dividends',
-            'Service Revenue',
-            'Salaries and Wages Expense',
-            'Supplies Expense',
-            'Rent Expense',
-            'Insurance Expense',
-            'Interest Expense',
-            'Depreciation Expense',
-        ]
-        # Get all balances from the database
-        c.execute('''
-            SELECT a.name, SUM(jl.debit), SUM(jl.credit)
-            FROM accounts a
-            LEFT JOIN journal_lines jl ON a.id = jl.account_id
-            GROUP BY a.name
-        ''')
-        balances = {row[0]: (row[1] or 0.0, row[2] or 0.0) for row in c.fetchall()}
-        conn.close()
-        # Table column widths
-        col1 = 36  # Account
-        col2 = 18  # Debit
-        col3 = 18  # Credit
-        sep = ' | '
-        # Header
-        lines = []
-        lines.append('=' * (col1 + col2 + col3 + 2 * len(sep)))
-        lines.append('ADJUSTED TRIAL BALANCE'.center(col1 + col2 + col3 + 2 * len(sep)))
-        lines.append('=' * (col1 + col2 + col3 + 2 * len(sep)))
-        lines.append(f'{"Account":<{col1}}{sep}{"Debit":>{col2}}{sep}{"Credit":>{col3}}')
-        lines.append('-' * (col1 + col2 + col3 + 2 * len(sep)))
-        total_debit = 0.0
-        total_credit = 0.0
-        for acc in account_list:
-            debit, credit = balances.get(acc, (0.0, 0.0))
-            # Net balance logic: asset/expense/dividend = debit, liability/equity/revenue = credit
-            # For accumulated depreciation, treat as credit (contra-asset)
-            if acc == 'Accumulated Depreciation—Equipment':
-                net = credit - debit
-            else:
-                net = debit - credit
-            debit_val = net if net > 0 else 0.0
-            credit_val = -net if net < 0 else 0.0
-            total_debit += debit_val
-            total_credit += credit_val
-            lines.append(f'{acc:<{col1}}{sep}{debit_val:>{col2}.2f}{sep}{credit_val:>{col3}.2f}')
-        lines.append('-' * (col1 + col2 + col3 + 2 * len(sep)))
-        lines.append(f'{"TOTALS":<{col1}}{sep}{total_debit:>{col2}.2f}{sep}{total_credit:>{col3}.2f}')
-        
-        # Add verification message
-        if abs(total_debit - total_credit) < 0.01:  # Using small epsilon for floating point comparison
-            lines.append('\nVERIFICATION: Debits equal Credits ✓')
-        else:
-            lines.append('\nVERIFICATION: Debits do not equal Credits! ✗')
-            lines.append(f'Difference: {abs(total_debit - total_credit):.2f}')
-        
-        lines.append('=' * (col1 + col2 + col3 + 2 * len(sep)))
-        lines.append('End of Adjusted Trial Balance'.center(col1 + col2 + col3 + 2 * len(sep)))
-        lines.append('=' * (col1 + col2 + col3 + 2 * len(sep)))
-        self.report_text.delete('1.0', tb.END)
-        self.report_text.insert(tb.END, '\n'.join(lines))
+        self.run_report(trial_balance_lines)
 
     def save_inventory_item(self):
         name = self.inv_name_var.get().strip()
@@ -3819,52 +2636,37 @@ class AISApp(tb.Window):
         except ValueError:
             self.set_status('Quantity, Cost, and Price must be numbers.', error=True)
             return
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        # Ensure Inventory Adjustment account exists
-        c.execute('SELECT id FROM accounts WHERE name = ?', ('Inventory Adjustment',))
-        adj_row = c.fetchone()
-        if not adj_row:
-            c.execute('INSERT INTO accounts (name, type) VALUES (?, ?)', ('Inventory Adjustment', 'Equity'))
-            adj_id = c.lastrowid
-        else:
-            adj_id = adj_row[0]
-        # Get Inventory account id
-        c.execute('SELECT id FROM accounts WHERE name = ?', ('Inventory',))
-        inv_id = c.fetchone()[0]
-        today = datetime.datetime.now().strftime('%Y-%m-%d')
-        if self.inv_edit_id:
-            # Editing existing item: get old value
-            c.execute('SELECT quantity, cost FROM inventory WHERE id=?', (self.inv_edit_id,))
-            old_qty, old_cost = c.fetchone()
-            old_value = (old_qty or 0) * (old_cost or 0)
-            new_value = qty_val * cost_val
-            diff = new_value - old_value
-            c.execute('UPDATE inventory SET name=?, sku=?, quantity=?, cost=?, price=? WHERE id=?', (name, sku, qty_val, cost_val, price_val, self.inv_edit_id))
-            self.set_status('Inventory item updated.')
-            if diff != 0:
-                c.execute('INSERT INTO journal_entries (date, description) VALUES (?, ?)', (today, f'Inventory adjustment for {name}'))
-                entry_id = c.lastrowid
-                if diff > 0:
-                    # Increase: Debit Inventory, Credit Adjustment
-                    c.execute('INSERT INTO journal_lines (entry_id, account_id, debit, credit) VALUES (?, ?, ?, ?)', (entry_id, inv_id, diff, 0))
-                    c.execute('INSERT INTO journal_lines (entry_id, account_id, debit, credit) VALUES (?, ?, ?, ?)', (entry_id, adj_id, 0, diff))
-                else:
-                    # Decrease: Credit Inventory, Debit Adjustment
-                    c.execute('INSERT INTO journal_lines (entry_id, account_id, debit, credit) VALUES (?, ?, ?, ?)', (entry_id, inv_id, 0, -diff))
-                    c.execute('INSERT INTO journal_lines (entry_id, account_id, debit, credit) VALUES (?, ?, ?, ?)', (entry_id, adj_id, -diff, 0))
-        else:
-            c.execute('INSERT INTO inventory (name, sku, quantity, cost, price) VALUES (?, ?, ?, ?, ?)', (name, sku, qty_val, cost_val, price_val))
-            self.set_status('Inventory item added.')
-            # Journal entry for new inventory
-            value = qty_val * cost_val
-            if value != 0:
-                c.execute('INSERT INTO journal_entries (date, description) VALUES (?, ?)', (today, f'Inventory added: {name}'))
-                entry_id = c.lastrowid
-                c.execute('INSERT INTO journal_lines (entry_id, account_id, debit, credit) VALUES (?, ?, ?, ?)', (entry_id, inv_id, value, 0))
-                c.execute('INSERT INTO journal_lines (entry_id, account_id, debit, credit) VALUES (?, ?, ?, ?)', (entry_id, adj_id, 0, value))
-        conn.commit()
-        conn.close()
+        # Created on first use if missing
+        accounts = {'Inventory': 'Asset', 'Inventory Adjustment': 'Equity'}
+        with self.db.transaction() as c:
+            today = datetime.datetime.now().strftime('%Y-%m-%d')
+            if self.inv_edit_id:
+                # Editing existing item: get old value
+                c.execute('SELECT quantity, cost FROM inventory WHERE id=?', (self.inv_edit_id,))
+                old_qty, old_cost = c.fetchone()
+                old_value = (old_qty or 0) * (old_cost or 0)
+                new_value = qty_val * cost_val
+                diff = new_value - old_value
+                c.execute('UPDATE inventory SET name=?, sku=?, quantity=?, cost=?, price=? WHERE id=?', (name, sku, qty_val, cost_val, price_val, self.inv_edit_id))
+                self.set_status('Inventory item updated.')
+                if diff != 0:
+                    if diff > 0:
+                        # Increase: Debit Inventory, Credit Adjustment
+                        lines = [('Inventory', diff, 0), ('Inventory Adjustment', 0, diff)]
+                    else:
+                        # Decrease: Credit Inventory, Debit Adjustment
+                        lines = [('Inventory', 0, -diff), ('Inventory Adjustment', -diff, 0)]
+                    post_entry(self.db, self.refs, f'Inventory adjustment for {name}', lines,
+                               date=today, new_accounts=accounts)
+            else:
+                c.execute('INSERT INTO inventory (name, sku, quantity, cost, price) VALUES (?, ?, ?, ?, ?)', (name, sku, qty_val, cost_val, price_val))
+                self.set_status('Inventory item added.')
+                # Journal entry for new inventory
+                value = qty_val * cost_val
+                if value != 0:
+                    post_entry(self.db, self.refs, f'Inventory added: {name}',
+                               [('Inventory', value, 0), ('Inventory Adjustment', 0, value)],
+                               date=today, new_accounts=accounts)
         self.inv_name_var.set('')
         self.inv_sku_var.set('')
         self.inv_qty_var.set('')
@@ -3895,6 +2697,13 @@ class AISApp(tb.Window):
         self.inv_price_var.set(item[5])
 
 if __name__ == '__main__':
-    init_db()
-    app = AISApp()
-    app.mainloop() 
\ No newline at end of file
+    db = Database(DB_NAME)
+    init_db(db)
+    app = AISApp(db)
+    app.mainloop()
+    app.changes.shutdown()
+    app.worker.shutdown()
+    app.service.close()
+    app.writes.close()
+    db.close_all()
+ 
\ No newline at end of file
@@ -0,0 +1,105 @@
+import threading
+from collections import namedtuple
+
+from ais_db import REFERENCE_TABLES
+
+Account = namedtuple('Account', REFERENCE_TABLES['accounts'])
+MenuItem = namedtuple('MenuItem', REFERENCE_TABLES['menu_items'])
+Table = namedtuple('Table', REFERENCE_TABLES['tables'])
+Supplier = namedtuple('Supplier', REFERENCE_TABLES['suppliers'])
+Customer = namedtuple('Customer', REFERENCE_TABLES['customers'])
+InventoryItem = namedtuple('InventoryItem', REFERENCE_TABLES['inventory'])
+
+ROW_TYPES = {
+    'accounts': (Account, 'name'),
+    'menu_items': (MenuItem, 'name'),
+    'tables': (Table, 'table_number'),
+    'suppliers': (Supplier, 'name'),
+    'customers': (Customer, 'name'),
+    'inventory': (InventoryItem, 'name'),
+}
+
+
+class ReferenceCache:
+    # Small, rarely edited tables kept in memory as typed rows keyed by the
+    # name the forms use, so name -> id lookups cost a dict access instead of
+    # a query. Each table is loaded on first use and dropped when its counter
+    # in ref_versions moves (see ais_db.REFERENCE_TABLES). ref_versions is
+    # only read when the connection may have seen a write since the last
+    # check: PRAGMA data_version moves on commits by other connections and
+    # total_changes on writes by this one, so a lookup made right after an
+    # INSERT in the same transaction already sees the new row.
+    def __init__(self, db):
+        self.db = db
+        self._lock = threading.Lock()
+        self._tables = {}
+        self._versions = {}
+        self._token = None
+
+    def rows(self, table):
+        # {key: row} in key order for one of the REFERENCE_TABLES
+        with self._lock:
+            self._validate()
+            rows = self._tables.get(table)
+            if rows is None:
+                rows = self._tables[table] = self._load(table)
+            return rows
+
+    def get(self, table, key):
+        return self.rows(table).get(key)
+
+    def names(self, table):
+        return list(self.rows(table))
+
+    def invalidate(self, table=None):
+        with self._lock:
+            if table is None:
+                self._tables.clear()
+            else:
+                self._tables.pop(table, None)
+
+    def account_id(self, name):
+        row = self.get('accounts', name)
+        return row.id if row else None
+
+    def menu_item(self, name):
+        return self.get('menu_items', name)
+
+    def table(self, number):
+        return self.get('tables', int(number))
+
+    def supplier_id(self, name):
+        row = self.get('suppliers', name)
+        return row.id if row else None
+
+    def customer_id(self, name):
+        row = self.get('customers', name)
+        return row.id if row else None
+
+    def inventory_id(self, name):
+        row = self.get('inventory', name)
+        return row.id if row else None
+
+    def _validate(self):
+        conn = self.db.connect()
+        token = (id(conn), conn.execute('PRAGMA data_version').fetchone()[0],
+                 conn.total_changes, conn.in_transaction)
+        if token == self._token:
+            return
+        versions = dict(conn.execute('SELECT name, version FROM ref_versions').fetchall())
+        for table, version in versions.items():
+            if self._versions.get(table) != version:
+                self._tables.pop(table, None)
+        self._versions = versions
+        self._token = token
+
+    def _load(self, table):
+        row_type, key = ROW_TYPES[table]
+        order = f'{key}, id'
+        rows = {}
+        for values in self.db.query(f'SELECT {", ".join(row_type._fields)} FROM {table} ORDER BY {order}'):
+            row = row_type(*values)
+            # Names are not unique in the schema; the first (lowest id) wins,
+            # as with the fetchone() lookups this replaces
+            rows.setdefault(getattr(row, key), row)
+        return rows
@@ -0,0 +1,70 @@
+from ais_db import CHANGELOG_KEEP
+
+# Above this many changed keys a view reloads everything instead of
+# re-reading the keys one IN list at a time
+MAX_TARGETED_KEYS = 500
+
+
+class ChangeWatcher:
+    # Tells open views which orders and tables changed, whoever changed them:
+    # this window, another window or a terminal on the same database. The
+    # triggers in ais_db.CHANGELOG_TRIGGERS log every change to orders,
+    # order_items and tables by topic ('order', 'table') and key.
+    #
+    # A check runs on the Tk thread every poll_ms. It costs one PRAGMA
+    # data_version (moves on commits by other connections) unless that or
+    # total_changes (writes by this connection) moved, and only then reads
+    # the changelog entries past the last one seen. Subscribers get the set
+    # of changed keys, or None when they must reload everything because
+    # the entries they missed were pruned.
+    def __init__(self, widget, db, poll_ms=500):
+        self.widget = widget
+        self.db = db
+        self.poll_ms = poll_ms
+        self._subscribers = {}
+        self._token = None
+        self._seq = self.db.query_one('SELECT COALESCE(MAX(seq), 0) FROM changelog')[0]
+        self._closed = False
+        self.widget.after(self.poll_ms, self._poll)
+
+    def subscribe(self, topic, callback):
+        # callback(keys) runs on the Tk thread
+        self._subscribers.setdefault(topic, []).append(callback)
+
+    def shutdown(self):
+        self._closed = True
+
+    def check(self):
+        # Reads and dispatches pending changes now; returns {topic: keys}
+        conn = self.db.connect()
+        token = (id(conn), conn.execute('PRAGMA data_version').fetchone()[0], conn.total_changes)
+        if token == self._token:
+            return {}
+        self._token = token
+        rows = conn.execute('SELECT seq, topic, key FROM changelog WHERE seq > ? ORDER BY seq',
+                            (self._seq,)).fetchall()
+        if not rows:
+            return {}
+        changes = {}
+        if rows[0][0] > self._seq + 1 and rows[-1][0] - self._seq >= CHANGELOG_KEEP:
+            # Entries between the last one seen and the oldest kept are gone
+            changes = dict.fromkeys(self._subscribers)
+        else:
+            for _, topic, key in rows:
+                changes.setdefault(topic, set()).add(key)
+        self._seq = rows[-1][0]
+        for topic, keys in changes.items():
+            if keys is not None and len(keys) > MAX_TARGETED_KEYS:
+                keys = None
+            for callback in self._subscribers.get(topic, ()):
+                callback(keys)
+        return changes
+
+    def _poll(self):
+        if self._closed:
+            return
+        try:
+            self.check()
+        finally:
+            if not self._closed:
+                self.widget.after(self.poll_ms, self._poll)
@@ -0,0 +1,1043 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from ais_orders import KITCHEN_ORDERS_SQL, UNPAID_ORDERS_SQL, order_condition
+
+DB_NAME = 'ais.db'
+
+# Storage profiles, selected with AIS_STORAGE_PROFILE or Database(profile=...).
+# Both run in WAL mode so the Cashier writing a payment does not block the
+# Kitchen tab (or another terminal) reading. 'durable' keeps synchronous=FULL
+# so a committed sale survives power loss; 'fast' relaxes it to NORMAL, which
+# in WAL mode can only lose the last commits on an OS crash, never corrupt.
+# journal_mode is stored in the database file and is set once by init_db; the
+# rest are per-connection and applied on every connect.
+STORAGE_PROFILES = {
+    'durable': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'cache_size': -16000,  # KiB
+        'temp_store': 'MEMORY',
+        'busy_timeout': 10000,  # ms
+    },
+    'fast': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -64000,  # KiB
+        'mmap_size': 268435456,  # bytes
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,  # ms
+    },
+}
+DEFAULT_PROFILE = 'fast'
+
+
+class Database:
+    # Shared session for every handler. Each thread gets one long-lived
+    # connection (sqlite3 connections must not be shared across threads), so
+    # connection setup, schema parsing and the page cache are paid once per
+    # thread instead of once per click. The per-connection statement cache
+    # keeps the prepared form of the hot queries around between calls.
+    def __init__(self, path=DB_NAME, profile=None, pragmas=None, cached_statements=256, timeout=5.0):
+        self.path = path
+        self.profile = profile or os.environ.get('AIS_STORAGE_PROFILE', DEFAULT_PROFILE)
+        if self.profile not in STORAGE_PROFILES:
+            raise ValueError(f'Unknown storage profile: {self.profile}')
+        settings = dict(STORAGE_PROFILES[self.profile])
+        settings.update(pragmas or {})
+        self.journal_mode = settings.pop('journal_mode', None)
+        self.pragmas = settings
+        self.cached_statements = cached_statements
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+
+    def connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout,
+                                   cached_statements=self.cached_statements,
+                                   check_same_thread=False)
+            self.apply_pragmas(conn)
+            self._local.conn = conn
+            self._local.depth = 0
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def apply_pragmas(self, conn, pragmas=None):
+        for name, value in (self.pragmas if pragmas is None else pragmas).items():
+            conn.execute(f'PRAGMA {name}={value}')
+
+    def apply_journal_mode(self):
+        # Needs no open transaction on this connection; init_db calls it first.
+        if self.journal_mode:
+            return self.connect().execute(f'PRAGMA journal_mode={self.journal_mode}').fetchone()[0]
+
+    def cursor(self):
+        return self.connect().cursor()
+
+    def execute(self, sql, params=()):
+        return self.connect().execute(sql, params)
+
+    def query(self, sql, params=()):
+        return self.connect().execute(sql, params).fetchall()
+
+    def query_one(self, sql, params=()):
+        return self.connect().execute(sql, params).fetchone()
+
+    @contextmanager
+    def transaction(self, immediate=False):
+        # Commits on success and rolls back on any exception. Nested blocks
+        # join the outermost transaction, so helpers can open their own block
+        # and still be composed into a larger unit of work. immediate=True
+        # takes the write lock up front instead of upgrading mid-transaction.
+        conn = self.connect()
+        local = self._local
+        if local.depth == 0 and immediate and not conn.in_transaction:
+            conn.execute('BEGIN IMMEDIATE')
+        local.depth += 1
+        try:
+            yield conn.cursor()
+        except BaseException:
+            local.depth -= 1
+            if local.depth == 0:
+                conn.rollback()
+            raise
+        local.depth -= 1
+        if local.depth == 0:
+            conn.commit()
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.conn = None
+            with self._lock:
+                self._connections.remove(conn)
+            conn.close()
+
+    def close_all(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+
+# Secondary indexes for the hot foreign-key and filter columns. They are
+# created with IF NOT EXISTS by init_db, so adding one here is all it takes.
+INDEXES = {
+    'idx_journal_lines_account': 'journal_lines(account_id, debit, credit)',
+    'idx_journal_lines_entry': 'journal_lines(entry_id)',
+    'idx_journal_entries_date': 'journal_entries(entry_date)',
+    'idx_order_items_order': 'order_items(order_id)',
+    'idx_orders_payment_date': 'orders(payment_status, order_date)',
+    'idx_orders_status_date': 'orders(status, order_date)',
+    'idx_orders_date': 'orders(order_date)',
+    'idx_orders_table_status': 'orders(table_number, status)',
+    'idx_menu_items_name': 'menu_items(name)',
+    'idx_menu_item_ingredients_inventory': 'menu_item_ingredients(inventory_id)',
+    'idx_menu_item_ingredients_item': 'menu_item_ingredients(menu_item_id)',
+    'idx_purchase_items_purchase': 'purchase_items(purchase_id)',
+    'idx_accounts_name': 'accounts(name)',
+    'idx_customers_name': 'customers(name)',
+    'idx_suppliers_name': 'suppliers(name)',
+    'idx_inventory_name': 'inventory(name)',
+}
+
+# The queries the handlers run on every refresh, with representative
+# parameters, so check_query_plans can confirm none of them scans a table.
+# Listings that live in other modules are taken from there, so the plans
+# checked are of the statements actually run.
+HOT_QUERIES = {
+    'journal lines': ('''SELECT jl.id, a.name, jl.debit, jl.credit FROM journal_lines jl
+                         JOIN accounts a ON jl.account_id = a.id WHERE jl.entry_id=?''', (1,)),
+    'kitchen orders': (KITCHEN_ORDERS_SQL.format(condition=''), ()),
+    'kitchen orders by id': (KITCHEN_ORDERS_SQL.format(condition=order_condition([1])[0]), (1,)),
+    'unpaid orders': (UNPAID_ORDERS_SQL.format(condition=''), ()),
+    'unpaid orders by id': (UNPAID_ORDERS_SQL.format(condition=order_condition([1])[0]), (1,)),
+    'period balances': ('''SELECT jl.account_id, SUM(jl.debit), SUM(jl.credit)
+                           FROM journal_entries je
+                           JOIN journal_lines jl ON jl.entry_id = je.id
+                           WHERE je.entry_date BETWEEN ? AND ?
+                           GROUP BY jl.account_id''', ('2000-01-01', '2000-01-31')),
+    'nearest snapshot': ('''SELECT period_end FROM period_closes
+                            WHERE stale = 0 AND period_end <= ?
+                            ORDER BY period_end DESC LIMIT 1''', ('2000-01-31',)),
+    'order by number': ('SELECT total_amount, cost_amount, payment_status FROM orders WHERE order_number = ?',
+                        ('ORD',)),
+    'sales by day': ('''SELECT sale_date, SUM(orders), SUM(revenue) FROM sales_daily
+                        WHERE sale_date BETWEEN ? AND ? GROUP BY sale_date''', ('2000-01-01', '2000-01-31')),
+    'sales by item': ('''SELECT menu_item_id, SUM(quantity), SUM(revenue) FROM sales_daily_items
+                         WHERE sale_date BETWEEN ? AND ? GROUP BY menu_item_id''', ('2000-01-01', '2000-01-31')),
+    'table orders': ('''SELECT COUNT(*) FROM orders
+                        WHERE table_number = ? AND status IN ('pending', 'in kitchen', 'served')''', (1,)),
+    'menu item by name': ('SELECT id, price FROM menu_items WHERE name = ?', ('',)),
+    'recipe ingredients': ('''SELECT ki.name, ki.quantity, mi.quantity, ki.cost_per_unit
+                              FROM menu_item_ingredients mi
+                              JOIN kitchen_inventory ki ON mi.inventory_id = ki.id
+                              WHERE mi.menu_item_id = ?''', (1,)),
+    'purchase items': ('''SELECT pi.id, i.name, pi.quantity, pi.cost FROM purchase_items pi
+                          JOIN inventory i ON pi.inventory_id = i.id WHERE pi.purchase_id=?''', (1,)),
+    'account by name': ('SELECT id FROM accounts WHERE name = ?', ('Cash',)),
+}
+
+
+# Same, for columns that must not repeat
+UNIQUE_INDEXES = {
+    'idx_orders_number': 'orders(order_number)',
+}
+
+
+def create_indexes(c):
+    for name, target in INDEXES.items():
+        c.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {target}')
+    for name, target in UNIQUE_INDEXES.items():
+        c.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS {name} ON {target}')
+
+
+def make_order_numbers_unique(c):
+    # Databases from before order_sequences may hold numbers that two orders
+    # got in the same second, with a plain index on order_number or none at
+    # all. The first order keeps its number; the others get '-<order id>'
+    # added, so the unique index can be built.
+    c.execute('PRAGMA index_list(orders)')
+    for _, name, unique, *_ in c.fetchall():
+        if unique and [row[2] for row in c.execute(f'PRAGMA index_info({name})').fetchall()] == ['order_number']:
+            return
+    c.execute('''
+        UPDATE orders SET order_number = order_number || '-' || id
+        WHERE order_number IN (SELECT order_number FROM orders GROUP BY order_number HAVING COUNT(*) > 1)
+          AND id NOT IN (SELECT MIN(id) FROM orders GROUP BY order_number)
+    ''')
+    c.execute('DROP INDEX IF EXISTS idx_orders_number')
+
+
+def check_query_plans(db, queries=None):
+    # Returns {query name: (uses_indexes, plan details)}. A bare "SCAN table"
+    # step means a full table scan; index and rowid lookups show up as
+    # "SEARCH ... USING ..." or "SCAN ... USING COVERING INDEX".
+    results = {}
+    for name, (sql, params) in (queries or HOT_QUERIES).items():
+        plan = [row[3] for row in db.query(f'EXPLAIN QUERY PLAN {sql}', params)]
+        full_scans = [step for step in plan if step.startswith('SCAN') and 'USING' not in step]
+        results[name] = (not full_scans, plan)
+    return results
+
+
+# account_balances holds the running debit/credit totals per account. These
+# triggers keep it current inside the same transaction as every insert,
+# update or delete on journal_lines, whichever handler issues it.
+BALANCE_TRIGGERS = [
+    '''CREATE TRIGGER IF NOT EXISTS trg_journal_lines_balance_insert
+       AFTER INSERT ON journal_lines
+       BEGIN
+           INSERT INTO account_balances (account_id, debit, credit)
+           VALUES (NEW.account_id, COALESCE(NEW.debit, 0), COALESCE(NEW.credit, 0))
+           ON CONFLICT(account_id) DO UPDATE SET
+               debit = debit + excluded.debit,
+               credit = credit + excluded.credit;
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS trg_journal_lines_balance_delete
+       AFTER DELETE ON journal_lines
+       BEGIN
+           UPDATE account_balances
+           SET debit = debit - COALESCE(OLD.debit, 0),
+               credit = credit - COALESCE(OLD.credit, 0)
+           WHERE account_id = OLD.account_id;
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS trg_journal_lines_balance_update
+       AFTER UPDATE OF account_id, debit, credit ON journal_lines
+       BEGIN
+           UPDATE account_balances
+           SET debit = debit - COALESCE(OLD.debit, 0),
+               credit = credit - COALESCE(OLD.credit, 0)
+           WHERE account_id = OLD.account_id;
+           INSERT INTO account_balances (account_id, debit, credit)
+           VALUES (NEW.account_id, COALESCE(NEW.debit, 0), COALESCE(NEW.credit, 0))
+           ON CONFLICT(account_id) DO UPDATE SET
+               debit = debit + excluded.debit,
+               credit = credit + excluded.credit;
+       END''',
+]
+
+
+ENTRY_DATE_TRIGGERS = [
+    '''CREATE TRIGGER IF NOT EXISTS trg_journal_entries_date_insert
+       AFTER INSERT ON journal_entries
+       BEGIN
+           UPDATE journal_entries
+           SET entry_date = COALESCE(date(NEW.date), substr(NEW.date, 1, 10))
+           WHERE id = NEW.id;
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS trg_journal_entries_date_update
+       AFTER UPDATE OF date ON journal_entries
+       BEGIN
+           UPDATE journal_entries
+           SET entry_date = COALESCE(date(NEW.date), substr(NEW.date, 1, 10))
+           WHERE id = NEW.id;
+       END''',
+]
+
+
+# period_snapshots holds per-account closing balances for each closed period
+# (see ais_reports.close_period). Any journal change dated on or before a
+# period end marks that close stale so it is recomputed before it is used.
+SNAPSHOT_TRIGGERS = [
+    '''CREATE TRIGGER IF NOT EXISTS trg_journal_lines_snapshot_insert
+       AFTER INSERT ON journal_lines
+       BEGIN
+           UPDATE period_closes SET stale = 1
+           WHERE stale = 0
+             AND period_end >= (SELECT entry_date FROM journal_entries WHERE id = NEW.entry_id);
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS trg_journal_lines_snapshot_delete
+       AFTER DELETE ON journal_lines
+       BEGIN
+           UPDATE period_closes SET stale = 1
+           WHERE stale = 0
+             AND period_end >= (SELECT entry_date FROM journal_entries WHERE id = OLD.entry_id);
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS trg_journal_lines_snapshot_update
+       AFTER UPDATE OF entry_id, account_id, debit, credit ON journal_lines
+       BEGIN
+           UPDATE period_closes SET stale = 1
+           WHERE stale = 0
+             AND (period_end >= (SELECT entry_date FROM journal_entries WHERE id = OLD.entry_id)
+                  OR period_end >= (SELECT entry_date FROM journal_entries WHERE id = NEW.entry_id));
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS trg_journal_entries_snapshot_update
+       AFTER UPDATE OF date ON journal_entries
+       BEGIN
+           UPDATE period_closes SET stale = 1
+           WHERE stale = 0
+             AND (period_end >= OLD.entry_date
+                  OR period_end >= COALESCE(date(NEW.date), substr(NEW.date, 1, 10)));
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS trg_journal_entries_snapshot_delete
+       AFTER DELETE ON journal_entries
+       BEGIN
+           UPDATE period_closes SET stale = 1
+           WHERE stale = 0 AND period_end >= OLD.entry_date;
+       END''',
+]
+
+
+# Trigram FTS5 indexes over the text columns the tabs search on. They are
+# external-content tables (the text lives only in the source table) kept in
+# sync by triggers, so a substring search is an index lookup instead of a
+# scan of the whole catalog.
+SEARCH_INDEXES = {
+    'accounts': ('name', 'type'),
+    'customers': ('name', 'contact'),
+    'suppliers': ('name', 'contact'),
+    'inventory': ('name', 'sku'),
+    'menu_items': ('name', 'description'),
+    'expenses': ('date', 'type', 'description'),
+    'receivables': ('customer', 'due_date'),
+}
+
+
+def search_triggers(table, columns):
+    fts = f'{table}_fts'
+    names = ', '.join(columns)
+    new = ', '.join(f'NEW.{column}' for column in columns)
+    old = ', '.join(f'OLD.{column}' for column in columns)
+    return [
+        f'''CREATE TRIGGER IF NOT EXISTS trg_{fts}_insert AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO {fts} (rowid, {names}) VALUES (NEW.id, {new});
+            END''',
+        f'''CREATE TRIGGER IF NOT EXISTS trg_{fts}_delete AFTER DELETE ON {table}
+            BEGIN
+                INSERT INTO {fts} ({fts}, rowid, {names}) VALUES ('delete', OLD.id, {old});
+            END''',
+        f'''CREATE TRIGGER IF NOT EXISTS trg_{fts}_update AFTER UPDATE OF {names} ON {table}
+            BEGIN
+                INSERT INTO {fts} ({fts}, rowid, {names}) VALUES ('delete', OLD.id, {old});
+                INSERT INTO {fts} (rowid, {names}) VALUES (NEW.id, {new});
+            END''',
+    ]
+
+
+def create_search_indexes(c):
+    # Returns False when this SQLite build lacks FTS5 or the trigram
+    # tokenizer (3.34+); searches then fall back to scanning.
+    for table, columns in SEARCH_INDEXES.items():
+        fts = f'{table}_fts'
+        c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts,))
+        if c.fetchone() is None:
+            try:
+                c.execute(f'''CREATE VIRTUAL TABLE {fts} USING fts5(
+                    {', '.join(columns)}, content='{table}', content_rowid='id', tokenize='trigram')''')
+            except sqlite3.OperationalError:
+                return False
+            c.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+        for trigger in search_triggers(table, columns):
+            c.execute(trigger)
+    return True
+
+
+def rebuild_search_indexes(db):
+    with db.transaction() as c:
+        for table in SEARCH_INDEXES:
+            c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (f'{table}_fts',))
+            if c.fetchone() is not None:
+                c.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+
+
+# menu_item_costs holds each menu item's recipe (BOM) cost: the sum of its
+# ingredient quantities times their kitchen_inventory cost_per_unit. These
+# triggers recompute the affected items whenever a recipe line or an
+# ingredient's cost changes, so order costing and food-cost % are lookups.
+RECIPE_COST_SQL = '''
+    SELECT COALESCE(SUM(mii.quantity * ki.cost_per_unit), 0)
+    FROM menu_item_ingredients mii
+    JOIN kitchen_inventory ki ON ki.id = mii.inventory_id
+    WHERE mii.menu_item_id = {menu_item_id}'''
+
+RECIPE_COST_UPSERT = f'''
+    INSERT INTO menu_item_costs (menu_item_id, unit_cost)
+    SELECT {{menu_item_id}}, ({RECIPE_COST_SQL}) WHERE {{menu_item_id}} IS NOT NULL
+    ON CONFLICT(menu_item_id) DO UPDATE SET unit_cost = excluded.unit_cost;'''
+
+RECIPE_COST_TRIGGERS = [
+    f'''CREATE TRIGGER IF NOT EXISTS trg_menu_item_ingredients_cost_insert
+       AFTER INSERT ON menu_item_ingredients
+       BEGIN
+           {RECIPE_COST_UPSERT.format(menu_item_id='NEW.menu_item_id')}
+       END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_menu_item_ingredients_cost_delete
+       AFTER DELETE ON menu_item_ingredients
+       BEGIN
+           {RECIPE_COST_UPSERT.format(menu_item_id='OLD.menu_item_id')}
+       END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_menu_item_ingredients_cost_update
+       AFTER UPDATE OF menu_item_id, inventory_id, quantity ON menu_item_ingredients
+       BEGIN
+           {RECIPE_COST_UPSERT.format(menu_item_id='OLD.menu_item_id')}
+           {RECIPE_COST_UPSERT.format(menu_item_id='NEW.menu_item_id')}
+       END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_kitchen_inventory_cost_update
+       AFTER UPDATE OF cost_per_unit ON kitchen_inventory
+       BEGIN
+           UPDATE menu_item_costs
+           SET unit_cost = ({RECIPE_COST_SQL.format(menu_item_id='menu_item_costs.menu_item_id')})
+           WHERE menu_item_id IN (SELECT menu_item_id FROM menu_item_ingredients WHERE inventory_id = NEW.id);
+       END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_kitchen_inventory_cost_delete
+       AFTER DELETE ON kitchen_inventory
+       BEGIN
+           UPDATE menu_item_costs
+           SET unit_cost = ({RECIPE_COST_SQL.format(menu_item_id='menu_item_costs.menu_item_id')})
+           WHERE menu_item_id IN (SELECT menu_item_id FROM menu_item_ingredients WHERE inventory_id = OLD.id);
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS trg_menu_items_cost_delete
+       AFTER DELETE ON menu_items
+       BEGIN
+           DELETE FROM menu_item_costs WHERE menu_item_id = OLD.id;
+       END''',
+]
+
+
+# sales_daily and sales_daily_items roll paid orders up per day and payment
+# method, and per day and menu item. An order enters the rollup when it is
+# marked paid and leaves it if it is unpaid, edited or deleted, so the sales
+# reports and the Cashier summary read a few rows per day instead of
+# aggregating orders and order_items. Item cost is order_items.unit_cost,
+# the recipe cost (menu_item_costs) frozen when the item was ordered, the
+# same as orders.cost_amount, so a later ingredient price change cannot
+# make an order leave the rollup at a different cost than it entered.
+def sale_day(column):
+    # Same normalization as journal_entries.entry_date
+    return f'COALESCE(date({column}), substr({column}, 1, 10))'
+
+
+SALES_ORDER_ROLLUP = '''
+    INSERT INTO sales_daily (sale_date, payment_method, orders, revenue, cost)
+    SELECT {day}, COALESCE({o}.payment_method, ''), {sign}, {sign} * COALESCE({o}.total_amount, 0),
+           {sign} * COALESCE({o}.cost_amount, 0)
+    WHERE {o}.payment_status = 'paid'
+    ON CONFLICT(sale_date, payment_method) DO UPDATE SET
+        orders = orders + excluded.orders,
+        revenue = revenue + excluded.revenue,
+        cost = cost + excluded.cost;'''
+
+SALES_ITEM_ROLLUP = '''
+    INSERT INTO sales_daily_items (sale_date, menu_item_id, quantity, revenue, cost)
+    SELECT {day}, oi.menu_item_id, {sign} * SUM(oi.quantity), {sign} * SUM(oi.quantity * oi.price),
+           {sign} * SUM(oi.quantity * COALESCE(oi.unit_cost, 0))
+    FROM order_items oi
+    JOIN orders o ON o.id = oi.order_id
+    WHERE {where} AND oi.menu_item_id IS NOT NULL
+    GROUP BY oi.menu_item_id
+    ON CONFLICT(sale_date, menu_item_id) DO UPDATE SET
+        quantity = quantity + excluded.quantity,
+        revenue = revenue + excluded.revenue,
+        cost = cost + excluded.cost;'''
+
+# Drops the rows an unpaid or deleted order emptied on the given day(s)
+SALES_ROLLUP_CLEANUP = '''
+    DELETE FROM sales_daily WHERE sale_date = {day} AND orders = 0;
+    DELETE FROM sales_daily_items WHERE sale_date = {day} AND quantity = 0;'''
+
+SALES_ITEMS_CLEANUP = '''
+    DELETE FROM sales_daily_items WHERE quantity = 0 AND sale_date IN
+        (SELECT {day} FROM orders o WHERE o.id IN ({ids}));'''
+
+# Order items written without a unit cost get the current recipe cost
+ORDER_ITEM_COST_SQL = '''
+    UPDATE order_items
+    SET unit_cost = COALESCE((SELECT unit_cost FROM menu_item_costs
+                              WHERE menu_item_id = order_items.menu_item_id), 0)
+    WHERE {where};'''
+
+SALES_ROLLUP_TRIGGERS = [
+    f'''CREATE TRIGGER IF NOT EXISTS trg_order_items_unit_cost
+       AFTER INSERT ON order_items
+       WHEN NEW.unit_cost IS NULL
+       BEGIN
+           {ORDER_ITEM_COST_SQL.format(where='id = NEW.id')}
+       END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_orders_sales_update
+       AFTER UPDATE OF payment_status, payment_method, order_date, total_amount, cost_amount ON orders
+       WHEN OLD.payment_status = 'paid' OR NEW.payment_status = 'paid'
+       BEGIN
+           {SALES_ORDER_ROLLUP.format(o='OLD', day=sale_day('OLD.order_date'), sign=-1)}
+           {SALES_ORDER_ROLLUP.format(o='NEW', day=sale_day('NEW.order_date'), sign=1)}
+           {SALES_ITEM_ROLLUP.format(day=sale_day('OLD.order_date'), sign=-1,
+                                     where="o.id = OLD.id AND OLD.payment_status = 'paid'")}
+           {SALES_ITEM_ROLLUP.format(day=sale_day('NEW.order_date'), sign=1,
+                                     where="o.id = NEW.id AND NEW.payment_status = 'paid'")}
+           {SALES_ROLLUP_CLEANUP.format(day=sale_day('OLD.order_date'))}
+       END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_orders_sales_delete
+       BEFORE DELETE ON orders
+       WHEN OLD.payment_status = 'paid'
+       BEGIN
+           {SALES_ORDER_ROLLUP.format(o='OLD', day=sale_day('OLD.order_date'), sign=-1)}
+           {SALES_ITEM_ROLLUP.format(day=sale_day('OLD.order_date'), sign=-1, where='o.id = OLD.id')}
+           {SALES_ROLLUP_CLEANUP.format(day=sale_day('OLD.order_date'))}
+       END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_order_items_sales_insert
+       AFTER INSERT ON order_items
+       BEGIN
+           {SALES_ITEM_ROLLUP.format(day=sale_day('o.order_date'), sign=1,
+                                     where="oi.id = NEW.id AND o.payment_status = 'paid'")}
+       END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_order_items_sales_delete
+       BEFORE DELETE ON order_items
+       BEGIN
+           {SALES_ITEM_ROLLUP.format(day=sale_day('o.order_date'), sign=-1,
+                                     where="oi.id = OLD.id AND o.payment_status = 'paid'")}
+       END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_order_items_sales_delete_cleanup
+       AFTER DELETE ON order_items
+       BEGIN
+           {SALES_ITEMS_CLEANUP.format(day=sale_day('o.order_date'), ids='OLD.order_id')}
+       END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_order_items_sales_update_before
+       BEFORE UPDATE OF order_id, menu_item_id, quantity, price, unit_cost ON order_items
+       BEGIN
+           {SALES_ITEM_ROLLUP.format(day=sale_day('o.order_date'), sign=-1,
+                                     where="oi.id = OLD.id AND o.payment_status = 'paid'")}
+       END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_order_items_sales_update_after
+       AFTER UPDATE OF order_id, menu_item_id, quantity, price, unit_cost ON order_items
+       BEGIN
+           {SALES_ITEM_ROLLUP.format(day=sale_day('o.order_date'), sign=1,
+                                     where="oi.id = NEW.id AND o.payment_status = 'paid'")}
+           {SALES_ITEMS_CLEANUP.format(day=sale_day('o.order_date'), ids='OLD.order_id, NEW.order_id')}
+       END''',
+]
+
+
+def rebuild_sales_rollup(db):
+    with db.transaction() as c:
+        c.execute('DELETE FROM sales_daily')
+        c.execute('DELETE FROM sales_daily_items')
+        c.execute(f'''
+            INSERT INTO sales_daily (sale_date, payment_method, orders, revenue, cost)
+            SELECT {sale_day('order_date')}, COALESCE(payment_method, ''), COUNT(*),
+                   SUM(COALESCE(total_amount, 0)), SUM(COALESCE(cost_amount, 0))
+            FROM orders
+            WHERE payment_status = 'paid'
+            GROUP BY 1, 2
+        ''')
+        c.execute(f'''
+            INSERT INTO sales_daily_items (sale_date, menu_item_id, quantity, revenue, cost)
+            SELECT {sale_day('o.order_date')}, oi.menu_item_id, SUM(oi.quantity), SUM(oi.quantity * oi.price),
+                   SUM(oi.quantity * COALESCE(oi.unit_cost, 0))
+            FROM order_items oi
+            JOIN orders o ON o.id = oi.order_id
+            WHERE o.payment_status = 'paid' AND oi.menu_item_id IS NOT NULL
+            GROUP BY 1, 2
+            HAVING SUM(oi.quantity) != 0
+        ''')
+
+
+# changelog records which orders and tables each commit touched, so other
+# windows and terminals can refresh just those rows (see ais_changes). An
+# order_items change is logged against its order; an order change against
+# its table too, since the Tables tab shows each table's open orders. The
+# last CHANGELOG_KEEP entries are kept.
+CHANGELOG_KEEP = 10000
+
+
+def changelog_insert(*entries):
+    return ' '.join(f"INSERT INTO changelog (topic, key) VALUES ('{topic}', {key});" for topic, key in entries)
+
+
+CHANGELOG_TRIGGERS = [
+    f'''CREATE TRIGGER IF NOT EXISTS trg_orders_changelog_insert
+       AFTER INSERT ON orders
+       BEGIN {changelog_insert(('order', 'NEW.id'), ('table', 'NEW.table_number'))} END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_orders_changelog_update
+       AFTER UPDATE ON orders
+       BEGIN
+           {changelog_insert(('order', 'NEW.id'), ('table', 'NEW.table_number'))}
+           INSERT INTO changelog (topic, key) SELECT 'table', OLD.table_number
+           WHERE OLD.table_number IS NOT NEW.table_number;
+       END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_orders_changelog_delete
+       AFTER DELETE ON orders
+       BEGIN {changelog_insert(('order', 'OLD.id'), ('table', 'OLD.table_number'))} END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_order_items_changelog_insert
+       AFTER INSERT ON order_items
+       BEGIN {changelog_insert(('order', 'NEW.order_id'))} END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_order_items_changelog_update
+       AFTER UPDATE ON order_items
+       BEGIN
+           {changelog_insert(('order', 'NEW.order_id'))}
+           INSERT INTO changelog (topic, key) SELECT 'order', OLD.order_id
+           WHERE OLD.order_id IS NOT NEW.order_id;
+       END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_order_items_changelog_delete
+       AFTER DELETE ON order_items
+       BEGIN {changelog_insert(('order', 'OLD.order_id'))} END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_tables_changelog_insert
+       AFTER INSERT ON tables
+       BEGIN {changelog_insert(('table', 'NEW.table_number'))} END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_tables_changelog_update
+       AFTER UPDATE ON tables
+       BEGIN
+           {changelog_insert(('table', 'NEW.table_number'))}
+           INSERT INTO changelog (topic, key) SELECT 'table', OLD.table_number
+           WHERE OLD.table_number IS NOT NEW.table_number;
+       END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_tables_changelog_delete
+       AFTER DELETE ON tables
+       BEGIN {changelog_insert(('table', 'OLD.table_number'))} END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_changelog_prune
+       AFTER INSERT ON changelog
+       WHEN NEW.seq % 1000 = 0
+       BEGIN
+           DELETE FROM changelog WHERE seq <= NEW.seq - {CHANGELOG_KEEP};
+       END''',
+]
+
+
+# ref_versions counts changes to each table held by ais_cache.ReferenceCache.
+# The triggers fire only on the columns the cache keeps, so a table's status
+# flipping or an inventory count moving does not throw its cache away.
+REFERENCE_TABLES = {
+    'accounts': ('id', 'name', 'type'),
+    'menu_items': ('id', 'name', 'price', 'category', 'is_available'),
+    'tables': ('id', 'table_number', 'capacity'),
+    'suppliers': ('id', 'name', 'contact'),
+    'customers': ('id', 'name', 'contact'),
+    'inventory': ('id', 'name', 'sku', 'cost', 'price'),
+}
+
+
+def reference_triggers(table, columns):
+    bump = f"UPDATE ref_versions SET version = version + 1 WHERE name = '{table}';"
+    return [
+        f'''CREATE TRIGGER IF NOT EXISTS trg_{table}_ref_insert
+           AFTER INSERT ON {table}
+           BEGIN {bump} END''',
+        f'''CREATE TRIGGER IF NOT EXISTS trg_{table}_ref_delete
+           AFTER DELETE ON {table}
+           BEGIN {bump} END''',
+        f'''CREATE TRIGGER IF NOT EXISTS trg_{table}_ref_update
+           AFTER UPDATE OF {', '.join(columns)} ON {table}
+           BEGIN {bump} END''',
+    ]
+
+
+def rebuild_menu_item_costs(db):
+    with db.transaction() as c:
+        c.execute('DELETE FROM menu_item_costs')
+        c.execute('''
+            INSERT INTO menu_item_costs (menu_item_id, unit_cost)
+            SELECT mii.menu_item_id, COALESCE(SUM(mii.quantity * ki.cost_per_unit), 0)
+            FROM menu_item_ingredients mii
+            JOIN kitchen_inventory ki ON ki.id = mii.inventory_id
+            WHERE mii.menu_item_id IS NOT NULL
+            GROUP BY mii.menu_item_id
+        ''')
+
+
+def rebuild_account_balances(db):
+    with db.transaction() as c:
+        c.execute('DELETE FROM account_balances')
+        c.execute('''
+            INSERT INTO account_balances (account_id, debit, credit)
+            SELECT account_id, COALESCE(SUM(debit), 0), COALESCE(SUM(credit), 0)
+            FROM journal_lines
+            WHERE account_id IS NOT NULL
+            GROUP BY account_id
+        ''')
+
+
+def verify_account_balances(db, tolerance=0.005):
+    # Recomputes every balance from journal_lines and returns the accounts
+    # whose stored totals drifted: (account_id, stored (dr, cr), actual (dr, cr)).
+    rows = db.query('''
+        SELECT a.id,
+               COALESCE(b.debit, 0), COALESCE(b.credit, 0),
+               COALESCE(t.debit, 0), COALESCE(t.credit, 0)
+        FROM accounts a
+        LEFT JOIN account_balances b ON b.account_id = a.id
+        LEFT JOIN (
+            SELECT account_id, SUM(debit) AS debit, SUM(credit) AS credit
+            FROM journal_lines
+            GROUP BY account_id
+        ) t ON t.account_id = a.id
+    ''')
+    return [(acc_id, (debit, credit), (actual_debit, actual_credit))
+            for acc_id, debit, credit, actual_debit, actual_credit in rows
+            if abs(debit - actual_debit) > tolerance or abs(credit - actual_credit) > tolerance]
+
+
+# Database setup
+
+def init_db(db):
+    db.apply_journal_mode()
+    with db.transaction() as c:
+        # Chart of Accounts
+        c.execute('''CREATE TABLE IF NOT EXISTS accounts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            type TEXT NOT NULL
+        )''')
+    
+        # Initialize default accounts if they don't exist
+        default_accounts = [
+            ('Cash', 'Asset'),
+            ('Bank', 'Asset'),
+            ('Accounts Receivable', 'Asset'),
+            ('Inventory', 'Asset'),
+            ('Equipment', 'Asset'),
+            ('Accounts Payable', 'Liability'),
+            ('Sales Revenue', 'Income'),
+            ('Cost of Goods Sold', 'Expense'),
+            ('Operating Expenses', 'Expense'),
+            ('Payroll Expense', 'Expense'),
+            ('Capital', 'Equity'),
+            ('Retained Earnings', 'Equity'),
+            ('Inventory Adjustment', 'Equity')
+        ]
+    
+        for name, acc_type in default_accounts:
+            c.execute('SELECT id FROM accounts WHERE name = ?', (name,))
+            if not c.fetchone():
+                c.execute('INSERT INTO accounts (name, type) VALUES (?, ?)', (name, acc_type))
+    
+        # Journal Entries
+        c.execute('''CREATE TABLE IF NOT EXISTS journal_entries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            description TEXT,
+            entry_date TEXT
+        )''')
+        # entry_date is the normalized YYYY-MM-DD form of date (which may
+        # carry a time), maintained by trigger so reports can range-scan it
+        c.execute('PRAGMA table_info(journal_entries)')
+        if 'entry_date' not in [row[1] for row in c.fetchall()]:
+            c.execute('ALTER TABLE journal_entries ADD COLUMN entry_date TEXT')
+        for trigger in ENTRY_DATE_TRIGGERS:
+            c.execute(trigger)
+        c.execute('''UPDATE journal_entries SET entry_date = COALESCE(date(date), substr(date, 1, 10))
+                     WHERE entry_date IS NULL''')
+        c.execute('''CREATE TABLE IF NOT EXISTS journal_lines (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            entry_id INTEGER,
+            account_id INTEGER,
+            debit REAL,
+            credit REAL,
+            FOREIGN KEY(entry_id) REFERENCES journal_entries(id),
+            FOREIGN KEY(account_id) REFERENCES accounts(id)
+        )''')
+        # Restaurant Menu Items
+        c.execute('''CREATE TABLE IF NOT EXISTS menu_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            description TEXT,
+            price REAL NOT NULL,
+            category TEXT,
+            preparation_time INTEGER,
+            is_available INTEGER DEFAULT 1
+        )''')
+        # Restaurant Orders
+        c.execute('''CREATE TABLE IF NOT EXISTS orders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_number TEXT NOT NULL,
+            table_number INTEGER,
+            order_date TEXT NOT NULL,
+            status TEXT DEFAULT 'pending',
+            total_amount REAL,
+            cost_amount REAL,
+            payment_status TEXT DEFAULT 'unpaid',
+            payment_method TEXT,
+            cashier_id INTEGER,
+            FOREIGN KEY(cashier_id) REFERENCES users(id)
+        )''')
+        # Order Items
+        c.execute('''CREATE TABLE IF NOT EXISTS order_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_id INTEGER,
+            menu_item_id INTEGER,
+            quantity INTEGER,
+            price REAL,
+            status TEXT DEFAULT 'pending',
+            notes TEXT,
+            unit_cost REAL,
+            FOREIGN KEY(order_id) REFERENCES orders(id),
+            FOREIGN KEY(menu_item_id) REFERENCES menu_items(id)
+        )''')
+        # Restaurant Tables
+        c.execute('''CREATE TABLE IF NOT EXISTS tables (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_number INTEGER UNIQUE,
+            capacity INTEGER,
+            status TEXT DEFAULT 'available'
+        )''')
+        # Restaurant Users (Staff)
+        c.execute('''CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE,
+            password TEXT,
+            role TEXT,
+            name TEXT,
+            is_active INTEGER DEFAULT 1
+        )''')
+        # Kitchen Inventory
+        c.execute('''CREATE TABLE IF NOT EXISTS kitchen_inventory (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            quantity REAL,
+            unit TEXT,
+            reorder_level REAL,
+            cost_per_unit REAL
+        )''')
+        # Menu Item Ingredients
+        c.execute('''CREATE TABLE IF NOT EXISTS menu_item_ingredients (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            menu_item_id INTEGER,
+            inventory_id INTEGER,
+            quantity REAL,
+            FOREIGN KEY(menu_item_id) REFERENCES menu_items(id),
+            FOREIGN KEY(inventory_id) REFERENCES kitchen_inventory(id)
+        )''')
+        # AR/AP (Receivables/Payables)
+        c.execute('''CREATE TABLE IF NOT EXISTS receivables (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            customer TEXT,
+            amount REAL,
+            due_date TEXT,
+            paid INTEGER DEFAULT 0
+        )''')
+        c.execute('''CREATE TABLE IF NOT EXISTS payables (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            vendor TEXT,
+            amount REAL,
+            due_date TEXT,
+            paid INTEGER DEFAULT 0
+        )''')
+        # Customers
+        c.execute('''CREATE TABLE IF NOT EXISTS customers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            contact TEXT
+        )''')
+        # Suppliers
+        c.execute('''CREATE TABLE IF NOT EXISTS suppliers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            contact TEXT
+        )''')
+        # Inventory
+        c.execute('''CREATE TABLE IF NOT EXISTS inventory (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            sku TEXT,
+            quantity INTEGER DEFAULT 0,
+            cost REAL,
+            price REAL
+        )''')
+        # Purchases
+        c.execute('''CREATE TABLE IF NOT EXISTS purchases (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            supplier_id INTEGER,
+            total REAL,
+            FOREIGN KEY(supplier_id) REFERENCES suppliers(id)
+        )''')
+        c.execute('''CREATE TABLE IF NOT EXISTS purchase_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            purchase_id INTEGER,
+            inventory_id INTEGER,
+            quantity INTEGER,
+            cost REAL,
+            FOREIGN KEY(purchase_id) REFERENCES purchases(id),
+            FOREIGN KEY(inventory_id) REFERENCES inventory(id)
+        )''')
+        # Expenses
+        c.execute('''CREATE TABLE IF NOT EXISTS expenses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            type TEXT,
+            amount REAL,
+            description TEXT
+        )''')
+        # Materialized account balances (see BALANCE_TRIGGERS)
+        c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'account_balances'")
+        balances_exist = c.fetchone() is not None
+        c.execute('''CREATE TABLE IF NOT EXISTS account_balances (
+            account_id INTEGER PRIMARY KEY,
+            debit REAL NOT NULL DEFAULT 0,
+            credit REAL NOT NULL DEFAULT 0,
+            FOREIGN KEY(account_id) REFERENCES accounts(id)
+        )''')
+        for trigger in BALANCE_TRIGGERS:
+            c.execute(trigger)
+        if not balances_exist:
+            rebuild_account_balances(db)
+        # Recipe costs (see RECIPE_COST_TRIGGERS)
+        c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'menu_item_costs'")
+        costs_exist = c.fetchone() is not None
+        c.execute('''CREATE TABLE IF NOT EXISTS menu_item_costs (
+            menu_item_id INTEGER PRIMARY KEY,
+            unit_cost REAL NOT NULL DEFAULT 0,
+            FOREIGN KEY(menu_item_id) REFERENCES menu_items(id)
+        )''')
+        for trigger in RECIPE_COST_TRIGGERS:
+            c.execute(trigger)
+        if not costs_exist:
+            rebuild_menu_item_costs(db)
+        # Period-close snapshots (see SNAPSHOT_TRIGGERS)
+        c.execute('''CREATE TABLE IF NOT EXISTS period_closes (
+            period_end TEXT PRIMARY KEY,
+            period_type TEXT NOT NULL,
+            closed_at TEXT NOT NULL,
+            stale INTEGER NOT NULL DEFAULT 0
+        )''')
+        c.execute('''CREATE TABLE IF NOT EXISTS period_snapshots (
+            period_end TEXT NOT NULL,
+            account_id INTEGER NOT NULL,
+            debit REAL NOT NULL DEFAULT 0,
+            credit REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (period_end, account_id),
+            FOREIGN KEY(period_end) REFERENCES period_closes(period_end),
+            FOREIGN KEY(account_id) REFERENCES accounts(id)
+        )''')
+        for trigger in SNAPSHOT_TRIGGERS:
+            c.execute(trigger)
+        # Daily sales rollups (see SALES_ROLLUP_TRIGGERS)
+        c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sales_daily'")
+        rollup_exists = c.fetchone() is not None
+        c.execute('''CREATE TABLE IF NOT EXISTS sales_daily (
+            sale_date TEXT NOT NULL,
+            payment_method TEXT NOT NULL,
+            orders INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            cost REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (sale_date, payment_method)
+        )''')
+        c.execute('''CREATE TABLE IF NOT EXISTS sales_daily_items (
+            sale_date TEXT NOT NULL,
+            menu_item_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            cost REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (sale_date, menu_item_id),
+            FOREIGN KEY(menu_item_id) REFERENCES menu_items(id)
+        )''')
+        # unit_cost is the recipe cost frozen when the item was ordered; rows
+        # from before it existed get today's, and the rollup triggers that
+        # read menu_item_costs instead are replaced
+        c.execute('PRAGMA table_info(order_items)')
+        if 'unit_cost' not in [row[1] for row in c.fetchall()]:
+            c.execute('ALTER TABLE order_items ADD COLUMN unit_cost REAL')
+            c.execute(ORDER_ITEM_COST_SQL.format(where='unit_cost IS NULL'))
+            for trigger in SALES_ROLLUP_TRIGGERS:
+                c.execute(f'DROP TRIGGER IF EXISTS {trigger.split()[5]}')
+            rollup_exists = False
+        for trigger in SALES_ROLLUP_TRIGGERS:
+            c.execute(trigger)
+        if not rollup_exists:
+            rebuild_sales_rollup(db)
+        # Change log (see CHANGELOG_TRIGGERS)
+        c.execute('''CREATE TABLE IF NOT EXISTS changelog (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            topic TEXT NOT NULL,
+            key INTEGER
+        )''')
+        for trigger in CHANGELOG_TRIGGERS:
+            c.execute(trigger)
+        # Reference-data versions (see REFERENCE_TABLES)
+        c.execute('''CREATE TABLE IF NOT EXISTS ref_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )''')
+        for table, columns in REFERENCE_TABLES.items():
+            c.execute('INSERT OR IGNORE INTO ref_versions (name, version) VALUES (?, 0)', (table,))
+            for trigger in reference_triggers(table, columns):
+                c.execute(trigger)
+        # Order numbers (see ais_orders.next_order_number)
+        c.execute('''CREATE TABLE IF NOT EXISTS order_sequences (
+            day TEXT PRIMARY KEY,
+            last INTEGER NOT NULL
+        )''')
+        make_order_numbers_unique(c)
+        create_indexes(c)
+        create_search_indexes(c)
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='AIS database maintenance')
+    parser.add_argument('command', nargs='?', default='plans',
+                        choices=['plans', 'verify-balances', 'rebuild-balances', 'rebuild-search',
+                                 'rebuild-costs', 'rebuild-sales'])
+    args = parser.parse_args()
+    db = Database(DB_NAME)
+    init_db(db)
+    if args.command == 'plans':
+        for name, (uses_indexes, plan) in check_query_plans(db).items():
+            print(f'{"OK  " if uses_indexes else "SCAN"} {name}')
+            for step in plan:
+                print(f'       {step}')
+    elif args.command == 'rebuild-costs':
+        rebuild_menu_item_costs(db)
+        print('Rebuilt menu item costs.')
+    elif args.command == 'rebuild-sales':
+        rebuild_sales_rollup(db)
+        print('Rebuilt daily sales rollup.')
+    elif args.command == 'rebuild-search':
+        rebuild_search_indexes(db)
+        print('Rebuilt search indexes.')
+    else:
+        drifted = verify_account_balances(db)
+        for acc_id, stored, actual in drifted:
+            print(f'Account {acc_id}: stored {stored[0]:.2f}/{stored[1]:.2f}, actual {actual[0]:.2f}/{actual[1]:.2f}')
+        if args.command == 'rebuild-balances':
+            rebuild_account_balances(db)
+            print(f'Rebuilt account balances ({len(drifted)} accounts had drifted).')
+        elif not drifted:
+            print('Account balances match journal_lines.')
+    db.close_all()
@@ -0,0 +1,192 @@
+import csv
+import json
+import os
+
+from ais_reports import (account_balances, balance_sheet_sections, cash_flow_figures, income_statement_figures,
+                         sales_by_day, sales_by_item, sales_by_payment_method, sales_period, trial_balance_rows)
+
+EXPORT_FORMATS = ('csv', 'jsonl', 'json')
+
+
+# Row sources. Each takes (db, from_date, to_date) with YYYY-MM-DD bounds
+# (None = open ended) and yields tuples matching its columns. Detail rows
+# come straight off the cursor, so memory stays flat however long the range.
+
+def journal_rows(db, from_date, to_date):
+    conditions = []
+    params = []
+    if from_date is not None:
+        conditions.append('je.entry_date >= ?')
+        params.append(from_date)
+    if to_date is not None:
+        conditions.append('je.entry_date <= ?')
+        params.append(to_date)
+    yield from db.execute(f'''
+        SELECT je.id, je.date, je.description, jl.id, a.name, a.type, jl.debit, jl.credit
+        FROM journal_entries je
+        JOIN journal_lines jl ON jl.entry_id = je.id
+        LEFT JOIN accounts a ON a.id = jl.account_id
+        {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+        ORDER BY je.entry_date, je.id, jl.id
+    ''', params)
+
+
+def income_statement_rows(db, from_date, to_date):
+    balances = account_balances(db, from_date, to_date)
+    for _, name, acc_type, debit, credit in balances:
+        if acc_type == 'Income' and (debit or credit):
+            yield 'Revenue', name, credit - debit
+    for _, name, acc_type, debit, credit in balances:
+        if acc_type == 'Expense' and (debit or credit):
+            yield 'Expenses', name, debit - credit
+    total_revenue, total_expenses, income_tax, net_income = income_statement_figures(balances)
+    yield 'Total', 'Total Revenue', total_revenue
+    yield 'Total', 'Total Expenses', total_expenses
+    yield 'Total', 'Income Tax', income_tax
+    yield 'Total', 'Net Income', net_income
+
+
+def balance_sheet_rows(db, from_date, to_date):
+    # As of to_date; from_date does not apply
+    for section, rows in balance_sheet_sections(account_balances(db, None, to_date)):
+        for name, balance in rows:
+            yield section, name, balance
+
+
+CASH_FLOW_ITEMS = [
+    ('Operating', 'Net Income', 'net_income', 1),
+    ('Operating', 'Depreciation & Amortization', 'depreciation', 1),
+    ('Operating', 'Change in Accounts Receivable', 'change_ar', -1),
+    ('Operating', 'Change in Inventory', 'change_inv', -1),
+    ('Operating', 'Change in Accounts Payable', 'change_ap', 1),
+    ('Operating', 'Change in Accrued Wages Payable', 'change_wages', 1),
+    ('Operating', 'Change in Gift Card Liability', 'change_gift_card', 1),
+    ('Operating', 'Net Cash Provided by Operating Activities', 'net_operating', 1),
+    ('Investing', 'Purchase of New Equipment', 'purchase_equipment', 1),
+    ('Investing', 'Proceeds from Sale of Equipment', 'sale_equipment', 1),
+    ('Investing', 'Net Cash Provided by Investing Activities', 'net_investing', 1),
+    ('Financing', 'Proceeds from Line of Credit Drawdown', 'proceeds_loan', 1),
+    ('Financing', 'Repayment of Equipment Loan Principal', 'repayment_loan', 1),
+    ('Financing', 'Owner Distribution', 'owner_distribution', 1),
+    ('Financing', 'Net Cash Provided by Financing Activities', 'net_financing', 1),
+    ('Cash', 'Net Increase in Cash', 'net_increase', 1),
+    ('Cash', 'Cash at Beginning of Period', 'cash_begin', 1),
+    ('Cash', 'Cash at End of Period', 'cash_end', 1),
+]
+
+
+def cash_flow_rows(db, from_date, to_date):
+    # Amounts carry their effect on cash: working-capital increases in
+    # assets are negative
+    figures = cash_flow_figures(account_balances(db, from_date, to_date), account_balances(db, None, to_date))
+    for section, item, key, sign in CASH_FLOW_ITEMS:
+        yield section, item, sign * figures[key] or 0.0
+
+
+def trial_balance_rows_as_of(db, from_date, to_date):
+    yield from trial_balance_rows(account_balances(db, None, to_date))
+
+
+def sales_day_rows(db, from_date, to_date):
+    yield from sales_by_day(db, *sales_period(from_date, to_date))
+
+
+def sales_item_rows(db, from_date, to_date):
+    yield from sales_by_item(db, *sales_period(from_date, to_date))
+
+
+def sales_payment_rows(db, from_date, to_date):
+    yield from sales_by_payment_method(db, *sales_period(from_date, to_date))
+
+
+# name: (columns, row source)
+EXPORTS = {
+    'journal': (('entry_id', 'date', 'description', 'line_id', 'account', 'account_type', 'debit', 'credit'),
+                journal_rows),
+    'income-statement': (('section', 'account', 'amount'), income_statement_rows),
+    'balance-sheet': (('section', 'account', 'balance'), balance_sheet_rows),
+    'cash-flow': (('section', 'item', 'amount'), cash_flow_rows),
+    'trial-balance': (('account', 'debit', 'credit'), trial_balance_rows_as_of),
+    'sales-daily': (('date', 'orders', 'sales', 'cost', 'profit', 'payment_methods'), sales_day_rows),
+    'sales-items': (('item', 'category', 'quantity', 'revenue', 'cost', 'profit'), sales_item_rows),
+    'sales-payments': (('payment_method', 'transactions', 'amount'), sales_payment_rows),
+}
+
+
+def export_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.json':
+        return 'json'
+    return 'jsonl' if ext in ('.jsonl', '.ndjson') else 'csv'
+
+
+def write_csv(handle, columns, rows):
+    writer = csv.writer(handle)
+    writer.writerow(columns)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def write_jsonl(handle, columns, rows):
+    count = 0
+    for row in rows:
+        handle.write(json.dumps(dict(zip(columns, row))) + '\n')
+        count += 1
+    return count
+
+
+def write_json(handle, columns, rows):
+    # One JSON array, still written a row at a time
+    count = 0
+    handle.write('[')
+    for row in rows:
+        handle.write((',\n' if count else '\n') + json.dumps(dict(zip(columns, row))))
+        count += 1
+    handle.write('\n]\n')
+    return count
+
+
+WRITERS = {'csv': write_csv, 'jsonl': write_jsonl, 'json': write_json}
+
+
+def export_report(db, name, handle, fmt='csv', from_date=None, to_date=None):
+    # Streams one of EXPORTS to an open text handle; returns the row count.
+    if name not in EXPORTS:
+        raise ValueError(f'Unknown export: {name}')
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f'Unknown export format: {fmt}')
+    columns, source = EXPORTS[name]
+    return WRITERS[fmt](handle, columns, source(db, from_date, to_date))
+
+
+def export_file(db, name, path, fmt=None, from_date=None, to_date=None):
+    with open(path, 'w', newline='', encoding='utf-8') as handle:
+        return export_report(db, name, handle, fmt or export_format(path), from_date, to_date)
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+    from ais_db import DB_NAME, Database, init_db
+    from ais_reports import parse_report_date
+    parser = argparse.ArgumentParser(description='Export AIS reports as CSV or JSON')
+    parser.add_argument('report', choices=sorted(EXPORTS))
+    parser.add_argument('path', nargs='?', help='output file (default: stdout)')
+    parser.add_argument('--format', choices=EXPORT_FORMATS)
+    parser.add_argument('--from', dest='from_date', type=parse_report_date)
+    parser.add_argument('--to', dest='to_date', type=parse_report_date)
+    parser.add_argument('--db', default=DB_NAME)
+    args = parser.parse_args()
+    db = Database(args.db)
+    init_db(db)
+    try:
+        if args.path:
+            count = export_file(db, args.report, args.path, args.format, args.from_date, args.to_date)
+        else:
+            count = export_report(db, args.report, sys.stdout, args.format or 'csv', args.from_date, args.to_date)
+    finally:
+        db.close_all()
+    print(f'Exported {count} rows.', file=sys.stderr)
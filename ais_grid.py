@@ -0,0 +1,227 @@
+PAGE_SIZE = 100
+
+
+def key_iid(key):
+    # Treeview item id for a row key tuple
+    return '|'.join(str(part) for part in key)
+
+
+class KeyedTreeview:
+    # Brings a Treeview in line with a fresh result set by item id instead
+    # of deleting and reinserting every row: rows that disappeared are
+    # deleted, new rows inserted, and existing rows only touched when their
+    # values, tags or position changed. Selection, focus and scroll position
+    # survive a refresh.
+    def __init__(self, tree):
+        self.tree = tree
+        self.shown = {}
+
+    def update(self, rows):
+        # rows: (iid, values, tags) in display order, iids unique
+        tree = self.tree
+        wanted = {str(iid): (tuple(values), tuple(tags)) for iid, values, tags in rows}
+        children = tree.get_children()
+        # Items added or changed behind our back are rewritten below
+        shown = {iid: self.shown.get(iid) for iid in children}
+        stale = [iid for iid in children if iid not in wanted]
+        if stale:
+            tree.delete(*stale)
+        order = [iid for iid in children if iid in wanted]
+        for index, (iid, row) in enumerate(wanted.items()):
+            if iid not in shown:
+                tree.insert('', index, iid=iid, values=row[0], tags=row[1])
+                order.insert(index, iid)
+                continue
+            if shown[iid] != row:
+                tree.item(iid, values=row[0], tags=row[1])
+            if order[index] != iid:
+                tree.move(iid, '', index)
+                order.remove(iid)
+                order.insert(index, iid)
+        self.shown = wanted
+
+
+class GroupedRows:
+    # The rows of a KeyedTreeview grouped by the record they come from (an
+    # order, a table), so that when a few records change only their groups
+    # are read again and the rest of the listing is kept as it is.
+    def __init__(self, view, reverse=False):
+        self.view = view
+        self.reverse = reverse
+        self.groups = {}
+
+    def update(self, groups, keys=None):
+        # groups: {key: (sort key, rows)} as just read for keys, or for the
+        # whole listing when keys is None. Keys read but missing from groups
+        # no longer have any rows.
+        if keys is None:
+            self.groups = {}
+        else:
+            for key in keys:
+                self.groups.pop(key, None)
+        self.groups.update(groups)
+        ordered = sorted(self.groups.values(), key=lambda group: group[0], reverse=self.reverse)
+        self.view.update([row for _, rows in ordered for row in rows])
+
+
+class KeysetQuery:
+    # A single-table listing read one page at a time. Pages continue from the
+    # key of the last row shown instead of using OFFSET, so fetching page 500
+    # costs the same index seek as fetching page 1. keys must be unique
+    # together (end them with id) and match the listing's sort order.
+    def __init__(self, table, columns, keys=('id',), descending=False, where='', params=()):
+        self.table = table
+        self.columns = columns
+        self.keys = keys
+        self.descending = descending
+        self.where = where
+        self.params = tuple(params)
+
+    def signature(self):
+        return (self.table, self.columns, self.keys, self.descending, self.where, self.params)
+
+    def page(self, db, after=None, before=None, limit=PAGE_SIZE, start=None):
+        # Rows as (key, values) in display order: the first page, the page
+        # following key after, the page preceding key before, or the page
+        # beginning at key start.
+        forward = before is None
+        conditions = [self.where] if self.where else []
+        params = list(self.params)
+        bound = before if not forward else (start if start is not None else after)
+        if bound is not None:
+            row_value = f'({", ".join(self.keys)})'
+            placeholders = f'({", ".join("?" * len(self.keys))})'
+            # Reading forward in a descending listing means smaller keys
+            op = '>' if forward != self.descending else '<'
+            if start is not None:
+                op += '='
+            conditions.append(f'{row_value} {op} {placeholders}')
+            params.extend(bound)
+        direction = 'DESC' if forward == self.descending else 'ASC'
+        sql = (f'SELECT {", ".join(self.keys)}, {", ".join(self.columns)} FROM {self.table}'
+               + (f' WHERE {" AND ".join(conditions)}' if conditions else '')
+               + f' ORDER BY {", ".join(f"{key} {direction}" for key in self.keys)} LIMIT ?')
+        params.append(limit)
+        size = len(self.keys)
+        rows = [(tuple(row[:size]), row[size:]) for row in db.query(sql, params)]
+        return rows if forward else rows[::-1]
+
+
+class PagedTreeview:
+    # Keeps at most max_pages pages of a KeysetQuery materialized in a ttk
+    # Treeview. Scrolling near either end fetches the neighbouring page on
+    # the query worker and drops the page furthest away, so Tk only ever
+    # holds a few hundred items however long the listing is.
+    def __init__(self, tree, worker, name, format_row=None, on_error=None,
+                 page_size=PAGE_SIZE, max_pages=3, threshold=0.1):
+        self.tree = tree
+        self.worker = worker
+        self.name = name
+        self.format_row = format_row or (lambda values: values)
+        self.on_error = on_error
+        self.page_size = page_size
+        self.max_rows = page_size * max_pages
+        self.threshold = threshold
+        self.query = None
+        self.view = KeyedTreeview(tree)
+        self.keys = []
+        self.offset = 0
+        self.more_before = False
+        self.more_after = False
+        self.loading = False
+        tree.configure(yscrollcommand=self.on_scroll)
+
+    def load(self, query, on_loaded=None):
+        # Shows the first page of query; on_loaded() runs once it is shown.
+        # Reloading the same query re-reads the window already on screen
+        # instead, so edits elsewhere keep the user's scroll position.
+        if self.keys and self.query is not None and query.signature() == self.query.signature():
+            start, offset, limit = self.keys[0], self.offset, len(self.keys)
+        else:
+            start, offset, limit = None, 0, self.page_size
+        self.query = query
+        self.loading = True
+        self.worker.submit(self.name, lambda: query.page(self.worker.db, limit=limit + 1, start=start),
+                           lambda rows: self._reset(rows, offset, limit, on_loaded), self._failed)
+
+    def reload(self, on_loaded=None):
+        if self.query is not None:
+            self.load(self.query, on_loaded)
+
+    def on_scroll(self, first, last):
+        if self.loading or self.query is None:
+            return
+        if float(last) >= 1 - self.threshold and self.more_after:
+            self._fetch(after=self.keys[-1])
+        elif float(first) <= self.threshold and self.more_before:
+            self._fetch(before=self.keys[0])
+
+    def _fetch(self, after=None, before=None):
+        query = self.query
+        self.loading = True
+        self.worker.submit(self.name, lambda: query.page(self.worker.db, after, before, self.page_size + 1),
+                           lambda rows: self._extend(rows, before is not None), self._failed)
+
+    def _failed(self, error):
+        self.loading = False
+        if self.on_error is not None:
+            self.on_error(error)
+
+    def _tag(self, index):
+        return 'evenrow' if index % 2 == 0 else 'oddrow'
+
+    def _reset(self, rows, offset, limit, on_loaded):
+        if not rows and offset:
+            # Everything in the window was deleted; start over from the top
+            self.keys = []
+            self.load(self.query, on_loaded)
+            return
+        more = len(rows) > limit
+        rows = rows[:limit]
+        self.view.update([(key_iid(key), self.format_row(values), (self._tag(offset + i),))
+                          for i, (key, values) in enumerate(rows)])
+        self.keys = [key for key, _ in rows]
+        self.offset = offset
+        self.more_before = offset > 0
+        self.more_after = more
+        self.loading = False
+        if on_loaded is not None:
+            on_loaded()
+
+    def _insert(self, index, key, values, position):
+        iid = key_iid(key)
+        row = (tuple(self.format_row(values)), (self._tag(position),))
+        self.tree.insert('', index, iid=iid, values=row[0], tags=row[1])
+        # Let the next refresh of this window skip rows that did not change
+        self.view.shown[iid] = row
+
+    def _extend(self, rows, backwards):
+        more = len(rows) > self.page_size
+        if backwards:
+            rows = rows[-self.page_size:]
+            self.offset -= len(rows)
+            for i, (key, values) in enumerate(rows):
+                self._insert(i, key, values, self.offset + i)
+            self.keys[:0] = [key for key, _ in rows]
+            self.more_before = more
+            # Keep the rows the user was looking at in place
+            self.tree.yview_scroll(len(rows), 'units')
+            excess = len(self.keys) - self.max_rows
+            if excess > 0:
+                self.tree.delete(*self.tree.get_children()[-excess:])
+                del self.keys[-excess:]
+                self.more_after = True
+        else:
+            rows = rows[:self.page_size]
+            for i, (key, values) in enumerate(rows):
+                self._insert('end', key, values, self.offset + len(self.keys) + i)
+            self.keys.extend(key for key, _ in rows)
+            self.more_after = more
+            excess = len(self.keys) - self.max_rows
+            if excess > 0:
+                self.tree.delete(*self.tree.get_children()[:excess])
+                del self.keys[:excess]
+                self.offset += excess
+                self.more_before = True
+                self.tree.yview_scroll(-excess, 'units')
+        self.loading = False
@@ -0,0 +1,222 @@
+import csv
+import datetime
+import functools
+import json
+import os
+
+from ais_journal import BALANCE_TOLERANCE
+
+# Lines written per transaction. Large chunks amortize the commit (and its
+# fsync); the read side never holds more than one chunk in memory.
+IMPORT_CHUNK_LINES = 50000
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+
+DATE_FORMATS = ('%Y-%m-%d', '%Y-%m-%d %H:%M:%S')
+
+
+class JournalImportError(ValueError):
+    pass
+
+
+def import_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    return 'jsonl' if ext in ('.jsonl', '.json', '.ndjson') else 'csv'
+
+
+def read_csv(handle):
+    # One journal line per row: entry, date, description, account, debit,
+    # credit. Rows of an entry are contiguous; date and description may be
+    # left blank after its first row. Yields (source line, record).
+    reader = csv.DictReader(handle)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def read_jsonl(handle):
+    # One JSON object per line, either a journal line shaped like a CSV row
+    # or a whole entry: {"entry", "date", "description", "lines": [...]}.
+    for number, text in enumerate(handle, 1):
+        text = text.strip()
+        if not text:
+            continue
+        try:
+            record = json.loads(text)
+        except ValueError as e:
+            yield number, JournalImportError(f'Invalid JSON: {e}.')
+            continue
+        if not isinstance(record, dict):
+            yield number, JournalImportError('Expected a JSON object.')
+            continue
+        if 'lines' not in record:
+            yield number, record
+            continue
+        lines = record['lines']
+        if not isinstance(lines, list) or not all(isinstance(line, dict) for line in lines):
+            yield number, JournalImportError('"lines" must be a list of JSON objects.')
+            continue
+        for line in lines:
+            yield number, dict(line, entry=record.get('entry'), date=record.get('date'),
+                               description=record.get('description'))
+
+
+def read_entries(rows):
+    # Groups the line records into entries: [source line, ref, date,
+    # description, [(account, debit, credit)], first error or None].
+    current = None
+    for number, row in rows:
+        if isinstance(row, Exception):
+            if current is not None:
+                yield current
+                current = None
+            yield [number, '', '', '', [], row]
+            continue
+        ref = str(row.get('entry') or '').strip()
+        if current is not None and ref != current[1]:
+            yield current
+            current = None
+        if current is None:
+            current = [number, ref, str(row.get('date') or '').strip(),
+                       str(row.get('description') or '').strip(), [], None]
+        try:
+            current[4].append((str(row.get('account') or '').strip(),
+                               parse_amount(row.get('debit')), parse_amount(row.get('credit'))))
+        except JournalImportError as e:
+            current[5] = current[5] or e
+    if current is not None:
+        yield current
+
+
+def parse_amount(value):
+    if value is None or str(value).strip() == '':
+        return 0.0
+    try:
+        amount = float(value)
+    except (TypeError, ValueError):
+        raise JournalImportError(f'Amount is not a number: {value!r}.')
+    if amount < 0:
+        raise JournalImportError(f'Amount is negative: {value!r}.')
+    return amount
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_entry_date(value):
+    # Returned zero-padded: entry_date is derived from this text and
+    # compared as text, so '2026-1-5' would sort outside its period
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, fmt).strftime(fmt)
+        except ValueError:
+            pass
+    raise JournalImportError(f'Date must be YYYY-MM-DD: {value!r}.')
+
+
+def validate_entry(entry, account_ids):
+    # Returns (date, description, [(account_id, debit, credit)]) or raises
+    # JournalImportError with the first problem found.
+    _, ref, date, description, lines, error = entry
+    if error is not None:
+        raise error
+    if not ref:
+        raise JournalImportError('Missing entry reference.')
+    date = parse_entry_date(date)
+    resolved = []
+    total_debit = total_credit = 0.0
+    for account, debit, credit in lines:
+        account_id = account_ids.get(account)
+        if account_id is None:
+            raise JournalImportError(f'Account not found: {account!r}.')
+        if debit and credit:
+            raise JournalImportError(f'Line for {account} has both a debit and a credit.')
+        resolved.append((account_id, debit, credit))
+        total_debit += debit
+        total_credit += credit
+    if abs(total_debit - total_credit) > BALANCE_TOLERANCE:
+        raise JournalImportError(f'Entry {ref} does not balance: debits {total_debit:.2f}, credits {total_credit:.2f}.')
+    return date, description or ref, resolved
+
+
+def write_chunk(db, entries):
+    # entries: [(date, description, lines)]. Ids are assigned up front under
+    # the write lock, so headers and lines both go in with one executemany.
+    with db.transaction(immediate=True) as c:
+        c.execute('''SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'journal_entries'), 0),
+                                COALESCE((SELECT MAX(id) FROM journal_entries), 0))''')
+        first_id = c.fetchone()[0] + 1
+        c.executemany('INSERT INTO journal_entries (id, date, description) VALUES (?, ?, ?)',
+                      [(first_id + i, date, description) for i, (date, description, _) in enumerate(entries)])
+        c.executemany('INSERT INTO journal_lines (entry_id, account_id, debit, credit) VALUES (?, ?, ?, ?)',
+                      [(first_id + i, account_id, debit, credit)
+                       for i, (_, _, lines) in enumerate(entries)
+                       for account_id, debit, credit in lines])
+
+
+def import_journal(db, refs, handle, fmt='csv', chunk_lines=IMPORT_CHUNK_LINES, strict=False, progress=None):
+    # Streams journal lines from handle into the journal, chunk_lines per
+    # transaction. Entries that fail validation are skipped and reported as
+    # (source line, entry ref, message); with strict=True the first one
+    # raises JournalImportError instead, after the chunks before it have
+    # been committed. progress(entries, lines) runs after every chunk.
+    # Returns (entries imported, lines imported, errors).
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f'Unknown import format: {fmt}')
+    account_ids = {name: row.id for name, row in refs.rows('accounts').items()}
+    rows = read_csv(handle) if fmt == 'csv' else read_jsonl(handle)
+    chunk, chunk_size = [], 0
+    entries = lines = 0
+    errors = []
+    for entry in read_entries(rows):
+        try:
+            chunk.append(validate_entry(entry, account_ids))
+        except JournalImportError as e:
+            if strict:
+                raise JournalImportError(f'Line {entry[0]}: {e}')
+            errors.append((entry[0], entry[1], str(e)))
+            continue
+        chunk_size += len(entry[4])
+        if chunk_size >= chunk_lines:
+            write_chunk(db, chunk)
+            entries += len(chunk)
+            lines += chunk_size
+            chunk, chunk_size = [], 0
+            if progress is not None:
+                progress(entries, lines)
+    if chunk:
+        write_chunk(db, chunk)
+        entries += len(chunk)
+        lines += chunk_size
+    if progress is not None:
+        progress(entries, lines)
+    return entries, lines, errors
+
+
+def import_file(db, refs, path, fmt=None, **options):
+    with open(path, newline='', encoding='utf-8') as handle:
+        return import_journal(db, refs, handle, fmt or import_format(path), **options)
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+    from ais_cache import ReferenceCache
+    from ais_db import DB_NAME, Database, init_db
+    parser = argparse.ArgumentParser(description='Import journal entries from CSV or JSON lines')
+    parser.add_argument('path')
+    parser.add_argument('--format', choices=IMPORT_FORMATS)
+    parser.add_argument('--db', default=DB_NAME)
+    parser.add_argument('--chunk-lines', type=int, default=IMPORT_CHUNK_LINES)
+    parser.add_argument('--strict', action='store_true', help='stop at the first invalid entry')
+    args = parser.parse_args()
+    db = Database(args.db)
+    init_db(db)
+    try:
+        entries, lines, errors = import_file(
+            db, ReferenceCache(db), args.path, args.format, chunk_lines=args.chunk_lines, strict=args.strict,
+            progress=lambda entries, lines: print(f'{entries} entries, {lines} lines', file=sys.stderr))
+    except JournalImportError as e:
+        sys.exit(f'Import stopped: {e}')
+    finally:
+        db.close_all()
+    for number, ref, message in errors:
+        print(f'Line {number} ({ref}): {message}')
+    print(f'Imported {entries} entries ({lines} lines), skipped {len(errors)}.')
@@ -0,0 +1,48 @@
+import datetime
+
+# Debits and credits may differ by rounding noise, as in verify_account_balances
+BALANCE_TOLERANCE = 0.005
+
+
+class PostingError(ValueError):
+    pass
+
+
+def resolve_account(c, refs, account, acc_type=None):
+    # Account id for an id or a name. Unknown names are created inside the
+    # caller's transaction when acc_type is given.
+    if not isinstance(account, str):
+        return account
+    account_id = refs.account_id(account)
+    if account_id is None:
+        if acc_type is None:
+            raise PostingError(f'Account not found: {account}.')
+        c.execute('INSERT INTO accounts (name, type) VALUES (?, ?)', (account, acc_type))
+        account_id = c.lastrowid
+    return account_id
+
+
+def post_entry(db, refs, description, lines, date=None, new_accounts=None):
+    # Writes one balanced journal entry and returns its id.
+    # lines: [(account id or name, debit, credit)]; new_accounts maps names
+    # that may be missing to the type they are created with. The header and
+    # every line go in with one executemany inside the caller's transaction
+    # (or a new one), so a business event and its posting commit together.
+    if not lines:
+        raise PostingError('A journal entry needs at least one line.')
+    total_debit = sum(debit or 0 for _, debit, _ in lines)
+    total_credit = sum(credit or 0 for _, _, credit in lines)
+    if abs(total_debit - total_credit) > BALANCE_TOLERANCE:
+        raise PostingError(f'Debits ({total_debit:.2f}) and credits ({total_credit:.2f}) do not balance.')
+    if date is None:
+        date = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    new_accounts = new_accounts or {}
+    with db.transaction() as c:
+        account_ids = {account: resolve_account(c, refs, account, new_accounts.get(account))
+                       for account in {account for account, _, _ in lines}}
+        c.execute('INSERT INTO journal_entries (date, description) VALUES (?, ?)', (date, description))
+        entry_id = c.lastrowid
+        c.executemany('INSERT INTO journal_lines (entry_id, account_id, debit, credit) VALUES (?, ?, ?, ?)',
+                      [(entry_id, account_ids[account], debit or 0, credit or 0)
+                       for account, debit, credit in lines])
+    return entry_id
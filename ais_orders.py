@@ -0,0 +1,200 @@
+import datetime
+
+from ais_journal import post_entry
+
+
+class OrderError(ValueError):
+    pass
+
+
+def placeholders(count):
+    return ', '.join('?' * count)
+
+
+def ingredient_demand(c, quantities):
+    # Total requirement per kitchen_inventory row for {menu_item_id: qty},
+    # in one aggregated query: (inventory_id, name, available, required).
+    # A blank quantity on either side counts as 0.
+    items = list(quantities.items())
+    values = ', '.join('(?, ?)' for _ in items)
+    c.execute(f'''
+        WITH cart(menu_item_id, qty) AS (VALUES {values})
+        SELECT ki.id, ki.name, COALESCE(ki.quantity, 0),
+               COALESCE(SUM(mii.quantity * cart.qty), 0)
+        FROM cart
+        JOIN menu_item_ingredients mii ON mii.menu_item_id = cart.menu_item_id
+        JOIN kitchen_inventory ki ON ki.id = mii.inventory_id
+        GROUP BY ki.id
+    ''', [value for item in items for value in item])
+    return c.fetchall()
+
+
+def recipe_costs(c, menu_item_ids):
+    # Precomputed unit cost per menu item (see ais_db.RECIPE_COST_TRIGGERS)
+    ids = list(menu_item_ids)
+    c.execute(f'SELECT menu_item_id, unit_cost FROM menu_item_costs WHERE menu_item_id IN ({placeholders(len(ids))})', ids)
+    return dict(c.fetchall())
+
+
+def next_order_number(c, now):
+    # ORD<yyyymmdd>-<n>, n counting the day's orders from 1. The counter
+    # lives in order_sequences and is bumped inside the caller's write
+    # transaction, so two terminals never get the same number and a rolled
+    # back order gives its number back.
+    day = now.strftime('%Y%m%d')
+    c.execute('''INSERT INTO order_sequences (day, last) VALUES (?, 1)
+                 ON CONFLICT(day) DO UPDATE SET last = last + 1''', (day,))
+    c.execute('SELECT last FROM order_sequences WHERE day = ?', (day,))
+    return f'ORD{day}-{c.fetchone()[0]:04d}'
+
+
+def place_order(db, table, cart):
+    # cart: [{'item': menu item name, 'qty': int, 'price': float, 'total': float}]
+    # Checks the combined ingredient demand of the whole cart, then writes
+    # the order, its items and the inventory decrements in one transaction.
+    # Raises OrderError (nothing written) if an item or ingredient is short.
+    if not cart:
+        raise OrderError('Add at least one item.')
+    with db.transaction(immediate=True) as c:
+        names = sorted({item['item'] for item in cart})
+        c.execute(f'SELECT name, id FROM menu_items WHERE name IN ({placeholders(len(names))})', names)
+        menu_ids = dict(c.fetchall())
+        missing = [name for name in names if name not in menu_ids]
+        if missing:
+            raise OrderError(f'Unknown menu item: {", ".join(missing)}.')
+        quantities = {}
+        for item in cart:
+            menu_item_id = menu_ids[item['item']]
+            quantities[menu_item_id] = quantities.get(menu_item_id, 0) + item['qty']
+
+        demand = ingredient_demand(c, quantities)
+        short = [name for _, name, available, required in demand if available < required]
+        if short:
+            raise OrderError(f'Not enough {", ".join(short)} in inventory for this order.')
+        unit_costs = recipe_costs(c, quantities)
+        total_cost = sum(unit_costs.get(menu_item_id, 0.0) * qty for menu_item_id, qty in quantities.items())
+
+        now = datetime.datetime.now()
+        order_number = next_order_number(c, now)
+        total_amount = sum(item['total'] for item in cart)
+        c.execute('INSERT INTO orders (order_number, table_number, order_date, status, total_amount, cost_amount) VALUES (?, ?, ?, ?, ?, ?)',
+                  (order_number, table, now.strftime('%Y-%m-%d %H:%M:%S'), 'pending', total_amount, total_cost))
+        order_id = c.lastrowid
+        c.executemany('INSERT INTO order_items (order_id, menu_item_id, quantity, price, unit_cost) VALUES (?, ?, ?, ?, ?)',
+                      [(order_id, menu_ids[item['item']], item['qty'], item['price'],
+                        unit_costs.get(menu_ids[item['item']], 0.0)) for item in cart])
+        c.executemany('UPDATE kitchen_inventory SET quantity = quantity - ? WHERE id = ?',
+                      [(required, inventory_id) for inventory_id, _, _, required in demand])
+    return order_id, order_number
+
+
+def order_condition(order_ids):
+    # Extra WHERE condition restricting an orders listing to order_ids
+    if order_ids is None:
+        return '', []
+    order_ids = list(order_ids)
+    return f'AND o.id IN ({placeholders(len(order_ids))})', order_ids
+
+
+# The listings' SQL, {condition} from order_condition; ais_db.HOT_QUERIES
+# checks the plans of these same statements
+KITCHEN_ORDERS_SQL = '''
+    SELECT o.id, o.order_number, o.table_number, o.order_date,
+           mi.name, oi.quantity, oi.status, oi.notes, oi.id
+    FROM orders o
+    JOIN order_items oi ON o.id = oi.order_id
+    JOIN menu_items mi ON oi.menu_item_id = mi.id
+    WHERE o.status IN ('pending', 'in kitchen') {condition}
+    ORDER BY oi.id'''
+
+UNPAID_ORDERS_SQL = '''
+    SELECT o.id, o.order_number, o.table_number, o.order_date, o.total_amount,
+           GROUP_CONCAT(mi.name || ' x' || oi.quantity)
+    FROM orders o
+    JOIN order_items oi ON o.id = oi.order_id
+    JOIN menu_items mi ON oi.menu_item_id = mi.id
+    WHERE o.payment_status = 'unpaid' {condition}
+    GROUP BY o.id'''
+
+
+def kitchen_orders(db, order_ids=None):
+    # Items of pending and in-kitchen orders: (order id, order number, table,
+    # order date, item, quantity, item status, notes, order item id)
+    condition, params = order_condition(order_ids)
+    return db.query(KITCHEN_ORDERS_SQL.format(condition=condition), params)
+
+
+def mark_items_prepared(db, item_ids):
+    # Marks order items prepared, then moves each pending order whose items
+    # are now all prepared to 'in kitchen', with one rollup statement for
+    # the whole batch. Returns {item id: order id} for the items found.
+    item_ids = [int(item_id) for item_id in item_ids]
+    with db.transaction() as c:
+        c.execute(f'SELECT id, order_id FROM order_items WHERE id IN ({placeholders(len(item_ids))})', item_ids)
+        found = dict(c.fetchall())
+        if found:
+            c.execute(f"UPDATE order_items SET status = 'prepared' WHERE id IN ({placeholders(len(found))})",
+                      list(found))
+            order_ids = sorted(set(found.values()))
+            c.execute(f'''
+                UPDATE orders SET status = 'in kitchen'
+                WHERE id IN ({placeholders(len(order_ids))}) AND status = 'pending'
+                  AND NOT EXISTS (SELECT 1 FROM order_items oi
+                                  WHERE oi.order_id = orders.id AND oi.status IS NOT 'prepared')
+            ''', order_ids)
+    return found
+
+
+def mark_item_prepared(db, item_id):
+    # Returns the order id
+    order_id = mark_items_prepared(db, [item_id]).get(int(item_id))
+    if order_id is None:
+        raise OrderError(f'Order item {item_id} not found.')
+    return order_id
+
+
+def mark_order_complete(db, item_id):
+    # Marks every item of the order holding item_id prepared and the order
+    # served. Returns the order id.
+    with db.transaction() as c:
+        c.execute('SELECT order_id FROM order_items WHERE id = ?', (item_id,))
+        row = c.fetchone()
+        if row is None:
+            raise OrderError(f'Order item {item_id} not found.')
+        order_id = row[0]
+        c.execute("UPDATE order_items SET status = 'prepared' WHERE order_id = ?", (order_id,))
+        c.execute("UPDATE orders SET status = 'served' WHERE id = ?", (order_id,))
+    return order_id
+
+
+def unpaid_orders(db, order_ids=None):
+    # (order id, order number, table, order date, total, 'item xqty, ...')
+    condition, params = order_condition(order_ids)
+    return db.query(UNPAID_ORDERS_SQL.format(condition=condition), params)
+
+
+def process_payment(db, refs, order_number, payment_method, amount_received):
+    # Marks the order paid and posts the sale and its cost of goods in the
+    # same transaction. Returns (total amount, change).
+    with db.transaction(immediate=True) as c:
+        c.execute('SELECT total_amount, cost_amount, payment_status FROM orders WHERE order_number = ?',
+                  (order_number,))
+        row = c.fetchone()
+        if row is None:
+            raise OrderError(f'Order {order_number} not found.')
+        total_amount, cost_amount, payment_status = row
+        if payment_status == 'paid':
+            raise OrderError(f'Order {order_number} is already paid.')
+        if amount_received < total_amount:
+            raise OrderError('Amount received is less than total amount.')
+        c.execute("UPDATE orders SET payment_status = 'paid', payment_method = ? WHERE order_number = ?",
+                  (payment_method, order_number))
+        cash_account = 'Cash' if payment_method == 'cash' else 'Bank'
+        post_entry(db, refs, f'Sale for Order #{order_number}', [
+            (cash_account, total_amount, 0),            # Debit Cash/Bank
+            ('Sales Revenue', 0, total_amount),         # Credit Sales Revenue
+            ('Cost of Goods Sold', cost_amount, 0),     # Debit COGS
+            ('Inventory', 0, cost_amount),              # Credit Inventory
+        ], new_accounts={'Sales Revenue': 'Income', 'Cost of Goods Sold': 'Expense',
+                         'Inventory': 'Asset', cash_account: 'Asset'})
+    return total_amount, amount_received - total_amount
@@ -0,0 +1,639 @@
+import datetime
+
+
+def parse_report_date(value):
+    # Report bounds are YYYY-MM-DD; a blank bound means "open ended".
+    value = (value or '').strip()
+    if not value:
+        return None
+    return datetime.datetime.strptime(value, '%Y-%m-%d').strftime('%Y-%m-%d')
+
+
+def account_balances(db, from_date=None, to_date=None):
+    # Debit/credit totals per account for journal entries dated within
+    # [from_date, to_date] (either bound may be None). Returns one row per
+    # account: (account_id, name, type, debit, credit).
+    #
+    # The period is resolved on the indexed journal_entries.entry_date, so a
+    # month's report only touches that month's lines. With no bounds at all
+    # the materialized account_balances table answers directly, and an
+    # as-of balance starts from the nearest period-close snapshot.
+    if from_date is None and to_date is None:
+        return db.query('''
+            SELECT a.id, a.name, a.type, COALESCE(b.debit, 0.0), COALESCE(b.credit, 0.0)
+            FROM accounts a
+            LEFT JOIN account_balances b ON b.account_id = a.id
+            ORDER BY a.id
+        ''')
+    if from_date is None:
+        return balances_as_of(db, to_date)
+    conditions = []
+    params = []
+    if from_date is not None:
+        conditions.append('je.entry_date >= ?')
+        params.append(from_date)
+    if to_date is not None:
+        conditions.append('je.entry_date <= ?')
+        params.append(to_date)
+    return db.query(f'''
+        SELECT a.id, a.name, a.type, COALESCE(t.debit, 0.0), COALESCE(t.credit, 0.0)
+        FROM accounts a
+        LEFT JOIN (
+            SELECT jl.account_id, SUM(jl.debit) AS debit, SUM(jl.credit) AS credit
+            FROM journal_entries je
+            JOIN journal_lines jl ON jl.entry_id = je.id
+            WHERE {' AND '.join(conditions)}
+            GROUP BY jl.account_id
+        ) t ON t.account_id = a.id
+        ORDER BY a.id
+    ''', params)
+
+
+def group_balances(balances, predicate):
+    # Merges rows sharing an account name and keeps the accounts matching
+    # predicate(name, type) that had any activity, as (name, debit, credit)
+    # sorted by name.
+    totals = {}
+    for _, name, acc_type, debit, credit in balances:
+        if predicate(name, acc_type) and (debit or credit):
+            total_debit, total_credit = totals.get(name, (0.0, 0.0))
+            totals[name] = (total_debit + debit, total_credit + credit)
+    return [(name, debit, credit) for name, (debit, credit) in sorted(totals.items())]
+
+
+# Period close
+
+PERIOD_TYPES = ('month', 'year')
+
+
+def period_end(value, period_type='month'):
+    # Last day of the month or year containing the YYYY-MM-DD date value.
+    day = datetime.datetime.strptime(value, '%Y-%m-%d').date()
+    if period_type == 'year':
+        return f'{day.year}-12-31'
+    if period_type != 'month':
+        raise ValueError(f'Unknown period type: {period_type}')
+    first_of_next = (day.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    return (first_of_next - datetime.timedelta(days=1)).strftime('%Y-%m-%d')
+
+
+def nearest_snapshot(db, as_of):
+    # Latest up-to-date close on or before as_of, or None.
+    row = db.query_one('''
+        SELECT period_end FROM period_closes
+        WHERE stale = 0 AND period_end <= ?
+        ORDER BY period_end DESC LIMIT 1
+    ''', (as_of,))
+    return row[0] if row else None
+
+
+def balances_as_of(db, as_of):
+    # Closing balance per account at the end of as_of: the nearest snapshot
+    # plus the lines dated after it, so only the tail since the last close is
+    # scanned. Without a snapshot every line up to as_of is summed.
+    snapshot = nearest_snapshot(db, as_of)
+    return db.query('''
+        SELECT a.id, a.name, a.type,
+               COALESCE(s.debit, 0.0) + COALESCE(t.debit, 0.0),
+               COALESCE(s.credit, 0.0) + COALESCE(t.credit, 0.0)
+        FROM accounts a
+        LEFT JOIN period_snapshots s ON s.period_end = ? AND s.account_id = a.id
+        LEFT JOIN (
+            SELECT jl.account_id, SUM(jl.debit) AS debit, SUM(jl.credit) AS credit
+            FROM journal_entries je
+            JOIN journal_lines jl ON jl.entry_id = je.id
+            WHERE je.entry_date > ? AND je.entry_date <= ?
+            GROUP BY jl.account_id
+        ) t ON t.account_id = a.id
+        ORDER BY a.id
+    ''', (snapshot, snapshot or '', as_of))
+
+
+def close_period(db, end_date, period_type='month'):
+    # Writes (or rewrites) the closing snapshot for the period ending on
+    # end_date. Periods that have not ended yet cannot be closed.
+    if end_date > datetime.date.today().strftime('%Y-%m-%d'):
+        raise ValueError(f'The period ending {end_date} has not ended yet.')
+    with db.transaction() as c:
+        balances = balances_as_of(db, end_date)
+        c.execute('DELETE FROM period_snapshots WHERE period_end = ?', (end_date,))
+        c.execute('''INSERT INTO period_closes (period_end, period_type, closed_at, stale)
+                     VALUES (?, ?, ?, 0)
+                     ON CONFLICT(period_end) DO UPDATE SET
+                         period_type = excluded.period_type,
+                         closed_at = excluded.closed_at,
+                         stale = 0''',
+                  (end_date, period_type, datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+        c.executemany('''INSERT INTO period_snapshots (period_end, account_id, debit, credit)
+                         VALUES (?, ?, ?, ?)''',
+                      [(end_date, acc_id, debit, credit)
+                       for acc_id, _, _, debit, credit in balances if debit or credit])
+    return len(balances)
+
+
+def has_stale_closes(db):
+    return db.query_one('SELECT 1 FROM period_closes WHERE stale = 1 LIMIT 1') is not None
+
+
+def refresh_period_closes(db):
+    # Recomputes every close invalidated by a back-dated journal change,
+    # oldest first so each one can build on the previous snapshot.
+    stale = db.query('''SELECT period_end, period_type FROM period_closes
+                        WHERE stale = 1 ORDER BY period_end''')
+    with db.transaction():
+        for end_date, period_type in stale:
+            close_period(db, end_date, period_type)
+    return [end_date for end_date, _ in stale]
+
+
+# Report figures. The Reports tab renders these as text and ais_export
+# streams them as rows, so both always agree.
+
+CURRENT_ASSETS = ['Cash', 'Bank', 'Accounts Receivable', 'Inventory']
+
+
+def income_statement_figures(balances):
+    # (total revenue, operating expenses, income tax, net income)
+    total_revenue = sum(credit - debit for _, name, acc_type, debit, credit in balances if acc_type == 'Income')
+    # Operating expenses exclude income tax
+    total_expenses = sum(debit - credit for _, name, acc_type, debit, credit in balances
+                         if acc_type == 'Expense' and 'income tax' not in name.lower())
+    income_tax = sum(debit - credit for _, name, acc_type, debit, credit in balances
+                     if acc_type == 'Expense' and 'income tax' in name.lower())
+    return total_revenue, total_expenses, income_tax, total_revenue - total_expenses - income_tax
+
+
+def balance_sheet_sections(balances):
+    # [(section, [(account, balance)])] in statement order. Assets are shown
+    # as debit balances, liabilities and equity as credit balances.
+    current_assets = group_balances(balances, lambda name, acc_type: acc_type == 'Asset' and name in CURRENT_ASSETS)
+    current_assets.sort(key=lambda row: CURRENT_ASSETS.index(row[0]))
+    sections = [
+        ('Current Assets', 1, current_assets),
+        ('Fixed Assets', 1, group_balances(balances, lambda name, acc_type: acc_type == 'Asset' and name not in CURRENT_ASSETS)),
+        ('Current Liabilities', -1, group_balances(balances, lambda name, acc_type: acc_type == 'Liability' and name == 'Accounts Payable')),
+        ('Long-term Liabilities', -1, group_balances(balances, lambda name, acc_type: acc_type == 'Liability' and name != 'Accounts Payable')),
+        ('Equity', -1, group_balances(balances, lambda name, acc_type: acc_type == 'Equity')),
+    ]
+    return [(section, [(name, sign * ((debit or 0) - (credit or 0))) for name, debit, credit in rows])
+            for section, sign, rows in sections]
+
+
+def cash_flow_figures(period_balances, closing_balances):
+    # Indirect-method cash flow from the period's movements; the closing
+    # balances (as of the period end) give the ending cash.
+    def get_change(account_name, rows=period_balances):
+        return sum(debit - credit for _, name, acc_type, debit, credit in rows if name == account_name)
+
+    total_income = sum(credit - debit for _, name, acc_type, debit, credit in period_balances if acc_type == 'Income')
+    total_expenses = sum(debit - credit for _, name, acc_type, debit, credit in period_balances if acc_type == 'Expense')
+    f = {
+        'net_income': total_income - total_expenses,
+        'depreciation': sum(debit for _, name, acc_type, debit, credit in period_balances
+                            if 'depreciation' in name.lower() or 'amortization' in name.lower()),
+        'change_ar': get_change('Accounts Receivable'),
+        'change_inv': get_change('Inventory'),
+        'change_ap': get_change('Accounts Payable'),
+        'change_wages': get_change('Salaries and Wages Payable'),
+        'change_gift_card': 0.0,  # Decorative, unless you have such an account
+    }
+    f['net_operating'] = (
+        f['net_income']
+        + f['depreciation']
+        - f['change_ar']      # AR: increase is negative, decrease is positive
+        - f['change_inv']     # Inventory: increase is negative, decrease is positive
+        + f['change_ap']      # AP: increase is positive, decrease is negative
+        + f['change_wages']   # Wages Payable: increase is positive, decrease is negative
+        + f['change_gift_card']
+    )
+    # Investing and financing activities (decorative if not present)
+    f['purchase_equipment'] = -abs(get_change('Equipment'))  # Negative for purchase
+    f['sale_equipment'] = abs(get_change('Equipment'))  # Positive for sale
+    f['net_investing'] = f['purchase_equipment'] + f['sale_equipment']
+    f['proceeds_loan'] = 0.0
+    f['repayment_loan'] = 0.0
+    f['owner_distribution'] = 0.0
+    f['net_financing'] = f['proceeds_loan'] + f['repayment_loan'] + f['owner_distribution']
+    f['cash_end'] = get_change('Cash', closing_balances)
+    f['cash_begin'] = f['cash_end'] - (f['net_operating'] + f['net_investing'] + f['net_financing'])
+    f['net_increase'] = f['cash_end'] - f['cash_begin']
+    return f
+
+
+# Accounts of the adjusted trial balance, in statement order
+TRIAL_BALANCE_ACCOUNTS = [
+    'Cash',
+    'Accounts Receivable',
+    'Supplies',
+    'Prepaid Insurance',
+    'Equipment',
+    'Accumulated Depreciation—Equipment',
+    'Notes Payable',
+    'Accounts Payable',
+    'Unearned Service Revenue',
+    'Salaries and Wages Payable',
+    'Interest Payable',
+    'Common Stock',
+    'Retained Earnings',
+    'Dividends',
+    'Service Revenue',
+    'Salaries and Wages Expense',
+    'Supplies Expense',
+    'Rent Expense',
+    'Insurance Expense',
+    'Interest Expense',
+    'Depreciation Expense',
+]
+
+
+def trial_balance_rows(balances, accounts=TRIAL_BALANCE_ACCOUNTS):
+    # [(account, debit, credit)] with each account's net balance on its side
+    totals = {name: (debit, credit) for name, debit, credit in group_balances(balances, lambda name, acc_type: True)}
+    rows = []
+    for acc in accounts:
+        debit, credit = totals.get(acc, (0.0, 0.0))
+        # Net balance logic: asset/expense/dividend = debit, liability/equity/revenue = credit
+        # For accumulated depreciation, treat as credit (contra-asset)
+        if acc == 'Accumulated Depreciation—Equipment':
+            net = credit - debit
+        else:
+            net = debit - credit
+        rows.append((acc, net if net > 0 else 0.0, -net if net < 0 else 0.0))
+    return rows
+
+
+# Sales. Paid orders dated within [from_date, to_date], read from the daily
+# rollups (see ais_db.SALES_ROLLUP_TRIGGERS) rather than from the orders.
+
+def sales_period(from_date, to_date):
+    # Sales queries need both bounds; open ends cover every order
+    return from_date or '0000-01-01', to_date or '9999-12-31'
+
+
+def paid_order_count(db, from_date, to_date):
+    return db.query_one('SELECT COALESCE(SUM(orders), 0) FROM sales_daily WHERE sale_date BETWEEN ? AND ?',
+                        (from_date, to_date))[0]
+
+
+def sales_by_day(db, from_date, to_date):
+    # Cursor of (date, orders, sales, cost, profit, payment methods), newest first
+    return db.execute('''
+        SELECT sale_date, SUM(orders), SUM(revenue), SUM(cost), SUM(revenue - cost),
+               GROUP_CONCAT(NULLIF(payment_method, ''))
+        FROM sales_daily
+        WHERE sale_date BETWEEN ? AND ?
+        GROUP BY sale_date
+        ORDER BY sale_date DESC
+    ''', (from_date, to_date))
+
+
+def sales_by_item(db, from_date, to_date):
+    # Cursor of (item, category, quantity, revenue, cost, profit), best sellers first
+    return db.execute('''
+        SELECT mi.name, mi.category, SUM(s.quantity), SUM(s.revenue) AS total_revenue, SUM(s.cost),
+               SUM(s.revenue - s.cost)
+        FROM sales_daily_items s
+        JOIN menu_items mi ON mi.id = s.menu_item_id
+        WHERE s.sale_date BETWEEN ? AND ?
+        GROUP BY s.menu_item_id
+        ORDER BY total_revenue DESC
+    ''', (from_date, to_date))
+
+
+def sales_by_payment_method(db, from_date, to_date):
+    # Cursor of (method, transactions, amount)
+    return db.execute('''
+        SELECT NULLIF(payment_method, ''), SUM(orders), SUM(revenue)
+        FROM sales_daily
+        WHERE sale_date BETWEEN ? AND ?
+        GROUP BY payment_method
+    ''', (from_date, to_date))
+
+
+# Text reports, as shown on the Reports tab and printed by the CLI below.
+# The statements return their lines; sales_records returns the text with a
+# status message and an error flag.
+
+def sales_records(db, from_date=None, to_date=None):
+    # Returns (report text, status message, error)
+    bounds = sales_period(from_date, to_date)
+    c = db.cursor()
+    c.execute('SELECT COUNT(*) FROM orders')
+    total_orders = c.fetchone()[0]
+    if total_orders == 0:
+        return ("No orders found in the database. Please add some orders first.",
+                "No orders found in the database", True)
+    paid_orders = paid_order_count(db, *bounds)
+    if paid_orders == 0:
+        return (f"No paid orders found for the period {from_date} to {to_date}",
+                "No paid orders found for the selected period", True)
+    daily_sales = sales_by_day(db, *bounds).fetchall()
+    item_sales = sales_by_item(db, *bounds).fetchall()
+    payment_stats = sales_by_payment_method(db, *bounds).fetchall()
+    lines = []
+    lines.append('SALES RECORDS REPORT')
+    lines.append(f'Period: {from_date} to {to_date}')
+    lines.append('=' * 100)
+    lines.append('\nDAILY SALES SUMMARY')
+    lines.append('-' * 100)
+    lines.append(f'{"Date":<14}{"Orders":>10}{"Sales":>16}{"Cost":>16}{"Profit":>16}{"Payment Methods":>28}')
+    total_orders = 0
+    total_sales = 0
+    total_cost = 0
+    total_profit = 0
+    for date, orders, sales, cost, profit, methods in daily_sales:
+        lines.append(f'{date:<14}{orders:>10}{sales:>16.2f}{cost:>16.2f}{profit:>16.2f}{methods:>28}')
+        total_orders += orders
+        total_sales += sales
+        total_cost += cost
+        total_profit += profit
+    lines.append('-' * 100)
+    lines.append(f'{"TOTAL":<14}{total_orders:>10}{total_sales:>16.2f}{total_cost:>16.2f}{total_profit:>16.2f}')
+    lines.append('\nITEM-WISE SALES ANALYSIS')
+    lines.append('-' * 100)
+    lines.append(f'{"Item":<32}{"Category":<18}{"Qty":>10}{"Revenue":>16}{"Cost":>16}{"Profit":>16}')
+    for name, category, qty, revenue, cost, profit in item_sales:
+        lines.append(f'{name:<32}{category:<18}{qty:>10}{revenue:>16.2f}{cost:>16.2f}{profit:>16.2f}')
+    lines.append('\nPAYMENT METHOD DISTRIBUTION')
+    lines.append('-' * 100)
+    lines.append(f'{"Method":<20}{"Transactions":>16}{"Amount":>16}')
+    for method, transactions, amount in payment_stats:
+        lines.append(f'{method:<20}{transactions:>16}{amount:>16.2f}')
+    lines.append('\nSUMMARY STATISTICS')
+    lines.append('-' * 100)
+    lines.append(f'Total Orders: {total_orders}')
+    lines.append(f'Total Sales: {total_sales:.2f}')
+    lines.append(f'Total Cost: {total_cost:.2f}')
+    lines.append(f'Gross Profit: {total_profit:.2f}')
+    lines.append(f'Average Order Value: {total_sales/total_orders:.2f}' if total_orders > 0 else 'Average Order Value: 0.00')
+    lines.append(f'Profit Margin: {(total_profit/total_sales*100):.1f}%' if total_sales > 0 else 'Profit Margin: 0.0%')
+    return '\n'.join(lines), "Sales report generated successfully", False
+
+
+def income_statement_lines(db, from_date=None, to_date=None):
+    # Only entries dated within the period
+    total_revenue, total_expenses, income_tax, net_income = income_statement_figures(
+        account_balances(db, from_date, to_date))
+    lines = []
+    lines.append('=' * 80)
+    lines.append('INCOME STATEMENT'.center(80))
+    lines.append('=' * 80)
+    lines.append(f'For the period: {from_date} to {to_date}'.center(80))
+    lines.append('=' * 80 + '\n')
+    lines.append('REVENUE')
+    lines.append('-' * 80)
+    lines.append(f'{"Description":<40}{"Amount":>30}')
+    lines.append(f'{"Total Revenue":<40}{total_revenue:>30.2f}\n')
+    lines.append('EXPENSES')
+    lines.append('-' * 80)
+    lines.append(f'{"Description":<40}{"Amount":>30}')
+    lines.append(f'{"Total Expenses":<40}{total_expenses:>30.2f}\n')
+    lines.append('NET INCOME')
+    lines.append('-' * 80)
+    lines.append(f'{"Net Income":<40}{net_income:>30.2f}\n')
+    lines.append('=' * 80)
+    lines.append('End of Income Statement'.center(80))
+    lines.append('=' * 80)
+    return lines
+
+
+def balance_sheet_lines(db, from_date=None, to_date=None):
+    # Everything posted up to the as-of date
+    sections = dict(balance_sheet_sections(account_balances(db, None, to_date)))
+    current_assets = sections['Current Assets']
+    fixed_assets = sections['Fixed Assets']
+    current_liabilities = sections['Current Liabilities']
+    long_term_liabilities = sections['Long-term Liabilities']
+    equity = sections['Equity']
+    total_current_assets = sum(balance for _, balance in current_assets)
+    total_fixed_assets = sum(balance for _, balance in fixed_assets)
+    total_assets = total_current_assets + total_fixed_assets
+    total_current_liabilities = sum(balance for _, balance in current_liabilities)
+    total_long_term_liabilities = sum(balance for _, balance in long_term_liabilities)
+    total_liabilities = total_current_liabilities + total_long_term_liabilities
+    total_equity = sum(balance for _, balance in equity)
+    lines = []
+    lines.append('=' * 90)
+    lines.append('BALANCE SHEET'.center(90))
+    lines.append('=' * 90)
+    lines.append(f'As of: {to_date}'.center(90))
+    lines.append('=' * 90 + '\n')
+    lines.append('ASSETS')
+    lines.append('-' * 90)
+    lines.append('Current Assets:')
+    for name, balance in current_assets:
+        lines.append(f'  {name:<36}{balance:>18.2f}')
+    lines.append('-' * 90)
+    lines.append(f'Total Current Assets: {total_current_assets:>18.2f}\n')
+    lines.append('Fixed Assets:')
+    for name, balance in fixed_assets:
+        lines.append(f'  {name:<36}{balance:>18.2f}')
+    lines.append('-' * 90)
+    lines.append(f'Total Fixed Assets: {total_fixed_assets:>18.2f}')
+    lines.append('-' * 90)
+    lines.append(f'Total Assets: {total_assets:>18.2f}\n')
+    lines.append('LIABILITIES')
+    lines.append('-' * 90)
+    lines.append('Current Liabilities:')
+    for name, balance in current_liabilities:
+        lines.append(f'  {name:<36}{balance:>18.2f}')
+    lines.append('-' * 90)
+    lines.append(f'Total Current Liabilities: {total_current_liabilities:>18.2f}\n')
+    lines.append('Long-term Liabilities:')
+    for name, balance in long_term_liabilities:
+        lines.append(f'  {name:<36}{balance:>18.2f}')
+    lines.append('-' * 90)
+    lines.append(f'Total Long-term Liabilities: {total_long_term_liabilities:>18.2f}')
+    lines.append('-' * 90)
+    lines.append(f'Total Liabilities: {total_liabilities:>18.2f}\n')
+    lines.append('EQUITY')
+    lines.append('-' * 90)
+    for name, balance in equity:
+        lines.append(f'{name:<38}{balance:>18.2f}')
+    lines.append('-' * 90)
+    lines.append(f'Total Equity: {total_equity:>18.2f}\n')
+    lines.append('TOTAL LIABILITIES AND EQUITY')
+    lines.append('-' * 90)
+    lines.append(f'Total: {total_liabilities + total_equity:>18.2f}')
+    lines.append('\n' + '=' * 90)
+    lines.append('End of Balance Sheet'.center(90))
+    lines.append('=' * 90)
+    return lines
+
+
+def cash_flow_lines(db, from_date=None, to_date=None):
+    # Movements within the period; ending cash from the closing balances
+    f = cash_flow_figures(account_balances(db, from_date, to_date), account_balances(db, None, to_date))
+    net_income = f['net_income']
+    depreciation = f['depreciation']
+    change_ar = f['change_ar']
+    change_inv = f['change_inv']
+    change_ap = f['change_ap']
+    change_wages = f['change_wages']
+    change_gift_card = f['change_gift_card']
+    net_operating = f['net_operating']
+
+    # For reporting, only show nonzero changes, with correct sign and label
+    lines = []
+    lines.append('CASH FLOWS FROM OPERATING ACTIVITIES')
+    lines.append(f'Net Income{"":.<40}{net_income:>10,.0f}')
+    lines.append('Adjustments:')
+    lines.append(f'+ Depreciation & Amortization{"":.<25}{depreciation:>10,.0f}')
+    lines.append('Changes in Working Capital:')
+    # AR
+    if change_ar > 0:
+        lines.append(f'- Increase in Accounts Receivable{"":.<15}{change_ar:>10,.0f}')
+    elif change_ar < 0:
+        lines.append(f'+ Decrease in Accounts Receivable{"":.<15}{-change_ar:>10,.0f}')
+    # Inventory
+    if change_inv > 0:
+        lines.append(f'- Increase in Inventory{"":.<23}{change_inv:>10,.0f}')
+    elif change_inv < 0:
+        lines.append(f'+ Decrease in Inventory{"":.<23}{-change_inv:>10,.0f}')
+    # AP
+    if change_ap > 0:
+        lines.append(f'+ Increase in Accounts Payable{"":.<17}{change_ap:>10,.0f}')
+    elif change_ap < 0:
+        lines.append(f'- Decrease in Accounts Payable{"":.<17}{-change_ap:>10,.0f}')
+    # Wages Payable
+    if change_wages > 0:
+        lines.append(f'+ Increase in Accrued Wages Payable{"":.<7}{change_wages:>10,.0f}')
+    elif change_wages < 0:
+        lines.append(f'- Decrease in Accrued Wages Payable{"":.<7}{-change_wages:>10,.0f}')
+    # Gift Card
+    if change_gift_card != 0:
+        if change_gift_card > 0:
+            lines.append(f'+ Increase in Gift Card Liability{"":.<11}{change_gift_card:>10,.0f}')
+        else:
+            lines.append(f'- Decrease in Gift Card Liability{"":.<11}{-change_gift_card:>10,.0f}')
+    lines.append(f'Net Cash Provided by Operating Activities{"":.<2}{net_operating:>10,.0f}\n')
+
+    purchase_equipment, sale_equipment, net_investing = f['purchase_equipment'], f['sale_equipment'], f['net_investing']
+    proceeds_loan, repayment_loan, owner_distribution = f['proceeds_loan'], f['repayment_loan'], f['owner_distribution']
+    net_financing = f['net_financing']
+    cash_begin, cash_end, net_increase = f['cash_begin'], f['cash_end'], f['net_increase']
+
+    lines.append('CASH FLOWS FROM INVESTING ACTIVITIES')
+    lines.append(f'- Purchase of New Equipment{"":.<22}{purchase_equipment:>10,.0f}')
+    lines.append(f'+ Proceeds from Sale of Equipment{"":.<13}{sale_equipment:>10,.0f}')
+    lines.append(f'Net Cash Provided by Investing Activities{"":.<5}{net_investing:>10,.0f}\n')
+
+    lines.append('CASH FLOWS FROM FINANCING ACTIVITIES')
+    lines.append(f'+ Proceeds from Line of Credit Drawdown{"":.<4}{proceeds_loan:>10,.0f}')
+    lines.append(f'- Repayment of Equipment Loan Principal{"":.<2}{repayment_loan:>10,.0f}')
+    lines.append(f'- Owner Distribution{"":.<28}{owner_distribution:>10,.0f}')
+    lines.append(f'Net Cash Provided by Financing Activities{"":.<5}{net_financing:>10,.0f}\n')
+
+    lines.append(f'NET INCREASE IN CASH{"":.<32}{net_increase:>10,.0f}')
+    lines.append(f'CASH AT BEGINNING OF PERIOD{"":.<23}{cash_begin:>10,.0f}')
+    lines.append(f'CASH AT END OF PERIOD{"":.<28}{cash_end:>10,.0f}')
+
+    return lines
+
+
+def trial_balance_lines(db, from_date=None, to_date=None):
+    # Balances posted up to the as-of date, in statement order
+    rows = trial_balance_rows(account_balances(db, None, to_date))
+    # Table column widths
+    col1 = 36  # Account
+    col2 = 18  # Debit
+    col3 = 18  # Credit
+    sep = ' | '
+    # Header
+    lines = []
+    lines.append('=' * (col1 + col2 + col3 + 2 * len(sep)))
+    lines.append('ADJUSTED TRIAL BALANCE'.center(col1 + col2 + col3 + 2 * len(sep)))
+    lines.append('=' * (col1 + col2 + col3 + 2 * len(sep)))
+    lines.append(f'{"Account":<{col1}}{sep}{"Debit":>{col2}}{sep}{"Credit":>{col3}}')
+    lines.append('-' * (col1 + col2 + col3 + 2 * len(sep)))
+    total_debit = 0.0
+    total_credit = 0.0
+    for acc, debit_val, credit_val in rows:
+        total_debit += debit_val
+        total_credit += credit_val
+        lines.append(f'{acc:<{col1}}{sep}{debit_val:>{col2}.2f}{sep}{credit_val:>{col3}.2f}')
+    lines.append('-' * (col1 + col2 + col3 + 2 * len(sep)))
+    lines.append(f'{"TOTALS":<{col1}}{sep}{total_debit:>{col2}.2f}{sep}{total_credit:>{col3}.2f}')
+    
+    # Add verification message
+    if abs(total_debit - total_credit) < 0.01:  # Using small epsilon for floating point comparison
+        lines.append('\nVERIFICATION: Debits equal Credits ✓')
+    else:
+        lines.append('\nVERIFICATION: Debits do not equal Credits! ✗')
+        lines.append(f'Difference: {abs(total_debit - total_credit):.2f}')
+    
+    lines.append('=' * (col1 + col2 + col3 + 2 * len(sep)))
+    lines.append('End of Adjusted Trial Balance'.center(col1 + col2 + col3 + 2 * len(sep)))
+    lines.append('=' * (col1 + col2 + col3 + 2 * len(sep)))
+    return lines
+
+
+TEXT_REPORTS = {
+    'income-statement': income_statement_lines,
+    'balance-sheet': balance_sheet_lines,
+    'cash-flow': cash_flow_lines,
+    'trial-balance': trial_balance_lines,
+    'sales': lambda db, from_date, to_date: sales_records(db, from_date, to_date)[0].split('\n'),
+}
+
+
+def run_report(db, name, handle, fmt='text', from_date=None, to_date=None):
+    # Writes one report to handle: the Reports tab text, or the rows of the
+    # matching ais_export source. Stale period closes are not recomputed
+    # here, since that writes: call refresh_period_closes first, as the
+    # Reports tab and the command line do.
+    from ais_export import EXPORTS, export_report
+    if fmt == 'text':
+        if name not in TEXT_REPORTS:
+            raise ValueError(f'No text form for {name}; choose from {", ".join(TEXT_REPORTS)}')
+        handle.write('\n'.join(TEXT_REPORTS[name](db, from_date, to_date)) + '\n')
+        return
+    if name not in EXPORTS:
+        raise ValueError(f'No {fmt} form for {name}; choose from {", ".join(EXPORTS)}')
+    export_report(db, name, handle, fmt, from_date, to_date)
+
+
+if __name__ == '__main__':
+    import argparse
+    import os
+    import sys
+    import time
+    from ais_db import DB_NAME, Database, init_db
+    from ais_export import EXPORT_FORMATS, EXPORTS
+    today = datetime.date.today()
+    parser = argparse.ArgumentParser(description='Run AIS reports without the GUI')
+    parser.add_argument('report', choices=sorted(set(TEXT_REPORTS) | set(EXPORTS)))
+    parser.add_argument('--from', dest='from_date', type=parse_report_date,
+                        default=(today - datetime.timedelta(days=30)).strftime('%Y-%m-%d'))
+    parser.add_argument('--to', dest='to_date', type=parse_report_date, default=today.strftime('%Y-%m-%d'))
+    parser.add_argument('--format', choices=('text',) + EXPORT_FORMATS, default='text')
+    parser.add_argument('--output', '-o', help='output file (default: stdout)')
+    parser.add_argument('--db', default=DB_NAME)
+    parser.add_argument('--repeat', type=int, default=1, help='run N times and print timings (output from the first run)')
+    args = parser.parse_args()
+    db = Database(args.db)
+    init_db(db)
+    timings = []
+    try:
+        refresh_period_closes(db)
+        for run in range(max(args.repeat, 1)):
+            if run:
+                target = open(os.devnull, 'w')
+            elif args.output:
+                target = open(args.output, 'w', newline='', encoding='utf-8')
+            else:
+                target = sys.stdout
+            started = time.perf_counter()
+            try:
+                run_report(db, args.report, target, args.format, args.from_date, args.to_date)
+            except ValueError as e:
+                sys.exit(str(e))
+            finally:
+                if target is not sys.stdout:
+                    target.close()
+            timings.append(time.perf_counter() - started)
+    finally:
+        db.close_all()
+    if args.repeat > 1:
+        print(f'{args.report}: best {min(timings) * 1000:.1f} ms, mean {sum(timings) / len(timings) * 1000:.1f} ms '
+              f'over {len(timings)} runs', file=sys.stderr)
@@ -0,0 +1,125 @@
+SEARCH_LIMIT = 200
+
+# The trigram tokenizer needs at least three characters to use its index
+MIN_INDEXED_LENGTH = 3
+
+
+def contains_filter(search, columns):
+    # SQL form of the tabs' case-insensitive "search in column" filter.
+    search = (search or '').lower()
+    if not search:
+        return '', ()
+    clause = ' OR '.join(f'instr(lower({column}), ?) > 0' for column in columns)
+    return f'({clause})', (search,) * len(columns)
+
+
+def match_phrase(search):
+    # Quotes the search text as one FTS5 phrase so operators and punctuation
+    # in it are matched literally.
+    return '"' + search.replace('"', '""') + '"'
+
+
+def has_search_index(db, table):
+    return db.query_one("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                        (f'{table}_fts',)) is not None
+
+
+def indexed(db, table, search):
+    return len(search) >= MIN_INDEXED_LENGTH and has_search_index(db, table)
+
+
+def search_filter(db, table, search, columns):
+    # WHERE clause restricting table to rows matching search, for listings
+    # that keep their own order (the paged grids).
+    search = (search or '').lower()
+    if not search:
+        return '', ()
+    if indexed(db, table, search):
+        return f'id IN (SELECT rowid FROM {table}_fts WHERE {table}_fts MATCH ?)', (match_phrase(search),)
+    return contains_filter(search, columns)
+
+
+def search_rows(db, table, select, search, columns, order_by='id', limit=SEARCH_LIMIT):
+    # Rows of table (the select columns) matching search in any of columns.
+    # Without a search every row comes back in order_by order; with one the
+    # best matches come first and at most limit rows are returned.
+    search = (search or '').lower()
+    fields = ', '.join(f't.{column}' for column in select)
+    if not search:
+        return db.query(f'SELECT {fields} FROM {table} t ORDER BY {order_by}')
+    if indexed(db, table, search):
+        return db.query(f'''
+            SELECT {fields}
+            FROM {table}_fts
+            JOIN {table} t ON t.id = {table}_fts.rowid
+            WHERE {table}_fts MATCH ?
+            ORDER BY {table}_fts.rank
+            LIMIT ?
+        ''', (match_phrase(search), limit))
+    where, params = contains_filter(search, [f't.{column}' for column in columns])
+    return db.query(f'SELECT {fields} FROM {table} t WHERE {where} ORDER BY {order_by} LIMIT ?',
+                    params + (limit,))
+
+
+SEARCH_DELAY_MS = 250
+
+
+def row_contains(row, positions, search):
+    # Python twin of contains_filter for rows already fetched
+    return any(search in str(row[i]).lower() for i in positions if row[i] is not None)
+
+
+class SearchController:
+    # Debounces a search box: the reload runs once typing has paused for
+    # delay_ms instead of on every keystroke.
+    def __init__(self, widget, var, reload, delay_ms=SEARCH_DELAY_MS):
+        self.widget = widget
+        self.var = var
+        self.reload = reload
+        self.delay_ms = delay_ms
+        self._after = None
+        var.trace_add('write', self._changed)
+
+    def _changed(self, *args):
+        if self._after is not None:
+            self.widget.after_cancel(self._after)
+        self._after = self.widget.after(self.delay_ms, self._fire)
+
+    def _fire(self):
+        self._after = None
+        self.reload()
+
+
+class IncrementalSearch:
+    # Runs a list's search on the query worker, superseding any search still
+    # in flight. When the new text extends the previous one and the previous
+    # result was complete (under limit rows), the matches are a subset of
+    # that result, so they are filtered from it without touching SQLite.
+    def __init__(self, worker, key, fetch, positions, limit=SEARCH_LIMIT, on_error=None):
+        self.worker = worker
+        self.key = key
+        self.fetch = fetch
+        self.positions = positions
+        self.limit = limit
+        self.on_error = on_error
+        self._cached = None
+
+    def run(self, search, apply, incremental=False):
+        # fetch(search) runs on the worker; apply(rows) on the Tk thread.
+        # Only type-ahead passes incremental=True: any other reload follows
+        # an edit, so the cached result is stale.
+        search = (search or '').lower()
+        cached = self._cached
+        if incremental and cached is not None and cached[0] in search and len(cached[1]) < self.limit:
+            rows = [row for row in cached[1] if row_contains(row, self.positions, search)]
+            self._cached = (search, rows)
+            self.worker.cancel(self.key)
+            apply(rows)
+            return
+        self._cached = None
+        self.worker.submit(self.key, lambda: self.fetch(search),
+                           lambda rows: self._done(search, rows, apply), self.on_error)
+
+    def _done(self, search, rows, apply):
+        self._cached = (search, rows)
+        apply(rows)
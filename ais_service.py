@@ -0,0 +1,361 @@
+import asyncio
+import functools
+import hmac
+import http.client
+import ipaddress
+import json
+import os
+import select
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import ais_orders
+from ais_journal import PostingError
+from ais_orders import OrderError
+from ais_writer import WriteBatcher
+
+# Loopback only by default; stations on the LAN need --host 0.0.0.0 (or
+# the machine's address) and a shared token
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+# Shared secret sent as 'Authorization: Bearer <token>'; read by both the
+# server and ServiceClient
+TOKEN_ENV = 'AIS_SERVICE_TOKEN'
+# Threads (each with its own connection) serving requests; writes are then
+# committed by the WriteQueue's single writer
+POOL_SIZE = 8
+# Items marked prepared within this many seconds are committed together
+KITCHEN_BATCH_WINDOW = 0.15
+MAX_BODY = 1024 * 1024
+
+
+class OrderService:
+    # The order, kitchen and cashier operations on a database. The Tk app
+    # uses it directly or, with AIS_SERVICE_URL set, through ServiceClient,
+    # which has the same methods. With a WriteQueue, every write is run by
+    # its writer thread and group-committed with whatever else is waiting,
+    # and items marked prepared are gathered for batch_window seconds into
+    # one update with one order rollup (0 turns that off).
+    def __init__(self, db, refs, writes=None, batch_window=KITCHEN_BATCH_WINDOW):
+        self.db = db
+        self.refs = refs
+        self.writes = writes
+        self.prepared = None
+        if writes is not None and batch_window:
+            self.prepared = WriteBatcher(writes, functools.partial(ais_orders.mark_items_prepared, db), batch_window)
+
+    def close(self):
+        if self.prepared is not None:
+            self.prepared.flush()
+
+    def write(self, command, *args):
+        if self.writes is None:
+            return command(*args)
+        return self.writes.call(command, *args)
+
+    def place_order(self, table, cart):
+        return self.write(ais_orders.place_order, self.db, table, cart)
+
+    def kitchen_orders(self, order_ids=None):
+        return ais_orders.kitchen_orders(self.db, order_ids)
+
+    def mark_item_prepared(self, item_id):
+        return self.submit_item_prepared(item_id).result()
+
+    def submit_item_prepared(self, item_id):
+        # Future of the order id, resolved once the item's batch commits, so
+        # the caller need not hold a thread for the batch window
+        if self.prepared is None:
+            if self.writes is not None:
+                return self.writes.submit(ais_orders.mark_item_prepared, self.db, item_id)
+            future = Future()
+            try:
+                future.set_result(ais_orders.mark_item_prepared(self.db, item_id))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        future = Future()
+
+        def resolve(batch):
+            error = batch.exception()
+            if error is None and batch.result() is None:
+                error = OrderError(f'Order item {item_id} not found.')
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(batch.result())
+
+        self.prepared.submit(int(item_id)).add_done_callback(resolve)
+        return future
+
+    def mark_order_complete(self, item_id):
+        return self.write(ais_orders.mark_order_complete, self.db, item_id)
+
+    def unpaid_orders(self, order_ids=None):
+        return ais_orders.unpaid_orders(self.db, order_ids)
+
+    def process_payment(self, order_number, payment_method, amount_received):
+        return self.write(ais_orders.process_payment, self.db, self.refs, order_number, payment_method,
+                          amount_received)
+
+
+def order_ids_param(query):
+    # ?orders=1,2,3 -> [1, 2, 3]; absent -> None (every order)
+    if 'orders' not in query:
+        return None
+    return [int(value) for value in query['orders'][0].split(',') if value]
+
+
+# (method, path): (OrderService method, arguments from (query, body))
+ROUTES = {
+    ('POST', '/orders'): ('place_order', lambda query, body: (body['table'], body['cart'])),
+    ('GET', '/kitchen'): ('kitchen_orders', lambda query, body: (order_ids_param(query),)),
+    ('POST', '/kitchen/prepared'): ('mark_item_prepared', lambda query, body: (int(body['item_id']),)),
+    ('POST', '/kitchen/complete'): ('mark_order_complete', lambda query, body: (int(body['item_id']),)),
+    ('GET', '/cashier/unpaid'): ('unpaid_orders', lambda query, body: (order_ids_param(query),)),
+    ('POST', '/cashier/payments'): ('process_payment', lambda query, body: (
+        body['order_number'], body['payment_method'], float(body['amount_received']))),
+}
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 401: 'Unauthorized', 404: 'Not Found',
+               405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+# Raised by the operations for input they refuse; answered with 400
+CLIENT_ERRORS = (OrderError, PostingError, KeyError, ValueError, TypeError)
+
+
+def is_loopback(host):
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class ServiceServer:
+    # A small HTTP/1.1 JSON server on asyncio. The event loop only parses
+    # requests; database work runs on a thread pool, each thread with its
+    # own connection from the shared Database session. Give the service a
+    # WriteQueue so terminals queue for the write lock here, and share its
+    # commits, instead of retrying against SQLite's busy timeout.
+    #
+    # With a token every request must carry it. Binding anything but a
+    # loopback address without one is refused: the API takes payments.
+    def __init__(self, service, pool_size=POOL_SIZE, token=None):
+        self.service = service
+        self.token = token or None
+        self.pool = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='ais-service')
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        if self.token is None and not is_loopback(host):
+            raise ValueError(f'Refusing to serve on {host} without a token (set {TOKEN_ENV} or --token).')
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request = await self.read_request(reader)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                if self.authorized(headers):
+                    status, payload = await self.dispatch(method, target, body)
+                else:
+                    status, payload = 401, {'error': 'Missing or wrong service token'}
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                data = json.dumps(payload).encode()
+                writer.write(f'HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n'
+                             f'Content-Type: application/json\r\n'
+                             f'Content-Length: {len(data)}\r\n'
+                             f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'.encode() + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            # Client went away or sent something that is not HTTP
+            pass
+        finally:
+            writer.close()
+
+    def authorized(self, headers):
+        if self.token is None:
+            return True
+        scheme, _, token = headers.get('authorization', '').partition(' ')
+        return scheme.lower() == 'bearer' and hmac.compare_digest(token.strip().encode(), self.token.encode())
+
+    async def read_request(self, reader):
+        line = await reader.readline()
+        if not line.strip():
+            return None
+        method, target, _ = line.decode('latin-1').split(' ', 2)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get('content-length', 0))
+        if length > MAX_BODY:
+            raise ValueError('Request body too large')
+        body = await reader.readexactly(length) if length else b''
+        return method, target, headers, body
+
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        route = ROUTES.get((method, url.path))
+        if route is None:
+            if any(path == url.path for _, path in ROUTES):
+                return 405, {'error': f'{method} not allowed on {url.path}'}
+            return 404, {'error': f'No such resource: {url.path}'}
+        name, arguments = route
+        try:
+            args = arguments(parse_qs(url.query), json.loads(body) if body else {})
+        except CLIENT_ERRORS as e:
+            return 400, {'error': f'Bad request: {e!r}'}
+        call = getattr(self.service, name)
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self.pool, lambda: call(*args))
+        except (OrderError, PostingError) as e:
+            return 400, {'error': str(e)}
+        except CLIENT_ERRORS as e:
+            # A cart line without 'qty', a price that is not a number...
+            return 400, {'error': f'Bad request: {e!r}'}
+        except Exception as e:
+            return 500, {'error': str(e)}
+        return 200, {'result': result}
+
+
+def closed_by_peer(sock):
+    # An idle keep-alive socket is only readable once the server closed it
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+    except (OSError, ValueError):
+        return True
+    return bool(readable)
+
+
+class ServiceClient:
+    # OrderService over HTTP. Each thread keeps one keep-alive connection,
+    # reopened when the server has dropped it. A POST that was sent is never
+    # resent, since the server may have run it: an order or a payment
+    # cannot go through twice.
+    def __init__(self, url, token=None, timeout=10.0):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or DEFAULT_PORT
+        self.token = token if token is not None else os.environ.get(TOKEN_ENV)
+        self.timeout = timeout
+        self._local = threading.local()
+        # Runs the submit_* calls, which return a Future
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='ais-client')
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def place_order(self, table, cart):
+        return tuple(self.call('POST', '/orders', {'table': table, 'cart': cart}))
+
+    def kitchen_orders(self, order_ids=None):
+        return [tuple(row) for row in self.call('GET', '/kitchen' + self.order_query(order_ids))]
+
+    def mark_item_prepared(self, item_id):
+        return self.call('POST', '/kitchen/prepared', {'item_id': item_id})
+
+    def submit_item_prepared(self, item_id):
+        return self._executor.submit(self.mark_item_prepared, item_id)
+
+    def mark_order_complete(self, item_id):
+        return self.call('POST', '/kitchen/complete', {'item_id': item_id})
+
+    def unpaid_orders(self, order_ids=None):
+        return [tuple(row) for row in self.call('GET', '/cashier/unpaid' + self.order_query(order_ids))]
+
+    def process_payment(self, order_number, payment_method, amount_received):
+        return tuple(self.call('POST', '/cashier/payments', {
+            'order_number': order_number, 'payment_method': payment_method, 'amount_received': amount_received}))
+
+    def order_query(self, order_ids):
+        return '' if order_ids is None else '?orders=' + ','.join(str(order_id) for order_id in order_ids)
+
+    def call(self, method, path, payload=None):
+        body = json.dumps(payload) if payload is not None else None
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        while True:
+            conn = getattr(self._local, 'conn', None)
+            if conn is not None and conn.sock is not None and method != 'GET' and closed_by_peer(conn.sock):
+                conn.close()
+                conn = None
+            reused = conn is not None
+            if not reused:
+                conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            sent = False
+            try:
+                conn.request(method, path, body, headers)
+                sent = True
+                response = conn.getresponse()
+                data = json.loads(response.read() or b'{}')
+                break
+            except (ConnectionError, http.client.HTTPException):
+                conn.close()
+                self._local.conn = None
+                # A kept-alive connection the server has since closed is
+                # retried on a fresh one. A write that went out may have been
+                # run before the connection dropped, so it is never resent.
+                if not reused or (sent and method != 'GET'):
+                    raise
+        if response.status == 400:
+            raise OrderError(data.get('error', 'Bad request'))
+        if response.status != 200:
+            raise RuntimeError(f'Order service error {response.status}: {data.get("error")}')
+        return data['result']
+
+
+if __name__ == '__main__':
+    import argparse
+    from ais_cache import ReferenceCache
+    from ais_db import DB_NAME, Database, init_db
+    from ais_writer import WriteQueue
+    parser = argparse.ArgumentParser(description='Serve the AIS order, kitchen and cashier operations as JSON over HTTP')
+    parser.add_argument('--host', default=DEFAULT_HOST,
+                        help='address to listen on (default: loopback only; 0.0.0.0 for every interface, '
+                             'which needs a token)')
+    parser.add_argument('--token', default=os.environ.get(TOKEN_ENV),
+                        help=f'shared token clients must send (default: ${TOKEN_ENV})')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--db', default=DB_NAME)
+    parser.add_argument('--threads', type=int, default=POOL_SIZE, help='request threads (one connection each)')
+    parser.add_argument('--batch-ms', type=int, default=int(KITCHEN_BATCH_WINDOW * 1000),
+                        help='window for batching kitchen item updates (0: off)')
+    args = parser.parse_args()
+    if not args.token and not is_loopback(args.host):
+        parser.error(f'--host {args.host} is reachable from other machines; set --token or {TOKEN_ENV}')
+    db = Database(args.db)
+    init_db(db)
+    refs = ReferenceCache(db)
+    writes = WriteQueue(db, refs)
+    service = OrderService(db, refs, writes, args.batch_ms / 1000)
+    server = ServiceServer(service, args.threads, args.token)
+    print(f'Serving on http://{args.host}:{args.port}')
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        service.close()
+        writes.close()
+        db.close_all()
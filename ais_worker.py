@@ -0,0 +1,129 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueryWorker:
+    # Runs database work on a small thread pool so the Tk event loop never
+    # waits on SQLite. Each pool thread gets its own connection from the
+    # shared Database session. Results are handed back through a queue that
+    # the Tk thread drains with after(), so callbacks always run on the Tk
+    # thread and may touch widgets freely.
+    #
+    # Every job has a key ('ledger', 'report', ...). Submitting a new job
+    # under the same key supersedes the previous one: a queued job is
+    # dropped, a running one is interrupted, and a late result is discarded.
+    def __init__(self, widget, db, max_workers=2, poll_ms=25):
+        self.widget = widget
+        self.db = db
+        self.poll_ms = poll_ms
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ais-query')
+        self._results = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._latest = {}
+        self._pending = 0
+        self._polling = False
+        self._closed = False
+
+    def submit(self, key, job, on_done=None, on_error=None):
+        # job() runs on a pool thread and must not touch Tk; on_done(result)
+        # or on_error(exc) run on the Tk thread.
+        ticket = _Ticket(key, on_done, on_error)
+        with self._lock:
+            if self._closed:
+                return None
+            previous = self._latest.get(key)
+            self._latest[key] = ticket
+            self._pending += 1
+        if previous is not None:
+            self._cancel(previous)
+        ticket.future = self._executor.submit(self._run, ticket, job)
+        self._schedule_poll()
+        return ticket
+
+    def cancel(self, key):
+        with self._lock:
+            ticket = self._latest.pop(key, None)
+        if ticket is not None:
+            self._cancel(ticket)
+
+    def busy(self, key):
+        with self._lock:
+            return key in self._latest
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            tickets, self._latest = list(self._latest.values()), {}
+        for ticket in tickets:
+            self._cancel(ticket)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _cancel(self, ticket):
+        with ticket.lock:
+            ticket.cancelled = True
+            if ticket.conn is not None:
+                # Aborts the statement in flight; the job sees OperationalError
+                ticket.conn.interrupt()
+        if ticket.future is not None and ticket.future.cancel():
+            self._results.put((ticket, None, None))
+
+    def _run(self, ticket, job):
+        with ticket.lock:
+            if ticket.cancelled:
+                self._results.put((ticket, None, None))
+                return
+            ticket.conn = self.db.connect()
+        try:
+            result, error = job(), None
+        except Exception as e:
+            result, error = None, e
+        finally:
+            with ticket.lock:
+                ticket.conn = None
+        self._results.put((ticket, result, error))
+
+    def _schedule_poll(self):
+        with self._lock:
+            if self._polling or self._closed:
+                return
+            self._polling = True
+        self.widget.after(self.poll_ms, self._drain)
+
+    def _drain(self):
+        try:
+            while True:
+                try:
+                    ticket, result, error = self._results.get_nowait()
+                except queue.Empty:
+                    break
+                with self._lock:
+                    self._pending -= 1
+                    current = self._latest.get(ticket.key) is ticket
+                    if current:
+                        del self._latest[ticket.key]
+                if ticket.cancelled or not current:
+                    continue
+                if error is not None:
+                    if ticket.on_error is None:
+                        raise error
+                    ticket.on_error(error)
+                elif ticket.on_done is not None:
+                    ticket.on_done(result)
+        finally:
+            with self._lock:
+                self._polling = self._pending > 0 and not self._closed
+                polling = self._polling
+            if polling:
+                self.widget.after(self.poll_ms, self._drain)
+
+
+class _Ticket:
+    def __init__(self, key, on_done, on_error):
+        self.key = key
+        self.on_done = on_done
+        self.on_error = on_error
+        self.lock = threading.Lock()
+        self.future = None
+        self.conn = None
+        self.cancelled = False
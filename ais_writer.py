@@ -0,0 +1,181 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+# Commands committed together at most; a batch also ends when the queue is
+# empty after max_wait seconds
+MAX_BATCH = 64
+
+
+class WriteQueue:
+    # Serializes database writes through one writer thread. A command is
+    # any function that writes through the shared Database session (so
+    # place_order, post_entry and friends as they are); callers submit it
+    # and get a Future. The writer takes whatever commands are waiting, up
+    # to max_batch, and runs them in one IMMEDIATE transaction with one
+    # commit, so under load many writes share each fsync and the writes
+    # sent here never wait on each other for the lock. Only writes submitted
+    # to the queue are serialized: in AISApp that is the order, kitchen and
+    # payment operations (OrderService) and period closes; the other
+    # handlers and journal imports still commit on their own connections
+    # and can wait on the queue's transaction up to the busy timeout.
+    #
+    # Each command runs under its own SAVEPOINT: one that raises is rolled
+    # back alone and its Future gets the exception, while the rest of the
+    # batch still commits. Results are only delivered once the batch has
+    # committed.
+    def __init__(self, db, refs=None, max_batch=MAX_BATCH, max_wait=0.0):
+        self.db = db
+        self.refs = refs
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='ais-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, command, *args):
+        future = Future()
+        if threading.current_thread() is self._thread:
+            # A command submitting another joins the batch already running;
+            # its error goes on the Future, as it would from the writer
+            try:
+                future.set_result(self._run_command(command, args))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        if self._closed:
+            raise RuntimeError('Write queue is closed')
+        self._queue.put((future, command, args))
+        return future
+
+    def call(self, command, *args):
+        # Submits and waits for the commit; raises what the command raised
+        return self.submit(command, *args).result()
+
+    def close(self):
+        # Commits what is queued, then stops the writer
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            stop = False
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0)) if self.max_wait \
+                        else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+            if stop:
+                return
+
+    def _run_command(self, command, args):
+        conn = self.db.connect()
+        conn.execute('SAVEPOINT command')
+        try:
+            result = command(*args)
+        except Exception:
+            conn.execute('ROLLBACK TO command')
+            conn.execute('RELEASE command')
+            if self.refs is not None:
+                # It may have added reference rows that are gone again
+                self.refs.invalidate()
+            raise
+        conn.execute('RELEASE command')
+        return result
+
+    def _commit(self, batch):
+        batch = [item for item in batch if item[0].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        results = []
+        try:
+            with self.db.transaction(immediate=True):
+                for future, command, args in batch:
+                    try:
+                        results.append((future, self._run_command(command, args), None))
+                    except Exception as e:
+                        results.append((future, None, e))
+        except Exception as e:
+            # The batch did not commit; nothing in it happened
+            if self.refs is not None:
+                self.refs.invalidate()
+            for future, _, _ in batch:
+                future.set_exception(e)
+            return
+        for future, result, error in results:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+class WriteBatcher:
+    # Coalesces small writes of the same kind that arrive within window
+    # seconds of each other (kitchen stations marking items, say) into one
+    # command through a WriteQueue: command(keys) writes them all and
+    # returns {key: result}. Each submitter's Future gets the result for its
+    # own key, or None when the command returned none for it.
+    def __init__(self, writes, command, window):
+        self.writes = writes
+        self.command = command
+        self.window = window
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._timer = None
+
+    def submit(self, key):
+        future = Future()
+        with self._lock:
+            self._pending.setdefault(key, []).append(future)
+            if self._timer is None:
+                self._timer = threading.Timer(self.window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        return future
+
+    def call(self, key):
+        return self.submit(key).result()
+
+    def flush(self):
+        # Sends what has been collected now instead of at the end of the window
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not pending:
+            return
+        try:
+            batch = self.writes.submit(self.command, list(pending))
+        except Exception as e:
+            # Runs on the timer thread: hand the error to whoever waits
+            for futures in pending.values():
+                for future in futures:
+                    future.set_exception(e)
+            return
+        batch.add_done_callback(lambda done: self._deliver(pending, done))
+
+    def _deliver(self, pending, done):
+        error = done.exception()
+        results = {} if error is not None else done.result()
+        for key, futures in pending.items():
+            for future in futures:
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(results.get(key))
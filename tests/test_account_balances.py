@@ -0,0 +1,31 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ais_db import Database, init_db, rebuild_account_balances, verify_account_balances  # noqa: E402
+
+
+def balances(db):
+    return db.query('SELECT account_id, debit, credit FROM account_balances WHERE debit OR credit ORDER BY 1')
+
+
+def test_balances_follow_journal_line_changes(tmp_path):
+    db = Database(str(tmp_path / 'ais.db'))
+    init_db(db)
+    try:
+        with db.transaction() as c:
+            c.execute("INSERT INTO journal_entries (date, description) VALUES ('2026-01-05', 'Sale')")
+            c.executemany('INSERT INTO journal_lines (entry_id, account_id, debit, credit) VALUES (1, ?, ?, ?)',
+                          [(1, 10, 0), (7, 0, 10), (2, 4, 0), (7, 0, 4)])
+            c.execute('UPDATE journal_lines SET debit = 12 WHERE id = 1')
+            c.execute('UPDATE journal_lines SET account_id = 3 WHERE id = 3')
+            c.execute('UPDATE journal_lines SET credit = NULL WHERE id = 4')
+            c.execute('DELETE FROM journal_lines WHERE id = 2')
+        assert verify_account_balances(db) == []
+        maintained = balances(db)
+        assert maintained == [(1, 12.0, 0.0), (3, 4.0, 0.0)]
+        rebuild_account_balances(db)
+        assert balances(db) == maintained
+    finally:
+        db.close_all()
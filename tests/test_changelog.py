@@ -0,0 +1,63 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ais_changes import ChangeWatcher  # noqa: E402
+from ais_db import Database, init_db  # noqa: E402
+
+
+class Widget:
+    # Polling is driven by calling check() directly
+    def after(self, ms, callback):
+        pass
+
+
+def test_watcher_reports_changed_orders_and_tables(tmp_path):
+    db = Database(str(tmp_path / 'ais.db'))
+    init_db(db)
+    other = Database(db.path)
+    try:
+        with db.transaction() as c:
+            c.executemany('INSERT INTO tables (table_number, capacity) VALUES (?, 4)', [(1,), (2,), (3,)])
+            c.executemany("INSERT INTO orders (order_number, table_number, order_date) VALUES (?, ?, '2026-01-05')",
+                          [('A', 1), ('B', 2)])
+            c.executemany('INSERT INTO order_items (order_id, menu_item_id, quantity, price) VALUES (?, 1, 1, 5)',
+                          [(1,), (2,)])
+        watcher = ChangeWatcher(Widget(), db)
+        seen = {}
+        watcher.subscribe('order', lambda keys: seen.setdefault('order', []).append(keys))
+        watcher.subscribe('table', lambda keys: seen.setdefault('table', []).append(keys))
+        assert watcher.check() == {}
+        # Written by another connection, as another terminal would
+        with other.transaction() as c:
+            c.execute("UPDATE order_items SET status = 'prepared' WHERE id = 2")
+            c.execute('UPDATE orders SET table_number = 3 WHERE id = 1')
+            c.execute("UPDATE tables SET status = 'occupied' WHERE table_number = 2")
+        assert watcher.check() == {'order': {1, 2}, 'table': {1, 2, 3}}
+        assert seen == {'order': [{1, 2}], 'table': [{1, 2, 3}]}
+        with db.transaction() as c:
+            c.execute('DELETE FROM order_items WHERE order_id = 2')
+            c.execute('DELETE FROM orders WHERE id = 2')
+        assert watcher.check() == {'order': {2}, 'table': {2}}
+        assert watcher.check() == {}
+    finally:
+        other.close_all()
+        db.close_all()
+
+
+def test_watcher_reloads_everything_after_pruned_entries(tmp_path):
+    db = Database(str(tmp_path / 'ais.db'))
+    init_db(db)
+    try:
+        watcher = ChangeWatcher(Widget(), db)
+        seen = []
+        watcher.subscribe('order', seen.append)
+        with db.transaction() as c:
+            c.executemany("INSERT INTO orders (order_number, table_number, order_date) VALUES (?, 1, '2026-01-05')",
+                          [(f'O{n}',) for n in range(6000)])
+        assert db.query_one('SELECT MIN(seq) FROM changelog')[0] > 1
+        watcher.check()
+        assert seen == [None]
+    finally:
+        db.close_all()
@@ -0,0 +1,24 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ais_db import Database, init_db  # noqa: E402
+
+
+def test_entry_date_follows_date(tmp_path):
+    db = Database(str(tmp_path / 'ais.db'))
+    init_db(db)
+    try:
+        with db.transaction() as c:
+            c.executemany('INSERT INTO journal_entries (date, description) VALUES (?, ?)',
+                          [('2026-01-05', 'Plain'), ('2026-01-06 14:30:00', 'With time'),
+                           ('2026-01-07T08:00:00', 'ISO'), ('05/01/2026', 'Unparsed')])
+            c.execute("UPDATE journal_entries SET date = '2026-02-01 09:00:00' WHERE id = 1")
+        assert db.query('SELECT entry_date FROM journal_entries ORDER BY id') == [
+            ('2026-02-01',), ('2026-01-06',), ('2026-01-07',), ('05/01/2026',)]
+        # Same as init_db's backfill computes from scratch
+        assert db.query('SELECT entry_date FROM journal_entries ORDER BY id') == db.query(
+            'SELECT COALESCE(date(date), substr(date, 1, 10)) FROM journal_entries ORDER BY id')
+    finally:
+        db.close_all()
@@ -0,0 +1,41 @@
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ais_cache import ReferenceCache  # noqa: E402
+from ais_db import Database, init_db  # noqa: E402
+from ais_import import import_journal  # noqa: E402
+
+
+def make_db(tmp_path):
+    db = Database(str(tmp_path / 'ais.db'))
+    init_db(db)
+    with db.transaction() as c:
+        c.executemany('INSERT INTO accounts (name, type) VALUES (?, ?)', [('Cash', 'Asset'), ('Sales', 'Income')])
+    return db
+
+
+def test_dates_are_stored_zero_padded(tmp_path):
+    db = make_db(tmp_path)
+    try:
+        text = ('entry,date,description,account,debit,credit\n'
+                'e1,2026-1-5,Sale,Cash,10,\n'
+                'e1,,,Sales,,10\n')
+        entries, lines, errors = import_journal(db, ReferenceCache(db), io.StringIO(text))
+        assert (entries, lines, errors) == (1, 2, [])
+        assert db.query('SELECT date, entry_date FROM journal_entries') == [('2026-01-05', '2026-01-05')]
+    finally:
+        db.close_all()
+
+
+def test_jsonl_lines_must_be_a_list(tmp_path):
+    db = make_db(tmp_path)
+    try:
+        text = '{"entry": "e1", "date": "2026-01-05", "lines": 5}\n'
+        entries, lines, errors = import_journal(db, ReferenceCache(db), io.StringIO(text), 'jsonl')
+        assert (entries, lines) == (0, 0)
+        assert errors == [(1, '', '"lines" must be a list of JSON objects.')]
+    finally:
+        db.close_all()
@@ -0,0 +1,81 @@
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ais_db import Database, init_db  # noqa: E402
+
+# orders as the original single-file app created it: no index on
+# order_number, numbers made from the current second
+BASELINE_ORDERS = '''CREATE TABLE orders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_number TEXT NOT NULL,
+    table_number INTEGER,
+    order_date TEXT NOT NULL,
+    status TEXT DEFAULT 'pending',
+    total_amount REAL,
+    cost_amount REAL,
+    payment_status TEXT DEFAULT 'unpaid',
+    payment_method TEXT,
+    cashier_id INTEGER,
+    FOREIGN KEY(cashier_id) REFERENCES users(id)
+)'''
+
+
+def baseline_db(path, numbers, index=False):
+    conn = sqlite3.connect(path)
+    conn.execute(BASELINE_ORDERS)
+    if index:
+        conn.execute('CREATE INDEX idx_orders_number ON orders(order_number)')
+    conn.executemany('INSERT INTO orders (order_number, table_number, order_date, total_amount) '
+                     "VALUES (?, 1, '2026-01-01 10:00:00', 5)", [(number,) for number in numbers])
+    conn.commit()
+    conn.close()
+
+
+def open_db(path):
+    db = Database(str(path))
+    init_db(db)
+    return db
+
+
+def unique_number_index(db):
+    return [row for row in db.query('PRAGMA index_list(orders)') if row[1] == 'idx_orders_number' and row[2]]
+
+
+def test_duplicate_order_numbers_without_index(tmp_path):
+    path = str(tmp_path / 'ais.db')
+    baseline_db(path, ['ORD20260101100000'] * 3 + ['ORD20260101100001'])
+    db = open_db(path)
+    try:
+        assert db.query('SELECT id, order_number FROM orders ORDER BY id') == [
+            (1, 'ORD20260101100000'), (2, 'ORD20260101100000-2'),
+            (3, 'ORD20260101100000-3'), (4, 'ORD20260101100001')]
+        assert unique_number_index(db)
+    finally:
+        db.close_all()
+
+
+def test_duplicate_order_numbers_with_plain_index(tmp_path):
+    path = str(tmp_path / 'ais.db')
+    baseline_db(path, ['ORD20260101100000'] * 2, index=True)
+    db = open_db(path)
+    try:
+        assert [number for number, in db.query('SELECT order_number FROM orders ORDER BY id')] == [
+            'ORD20260101100000', 'ORD20260101100000-2']
+        assert unique_number_index(db)
+    finally:
+        db.close_all()
+
+
+def test_migrated_database_reopens_unchanged(tmp_path):
+    path = str(tmp_path / 'ais.db')
+    baseline_db(path, ['ORD20260101100000'] * 2)
+    open_db(path).close_all()
+    db = open_db(path)
+    try:
+        assert [number for number, in db.query('SELECT order_number FROM orders ORDER BY id')] == [
+            'ORD20260101100000', 'ORD20260101100000-2']
+    finally:
+        db.close_all()
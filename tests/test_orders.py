@@ -0,0 +1,53 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ais_db import Database, init_db  # noqa: E402
+from ais_orders import OrderError, mark_items_prepared, mark_order_complete, place_order  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / 'ais.db'))
+    init_db(db)
+    with db.transaction() as c:
+        c.executemany('INSERT INTO menu_items (name, price) VALUES (?, 5)', [('Soup',), ('Stew',)])
+        c.executemany('INSERT INTO kitchen_inventory (name, quantity, cost_per_unit) VALUES (?, ?, 1)',
+                      [('Stock', 3), ('Beef', None)])
+        c.executemany('INSERT INTO menu_item_ingredients (menu_item_id, inventory_id, quantity) VALUES (?, ?, ?)',
+                      [(1, 1, 1), (2, 1, 1), (2, 2, 1)])
+    yield db
+    db.close_all()
+
+
+def cart(*lines):
+    return [{'item': item, 'qty': qty, 'price': 5.0, 'total': 5.0 * qty} for item, qty in lines]
+
+
+def test_demand_is_checked_across_the_whole_cart(db):
+    with pytest.raises(OrderError, match='Stock'):
+        place_order(db, 1, cart(('Soup', 2), ('Soup', 2)))
+    place_order(db, 1, cart(('Soup', 2), ('Soup', 1)))
+    assert db.query('SELECT quantity FROM kitchen_inventory WHERE id = 1') == [(0,)]
+    assert db.query('SELECT COUNT(*) FROM order_items') == [(2,)]
+
+
+def test_blank_inventory_quantity_counts_as_none_left(db):
+    with pytest.raises(OrderError, match='Beef'):
+        place_order(db, 1, cart(('Stew', 1)))
+    assert db.query('SELECT COUNT(*) FROM orders') == [(0,)]
+
+
+def test_order_moves_to_kitchen_once_all_items_are_prepared(db):
+    first, _ = place_order(db, 1, cart(('Soup', 1)))
+    second, _ = place_order(db, 2, cart(('Soup', 1), ('Soup', 1)))
+    items = [item_id for item_id, in db.query('SELECT id FROM order_items WHERE order_id = ? ORDER BY id', (second,))]
+    assert mark_items_prepared(db, [items[0], 999]) == {items[0]: second}
+    assert db.query('SELECT id, status FROM orders ORDER BY id') == [(first, 'pending'), (second, 'pending')]
+    assert mark_items_prepared(db, [items[1]]) == {items[1]: second}
+    assert db.query('SELECT id, status FROM orders ORDER BY id') == [(first, 'pending'), (second, 'in kitchen')]
+    mark_order_complete(db, items[0])
+    assert db.query('SELECT status FROM orders WHERE id = ?', (second,)) == [('served',)]
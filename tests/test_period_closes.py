@@ -0,0 +1,68 @@
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ais_db import Database, init_db  # noqa: E402
+from ais_reports import close_period, has_stale_closes, refresh_period_closes, run_report  # noqa: E402
+
+
+def make_db(tmp_path):
+    db = Database(str(tmp_path / 'ais.db'))
+    init_db(db)
+    return db
+
+
+def post(db, date, account_id, amount):
+    with db.transaction() as c:
+        c.execute("INSERT INTO journal_entries (date, description) VALUES (?, 'Test')", (date,))
+        entry_id = c.lastrowid
+        c.executemany('INSERT INTO journal_lines (entry_id, account_id, debit, credit) VALUES (?, ?, ?, ?)',
+                      [(entry_id, account_id, amount, 0), (entry_id, 7, 0, amount)])
+        return c.lastrowid
+
+
+def snapshot(db, period_end):
+    return db.query('SELECT account_id, debit, credit FROM period_snapshots WHERE period_end = ? ORDER BY 1',
+                    (period_end,))
+
+
+def test_back_dated_changes_mark_closes_stale(tmp_path):
+    db = make_db(tmp_path)
+    try:
+        post(db, '2026-01-10', 1, 10)
+        close_period(db, '2026-01-31')
+        close_period(db, '2026-02-28')
+        post(db, '2026-03-01', 1, 5)
+        assert not has_stale_closes(db)
+        line_id = post(db, '2026-02-10 12:00:00', 2, 3)
+        assert db.query('SELECT period_end, stale FROM period_closes ORDER BY 1') == [
+            ('2026-01-31', 0), ('2026-02-28', 1)]
+        with db.transaction() as c:
+            c.execute('UPDATE journal_entries SET date = ? WHERE id = 1', ('2026-02-01',))
+            c.execute('UPDATE journal_lines SET credit = 4 WHERE id = ?', (line_id,))
+            c.execute('DELETE FROM journal_lines WHERE id = ?', (line_id - 1,))
+        assert db.query('SELECT stale FROM period_closes') == [(1,), (1,)]
+        assert refresh_period_closes(db) == ['2026-01-31', '2026-02-28']
+        refreshed = {end: snapshot(db, end) for end in ('2026-01-31', '2026-02-28')}
+        # Same as closing from scratch
+        with db.transaction() as c:
+            c.execute('DELETE FROM period_snapshots')
+            c.execute('DELETE FROM period_closes')
+        close_period(db, '2026-01-31')
+        close_period(db, '2026-02-28')
+        assert refreshed == {end: snapshot(db, end) for end in refreshed}
+    finally:
+        db.close_all()
+
+
+def test_run_report_leaves_stale_closes_alone(tmp_path):
+    db = make_db(tmp_path)
+    try:
+        close_period(db, '2026-01-31')
+        post(db, '2026-01-10', 1, 10)
+        run_report(db, 'trial-balance', io.StringIO(), 'text', '2026-01-01', '2026-01-31')
+        assert has_stale_closes(db)
+    finally:
+        db.close_all()
@@ -0,0 +1,17 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ais_db import Database, check_query_plans, init_db  # noqa: E402
+
+
+def test_hot_queries_use_indexes(tmp_path):
+    db = Database(str(tmp_path / 'ais.db'))
+    init_db(db)
+    try:
+        scans = {name: plan for name, (uses_indexes, plan) in check_query_plans(db).items() if not uses_indexes}
+        assert scans == {}
+    finally:
+        db.close_all()
+
@@ -0,0 +1,35 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ais_db import Database, init_db, rebuild_menu_item_costs  # noqa: E402
+
+
+def costs(db):
+    return db.query('SELECT menu_item_id, unit_cost FROM menu_item_costs ORDER BY 1')
+
+
+def test_costs_follow_recipes_and_ingredient_prices(tmp_path):
+    db = Database(str(tmp_path / 'ais.db'))
+    init_db(db)
+    try:
+        with db.transaction() as c:
+            c.executemany('INSERT INTO menu_items (name, price) VALUES (?, 5)', [('Soup',), ('Stew',), ('Salad',)])
+            c.executemany('INSERT INTO kitchen_inventory (name, quantity, cost_per_unit) VALUES (?, 100, ?)',
+                          [('Stock', 2), ('Beef', 4), ('Leaves', 1)])
+            c.executemany('INSERT INTO menu_item_ingredients (menu_item_id, inventory_id, quantity) VALUES (?, ?, ?)',
+                          [(1, 1, 1), (2, 1, 0.5), (2, 2, 1), (3, 3, 2)])
+        assert costs(db) == [(1, 2.0), (2, 5.0), (3, 2.0)]
+        with db.transaction() as c:
+            c.execute('UPDATE kitchen_inventory SET cost_per_unit = 3 WHERE id = 1')
+            c.execute('UPDATE menu_item_ingredients SET quantity = 2 WHERE id = 3')
+            c.execute('UPDATE menu_item_ingredients SET menu_item_id = 1 WHERE id = 4')
+            c.execute('DELETE FROM kitchen_inventory WHERE id = 2')
+        maintained = costs(db)
+        assert maintained == [(1, 5.0), (2, 1.5), (3, 0.0)]
+        rebuild_menu_item_costs(db)
+        # The rebuild leaves out items with no recipe lines left
+        assert [row for row in maintained if row[1]] == costs(db)
+    finally:
+        db.close_all()
@@ -0,0 +1,71 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ais_cache import ReferenceCache  # noqa: E402
+from ais_db import Database, init_db, rebuild_sales_rollup  # noqa: E402
+from ais_orders import place_order, process_payment  # noqa: E402
+
+
+def make_db(tmp_path):
+    # One menu item costing 2.0: one unit of an ingredient at 2.0
+    db = Database(str(tmp_path / 'ais.db'))
+    init_db(db)
+    with db.transaction() as c:
+        c.execute("INSERT INTO menu_items (name, price) VALUES ('Soup', 5)")
+        c.execute("INSERT INTO kitchen_inventory (name, quantity, cost_per_unit) VALUES ('Stock', 100, 2)")
+        c.execute('INSERT INTO menu_item_ingredients (menu_item_id, inventory_id, quantity) VALUES (1, 1, 1)')
+    return db
+
+
+def rollups(db):
+    return (db.query('SELECT * FROM sales_daily ORDER BY 1, 2'),
+            db.query('SELECT * FROM sales_daily_items ORDER BY 1, 2'))
+
+
+def assert_matches_rebuild(db):
+    maintained = rollups(db)
+    rebuild_sales_rollup(db)
+    assert maintained == rollups(db)
+
+
+def pay(db, refs):
+    _, number = place_order(db, 1, [{'item': 'Soup', 'qty': 1, 'price': 5.0, 'total': 5.0}])
+    process_payment(db, refs, number, 'cash', 5.0)
+    return number
+
+
+def test_unpay_after_cost_change_reverses_posted_cost(tmp_path):
+    db = make_db(tmp_path)
+    try:
+        refs = ReferenceCache(db)
+        first = pay(db, refs)
+        pay(db, refs)
+        assert db.query('SELECT quantity, cost FROM sales_daily_items') == [(2, 4.0)]
+        with db.transaction() as c:
+            c.execute('UPDATE kitchen_inventory SET cost_per_unit = 3 WHERE id = 1')
+            c.execute("UPDATE orders SET payment_status = 'unpaid' WHERE order_number = ?", (first,))
+        assert db.query('SELECT quantity, cost FROM sales_daily_items') == [(1, 2.0)]
+        assert db.query('SELECT orders, cost FROM sales_daily') == [(1, 2.0)]
+        assert_matches_rebuild(db)
+    finally:
+        db.close_all()
+
+
+def test_item_edits_and_deletes_keep_rollup_in_step(tmp_path):
+    db = make_db(tmp_path)
+    try:
+        refs = ReferenceCache(db)
+        first = pay(db, refs)
+        pay(db, refs)
+        with db.transaction() as c:
+            c.execute('UPDATE order_items SET quantity = 3 WHERE id = 2')
+            c.execute("INSERT INTO order_items (order_id, menu_item_id, quantity, price) VALUES (2, 1, 1, 5)")
+            c.execute('DELETE FROM order_items WHERE order_id = 1')
+            c.execute('DELETE FROM orders WHERE order_number = ?', (first,))
+        assert_matches_rebuild(db)
+        # The added item got the recipe cost of when it was written
+        assert db.query('SELECT unit_cost FROM order_items WHERE id = 3') == [(2.0,)]
+    finally:
+        db.close_all()
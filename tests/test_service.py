@@ -0,0 +1,82 @@
+import json
+import os
+import socket
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ais_service import ServiceClient  # noqa: E402
+
+
+class DroppingServer:
+    # Answers the first request on a connection, then reads the next one
+    # and hangs up without answering, as a server restarting mid-request
+    def __init__(self):
+        self.requests = []
+        self.sock = socket.create_server(('127.0.0.1', 0))
+        self.port = self.sock.getsockname()[1]
+        threading.Thread(target=self.serve, daemon=True).start()
+
+    def serve(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+
+    def handle(self, conn):
+        with conn, conn.makefile('rb') as reader:
+            for answered in range(2):
+                line = reader.readline()
+                if not line:
+                    return
+                length = 0
+                while True:
+                    header = reader.readline()
+                    if header in (b'\r\n', b''):
+                        break
+                    name, _, value = header.decode().partition(':')
+                    if name.lower() == 'content-length':
+                        length = int(value)
+                reader.read(length)
+                self.requests.append(line.split()[0].decode())
+                if answered:
+                    return
+                data = json.dumps({'result': [1, 'ORD']}).encode()
+                conn.sendall(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                             b'Content-Length: %d\r\n\r\n%s' % (len(data), data))
+
+    def close(self):
+        self.sock.close()
+
+
+@pytest.fixture
+def server():
+    server = DroppingServer()
+    yield server
+    server.close()
+
+
+def test_sent_post_is_not_resent(server):
+    client = ServiceClient(f'http://127.0.0.1:{server.port}', token='')
+    try:
+        client.place_order(1, [])
+        with pytest.raises(ConnectionError):
+            client.place_order(1, [])
+        assert server.requests == ['POST', 'POST']
+    finally:
+        client.close()
+
+
+def test_get_is_retried_on_a_fresh_connection(server):
+    client = ServiceClient(f'http://127.0.0.1:{server.port}', token='')
+    try:
+        client.call('GET', '/kitchen')
+        assert client.call('GET', '/kitchen') == [1, 'ORD']
+        assert server.requests == ['GET', 'GET', 'GET']
+    finally:
+        client.close()
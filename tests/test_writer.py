@@ -0,0 +1,51 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ais_db import Database, init_db  # noqa: E402
+from ais_writer import WriteQueue  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / 'ais.db'))
+    init_db(db)
+    yield db
+    db.close_all()
+
+
+def add_table(db, number):
+    with db.transaction() as c:
+        c.execute('INSERT INTO tables (table_number, capacity) VALUES (?, 4)', (abs(number),))
+    if number < 0:
+        raise ValueError('bad table number')
+    return number
+
+
+def test_failed_command_rolls_back_alone(db):
+    writes = WriteQueue(db)
+    try:
+        futures = [writes.submit(add_table, db, number) for number in (1, -3, 1, 2)]
+        assert [future.exception() is None for future in futures] == [True, False, False, True]
+        assert db.query('SELECT table_number FROM tables ORDER BY 1') == [(1,), (2,)]
+    finally:
+        writes.close()
+
+
+def test_nested_submit_reports_errors_on_its_future(db):
+    writes = WriteQueue(db)
+
+    def outer():
+        add_table(db, 1)
+        inner = writes.submit(add_table, db, -2)
+        return type(inner.exception()).__name__
+
+    try:
+        assert writes.call(outer) == 'ValueError'
+        # The nested command's insert was rolled back, the outer one's kept
+        assert db.query('SELECT table_number FROM tables') == [(1,)]
+    finally:
+        writes.close()